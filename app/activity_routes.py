@@ -1,8 +1,10 @@
 from typing import List
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 
+from app.catalog import CATALOG_SCOPE, get_catalog
 from app.deps import get_db, get_current_user
+from app.http_cache import conditional_json
 from app import models, schemas
 
 router = APIRouter()
@@ -12,6 +14,7 @@ router = APIRouter()
     response_model=List[schemas.ActivityCatalogItem],
 )
 def get_activity_catalog(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
@@ -19,18 +22,34 @@ def get_activity_catalog(
     Return the global catalog of Activities (for the left-hand list
     in the 'Add Activities' dialog).
     """
-    rows = (
-        db.query(models.Activity)
-        .order_by(models.Activity.is_custom.asc(), models.Activity.name.asc())
-        .all()
+    return conditional_json(
+        request,
+        "activity_catalog",
+        [CATALOG_SCOPE],
+        lambda: get_catalog(db).catalog_body,
     )
 
-    return [
-        schemas.ActivityCatalogItem(
-            id=row.id,
-            name=row.name,
-            description=row.description,
-            is_custom=row.is_custom,
-        )
-        for row in rows
-    ]
+
+@router.get(
+    "/activities/catalog/search",
+    response_model=schemas.ActivityCatalogPage,
+)
+def search_activity_catalog(
+    request: Request,
+    q: str = Query("", max_length=100),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    One page of catalog Activities matching `q` (prefix, then substring,
+    then fuzzy; see app/catalog.py). Use `next_offset` for the next page.
+    """
+    return conditional_json(
+        request,
+        "activity_catalog_search",
+        [CATALOG_SCOPE],
+        lambda: get_catalog(db).search(q, offset, limit),
+        vary=(q.strip().lower(), offset, limit),
+    )
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,6 +10,7 @@ from app.project_intake_routes import router as project_intake_router
 from app.zoning_routes import router as zoning_router
 from app.projects_routes import router as projects_router
 from app.activity_routes import router as activity_router
+from app.realtime_routes import router as realtime_router
 
 from app.graph import build_graph, ChatState
 
@@ -22,6 +23,8 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     reply: str
     messages: List[str]
+    # Tokens per prompt section (instructions/summary/history/context/question/total)
+    promptTokens: Optional[Dict[str, int]] = None
 
 
 app = FastAPI(title="Project Pretzel API")
@@ -51,6 +54,9 @@ app.include_router(projects_router, prefix="/api", tags=["projects"])
 # ✅ Activities API (this gives you /api/activities)
 app.include_router(activity_router, prefix="/api", tags=["activities"])
 
+# Project WebSocket channel (/api/projects/{id}/ws)
+app.include_router(realtime_router, prefix="/api", tags=["realtime"])
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -58,6 +64,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],   # <-- includes OPTIONS
     allow_headers=["*"],
+    # keyset cursor for /projects/{id}/messages; validators for conditional GETs
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
 # Build graph once for API
@@ -91,4 +99,8 @@ def chat_endpoint(payload: ChatRequest):
     else:
         reply_text = last
 
-    return ChatResponse(reply=reply_text, messages=messages)
+    return ChatResponse(
+        reply=reply_text,
+        messages=messages,
+        promptTokens=new_state.get("promptTokens"),
+    )
@@ -1,10 +1,17 @@
 # app/assistant_routes.py
+from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import models, schemas, deps
+from app.authz import ProjectAccess, project_access, project_access_async
+from app.http_cache import touch_project
+from app.pagination import decode_cursor, encode_cursor
+from app.realtime import publish_message
 
 # THIS is what main.py imports: `router`
 router = APIRouter(
@@ -19,6 +26,7 @@ async def project_assistant_chat(
     payload: schemas.ProjectAssistantRequest,
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     """
     Project-aware AI assistant endpoint.
@@ -39,15 +47,7 @@ async def project_assistant_chat(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not a member of this project",
@@ -64,7 +64,7 @@ async def project_assistant_chat(
     db.flush()  # get generated ID without full commit
 
     # ----- Call AI (placeholder for LangGraph integration) -----
-    role_name = membership.role.name if membership.role else "Collaborator"
+    role_name = access.role_name or "Collaborator"
 
     # TODO: plug in real LangGraph call here.
     ai_text = (
@@ -95,6 +95,23 @@ async def project_assistant_chat(
     db.refresh(user_msg)
     db.refresh(ai_msg)
     db.refresh(run_log)
+    touch_project(project.id, "project")
+
+    for msg, sender_name in (
+        (user_msg, current_user.full_name or current_user.email),
+        (ai_msg, None),
+    ):
+        publish_message(
+            schemas.ProjectMessageRead(
+                id=msg.id,
+                project_id=msg.project_id,
+                sender_id=msg.sender_id,
+                sender_name=sender_name,
+                content=msg.content,
+                message_type=msg.message_type,
+                created_at=msg.created_at,
+            )
+        )
 
     return schemas.ProjectAssistantResponse(
         reply=ai_text,
@@ -108,49 +125,60 @@ async def project_assistant_chat(
 @router.get("/{project_id}/assistant/history", response_model=schemas.ProjectAssistantHistoryResponse)
 async def get_project_assistant_history(
     project_id: UUID,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_user_async),
+    access: Optional[ProjectAccess] = Depends(project_access_async),
+    limit: int = Query(100, ge=1, le=200),
+    before: Optional[str] = Query(None),
+    after: Optional[str] = Query(None),
 ):
     """
-    Return recent chat history (user + assistant messages) for this project.
+    Return chat history (user + assistant messages) for this project,
+    oldest first within the page.
+
+    - No cursor: the newest `limit` messages.
+    - `before=<older_cursor>`: the `limit` messages just before that page.
+    - `after=<newer_cursor>`: the `limit` messages just after it (polling).
     """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Pass either before or after, not both.")
 
     # Ensure project exists
-    project = (
-        db.query(models.Project)
-        .filter(models.Project.id == project_id)
-        .first()
+    project = await db.scalar(
+        select(models.Project.id).where(models.Project.id == project_id)
     )
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
     # Ensure user is a member
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not a member of this project",
         )
 
-    # Fetch last N messages for this project
-    q = (
-        db.query(models.Message)
-        .filter(
-            models.Message.project_id == project_id,
-            models.Message.message_type.in_(["user", "assistant"]),
-        )
-        .order_by(models.Message.created_at.asc())
-        .limit(100)   # adjust if you want more/less history
+    key = tuple_(models.Message.created_at, models.Message.id)
+    q = select(models.Message).where(
+        models.Message.project_id == project_id,
+        models.Message.message_type.in_(["user", "assistant"]),
     )
 
-    rows = q.all()
+    # Walk the (project_id, created_at, id) index away from the cursor and
+    # fetch one extra row to learn whether the walk could continue.
+    if after is not None:
+        q = q.where(key > decode_cursor(after)).order_by(
+            models.Message.created_at.asc(), models.Message.id.asc()
+        )
+    else:
+        if before is not None:
+            q = q.where(key < decode_cursor(before))
+        q = q.order_by(models.Message.created_at.desc(), models.Message.id.desc())
+
+    rows = list((await db.scalars(q.limit(limit + 1))).all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after is None:
+        rows.reverse()
 
     messages = [
         schemas.ProjectAssistantMessage(
@@ -162,4 +190,23 @@ async def get_project_assistant_history(
         for m in rows
     ]
 
-    return schemas.ProjectAssistantHistoryResponse(messages=messages)
+    if after is None:
+        has_more_older, has_more_newer = has_more, before is not None
+    else:
+        has_more_older, has_more_newer = True, has_more
+
+    if rows:
+        older_cursor = encode_cursor(rows[0].created_at, rows[0].id)
+        newer_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    else:
+        # Empty page: keep the caller's position so polling can resume
+        older_cursor = before
+        newer_cursor = after
+
+    return schemas.ProjectAssistantHistoryResponse(
+        messages=messages,
+        older_cursor=older_cursor,
+        newer_cursor=newer_cursor,
+        has_more_older=has_more_older,
+        has_more_newer=has_more_newer,
+    )
@@ -0,0 +1,329 @@
+# app/audit.py
+"""
+Audit log pipeline.
+
+In "async" mode (AUDIT_MODE, the default) log_action() no longer adds an
+AuditLog row to the request transaction. The event is held on the
+session until it commits (dropped on rollback, as before), then handed
+to a background writer that inserts batches with one multi-row INSERT
+when AUDIT_BATCH_SIZE events are waiting or AUDIT_FLUSH_INTERVAL_SECONDS
+have passed.
+
+  - Backpressure: the queue holds AUDIT_QUEUE_SIZE events. When it is
+    full, the committing request waits up to AUDIT_ENQUEUE_TIMEOUT_SECONDS
+    and then tries once to write its events itself. If that fails too
+    (database down) the events stay in the spool and are handed to the
+    writer's overflow list; the request never waits on the database.
+  - Crash safety: every event is appended to this worker's spool file
+    (AUDIT_SPOOL_DIR) before it is queued, and the file is truncated once
+    everything in it is in the database. On startup, spool files left by
+    dead workers are replayed. Rows carry their id, so a replay never
+    duplicates them.
+  - Synchronous: actions in AUDIT_SYNC_ACTIONS, calls with sync=True and
+    AUDIT_MODE=sync write the row in the caller's transaction, atomic
+    with the change being audited.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.bulk import insert_rows
+from app.database import SessionLocal
+from app.metrics import CallbackMetric
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-worker dev only
+    fcntl = None
+
+AUDIT_MODE = os.getenv("AUDIT_MODE", "async")
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+AUDIT_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT_SECONDS", "0.5"))
+AUDIT_SPOOL_DIR = os.getenv("AUDIT_SPOOL_DIR", "audit_spool")
+# Compliance-critical actions, always written in the request transaction
+AUDIT_SYNC_ACTIONS = {
+    action.strip()
+    for action in os.getenv("AUDIT_SYNC_ACTIONS", "PROJECT_CREATED,PROJECT_UPDATED").split(",")
+    if action.strip()
+}
+
+_PENDING_KEY = "audit_pending"
+
+logger = logging.getLogger(__name__)
+
+
+def _event_row(
+    user_id: UUID,
+    action: str,
+    entity_type: str,
+    entity_id: UUID | str,
+    project_id: UUID | None,
+    metadata: Dict[str, Any] | None,
+) -> Dict[str, Any]:
+    # Keys are audit_logs column names (the JSON column is "metadata")
+    return {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "project_id": project_id,
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": str(entity_id),
+        "metadata": metadata or {},
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def _to_spool(row: Dict[str, Any]) -> str:
+    return json.dumps(row, default=str) + "\n"
+
+
+def _from_spool(line: str) -> Dict[str, Any]:
+    row = json.loads(line)
+    row["id"] = UUID(row["id"])
+    row["user_id"] = UUID(row["user_id"])
+    row["project_id"] = UUID(row["project_id"]) if row["project_id"] else None
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row
+
+
+def write_rows(rows: List[Dict[str, Any]]) -> int:
+    """
+    Insert audit rows in one statement, in their own transaction.
+    """
+    with SessionLocal() as db:
+        count = insert_rows(db, models.AuditLog.__table__, rows, conflict_columns=["id"])
+        db.commit()
+    return count
+
+
+def _write_skipping_invalid(rows: List[Dict[str, Any]]) -> None:
+    """
+    write_rows(), but a row that can never be inserted (e.g. its user was
+    deleted meanwhile) is dropped instead of blocking the whole batch.
+    """
+    try:
+        write_rows(rows)
+    except IntegrityError:
+        for row in rows:
+            try:
+                write_rows([row])
+            except IntegrityError as exc:
+                logger.warning("dropping %s audit event %s: %r", row["action"], row["id"], exc.orig)
+
+
+# ---------- Background writer ----------
+
+
+class AuditWriter:
+    def __init__(self, spool_dir: str = AUDIT_SPOOL_DIR):
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+        self._spool_lock = threading.Lock()
+        self._unflushed = 0  # events in the spool file not yet in the database
+        self._overflow: List[Dict[str, Any]] = []  # spooled, for the writer to retry
+        self._stopping = threading.Event()
+        self.written = 0
+
+        os.makedirs(spool_dir, exist_ok=True)
+        self._spool_dir = spool_dir
+        # Before opening our own file: a restarted container can reuse a pid
+        self._replay_orphans()
+        self._spool_path = os.path.join(spool_dir, f"audit-{os.getpid()}.jsonl")
+        self._spool = open(self._spool_path, "a", buffering=1, encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(self._spool, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, rows: List[Dict[str, Any]]) -> None:
+        with self._spool_lock:
+            self._spool.write("".join(_to_spool(row) for row in rows))
+            self._unflushed += len(rows)
+        for i, row in enumerate(rows):
+            try:
+                self._queue.put(row, timeout=AUDIT_ENQUEUE_TIMEOUT_SECONDS)
+            except queue.Full:
+                # Writer is behind: this request pays for its own rows, but
+                # only one attempt; it must not hang on a dead database
+                if not self._write(rows[i:]):
+                    self._defer(rows[i:])
+                return
+
+    def _defer(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Hand already spooled rows to the writer thread. Past
+        AUDIT_QUEUE_SIZE they are only kept in the spool file, which is
+        then never truncated by this worker and gets replayed on restart.
+        """
+        with self._spool_lock:
+            room = max(AUDIT_QUEUE_SIZE - len(self._overflow), 0)
+            self._overflow.extend(rows[:room])
+        if len(rows) > room:
+            logger.warning(
+                "audit overflow full; %d events left in %s for replay",
+                len(rows) - room, self._spool_path,
+            )
+
+    def depth(self) -> int:
+        return self._queue.qsize() + len(self._overflow)
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        with self._spool_lock:
+            if self._overflow:
+                batch = self._overflow[:AUDIT_BATCH_SIZE]
+                del self._overflow[:AUDIT_BATCH_SIZE]
+                return batch
+        try:
+            batch = [self._queue.get(timeout=AUDIT_FLUSH_INTERVAL_SECONDS)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL_SECONDS
+        while len(batch) < AUDIT_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        One attempt to insert spooled rows; False leaves them in the spool.
+        """
+        try:
+            _write_skipping_invalid(rows)
+        except Exception as exc:
+            logger.warning("audit batch of %d events failed: %r", len(rows), exc)
+            return False
+
+        with self._spool_lock:
+            self.written += len(rows)
+            self._unflushed -= len(rows)
+            if self._unflushed == 0:
+                self._spool.truncate(0)
+        return True
+
+    def _flush(self, rows: List[Dict[str, Any]]) -> None:
+        # Writer thread only: retry until the database is back
+        while not self._write(rows):
+            if self._stopping.is_set():
+                return
+            time.sleep(1.0)
+
+    def _run(self) -> None:
+        while not (self._stopping.is_set() and self._queue.empty() and not self._overflow):
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+    def _replay_orphans(self) -> None:
+        """
+        Write out spool files left behind by workers that died.
+        """
+        for path in glob.glob(os.path.join(self._spool_dir, "audit-*.jsonl")):
+            with open(path, "r+", encoding="utf-8") as f:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # a live worker owns it
+                rows = []
+                for line in f:
+                    try:
+                        rows.append(_from_spool(line))
+                    except ValueError:
+                        continue  # torn last line from a crash mid-write
+                for start in range(0, len(rows), AUDIT_BATCH_SIZE):
+                    _write_skipping_invalid(rows[start:start + AUDIT_BATCH_SIZE])
+            os.remove(path)
+
+    def close(self) -> None:
+        self._stopping.set()
+        self._thread.join(timeout=10)
+
+
+_writer: Optional[AuditWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditWriter()
+    return _writer
+
+
+# ---------- Recording ----------
+
+
+def record(
+    db: Session,
+    user_id: UUID,
+    action: str,
+    entity_type: str,
+    entity_id: UUID | str,
+    project_id: UUID | None = None,
+    metadata: Dict[str, Any] | None = None,
+    sync: bool = False,
+) -> None:
+    """
+    Audit an action done in `db`'s current transaction.
+    """
+    if sync or AUDIT_MODE == "sync" or action in AUDIT_SYNC_ACTIONS:
+        db.add(
+            models.AuditLog(
+                user_id=user_id,
+                project_id=project_id,
+                action=action,
+                entity_type=entity_type,
+                entity_id=str(entity_id),
+                metadata_json=metadata or {},
+            )
+        )
+        return
+
+    row = _event_row(user_id, action, entity_type, entity_id, project_id, metadata)
+    db.info.setdefault(_PENDING_KEY, []).append(row)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session: Session) -> None:
+    rows = session.info.pop(_PENDING_KEY, None)
+    if rows:
+        get_audit_writer().enqueue(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+AUDIT_QUEUE_DEPTH = CallbackMetric(
+    "audit_queue_depth", "Audit events waiting for the background writer.", "gauge", (),
+    lambda: {(): float(_writer.depth()) if _writer else 0.0},
+)
+AUDIT_EVENTS_WRITTEN = CallbackMetric(
+    "audit_events_written_total", "Audit events inserted by the background writer.", "counter", (),
+    lambda: {(): float(_writer.written) if _writer else 0.0},
+)
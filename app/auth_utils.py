@@ -1,11 +1,14 @@
 # app/auth_utils.py
 
 import os
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 
 from jose import JWTError, jwt
 
+from app.cache import LRUCache
+
 # 🔐 Secret & algorithm (same for encode + decode)
 SECRET_KEY = (
     os.getenv("JWT_SECRET_KEY")
@@ -19,6 +22,15 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(
     os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "10080")
 )
 
+# Verified payloads by raw token, so a client polling with the same
+# bearer token skips HMAC verification. `exp` is still checked on hits.
+JWT_PAYLOAD_CACHE_TTL_SECONDS = float(os.getenv("JWT_PAYLOAD_CACHE_TTL_SECONDS", "300"))
+JWT_PAYLOAD_CACHE_SIZE = int(os.getenv("JWT_PAYLOAD_CACHE_SIZE", "4096"))
+
+_payload_cache: LRUCache[Dict[str, Any]] = LRUCache(
+    "jwt_payload", max_size=JWT_PAYLOAD_CACHE_SIZE, ttl=JWT_PAYLOAD_CACHE_TTL_SECONDS
+)
+
 
 def create_access_token(
     data: Dict[str, Any],
@@ -62,6 +74,13 @@ def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
 
     We normalize them so that caller can always read payload["sub"].
     """
+    cached = _payload_cache.get(token)
+    if cached is not None:
+        if cached.get("exp") is not None and cached["exp"] <= time.time():
+            _payload_cache.pop(token)
+            return None
+        return dict(cached)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
@@ -79,4 +98,5 @@ def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
 
     # Normalize so downstream always uses "sub"
     payload["sub"] = str(user_id)
-    return payload
+    _payload_cache.set(token, payload)
+    return dict(payload)
@@ -0,0 +1,137 @@
+# app/authz.py
+"""
+Project authorization: which projects a user is on, and in which role.
+
+A user's whole project -> role map is loaded with one query and cached
+per user for AUTHZ_CACHE_TTL_SECONDS. Code that adds, updates or removes
+members (including invite approval and project create / delete) calls
+invalidate_project_access() for the affected users; that bumps their
+version, so older cached maps are never read again. Other workers pick
+the change up within the TTL.
+
+FastAPI dependencies: project_access / project_access_async resolve the
+caller's ProjectAccess for the route's `project_id` path parameter, or
+None; each route keeps its own 403/404 response.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional
+from uuid import UUID
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import LRUCache
+from app.deps import get_async_db, get_current_user, get_current_user_async, get_db
+
+AUTHZ_CACHE_TTL_SECONDS = float(os.getenv("AUTHZ_CACHE_TTL_SECONDS", "30"))
+AUTHZ_CACHE_SIZE = int(os.getenv("AUTHZ_CACHE_SIZE", "4096"))
+
+@dataclass(frozen=True)
+class ProjectAccess:
+    project_id: UUID
+    member_id: int
+    role_id: Optional[int]
+    role_key: Optional[str]
+    role_name: Optional[str]
+
+
+AccessMap = Dict[UUID, ProjectAccess]
+
+_access_cache: LRUCache[AccessMap] = LRUCache(
+    "project_access", max_size=AUTHZ_CACHE_SIZE, ttl=AUTHZ_CACHE_TTL_SECONDS
+)
+_versions: Dict[UUID, int] = {}
+_generation = 0
+_versions_lock = threading.Lock()
+
+
+def invalidate_project_access(*user_ids: UUID) -> None:
+    """
+    Drop cached maps for these users (after their memberships changed).
+    """
+    with _versions_lock:
+        for user_id in user_ids:
+            _versions[user_id] = _versions.get(user_id, 0) + 1
+
+
+def invalidate_all_project_access() -> None:
+    """
+    Drop every cached map, e.g. after a role is renamed or deleted.
+    """
+    global _generation
+    with _versions_lock:
+        _generation += 1
+
+
+def _cache_key(user_id: UUID) -> Hashable:
+    return (user_id, _generation, _versions.get(user_id, 0))
+
+
+def _load_access_map(db: Session, user_id: UUID) -> AccessMap:
+    rows = (
+        db.query(
+            models.ProjectMember.project_id,
+            models.ProjectMember.id,
+            models.ProjectMember.role_id,
+            models.Role.key,
+            models.Role.name,
+        )
+        .outerjoin(models.Role, models.ProjectMember.role_id == models.Role.id)
+        .filter(models.ProjectMember.user_id == user_id)
+        .all()
+    )
+    return {
+        project_id: ProjectAccess(project_id, member_id, role_id, role_key, role_name)
+        for project_id, member_id, role_id, role_key, role_name in rows
+    }
+
+
+def project_access_map(db: Session, user_id: UUID) -> AccessMap:
+    """
+    {project id: ProjectAccess} for every project `user_id` is a member of.
+    """
+    key = _cache_key(user_id)
+    access = _access_cache.get(key)
+    if access is None:
+        access = _load_access_map(db, user_id)
+        _access_cache.set(key, access)
+    return access
+
+
+def get_project_access(db: Session, user_id: UUID, project_id: UUID) -> Optional[ProjectAccess]:
+    return project_access_map(db, user_id).get(project_id)
+
+
+async def get_project_access_async(
+    db: AsyncSession, user_id: UUID, project_id: UUID
+) -> Optional[ProjectAccess]:
+    key = _cache_key(user_id)
+    access = _access_cache.get(key)
+    if access is None:
+        access = await db.run_sync(_load_access_map, user_id)
+        _access_cache.set(key, access)
+    return access.get(project_id)
+
+
+# ---------- Dependencies ----------
+
+
+def project_access(
+    project_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> Optional[ProjectAccess]:
+    return get_project_access(db, current_user.id, project_id)
+
+
+async def project_access_async(
+    project_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+) -> Optional[ProjectAccess]:
+    return await get_project_access_async(db, current_user.id, project_id)
+
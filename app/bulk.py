@@ -0,0 +1,68 @@
+# app/bulk.py
+"""
+Set-based write helpers: one statement per batch instead of one ORM
+object per row. They execute on the session's connection, so they join
+the caller's transaction; commit is handled by the caller.
+
+None of them touch the identity map. Objects already loaded in the
+session keep their old state until refreshed.
+"""
+from typing import Any, Dict, Optional, Sequence, Type
+
+from sqlalchemy import Select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+
+def _ignore_conflicts(stmt, conflict_columns: Optional[Sequence[str]], constraint: Optional[str]):
+    if constraint is not None:
+        return stmt.on_conflict_do_nothing(constraint=constraint)
+    return stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+
+
+def insert_rows(
+    db: Session,
+    model: Type[Any],
+    rows: Sequence[Dict[str, Any]],
+    conflict_columns: Optional[Sequence[str]] = None,
+    constraint: Optional[str] = None,
+) -> int:
+    """
+    INSERT ... VALUES (...), (...) ON CONFLICT DO NOTHING.
+    Returns the number of rows actually inserted.
+    """
+    if not rows:
+        return 0
+    stmt = _ignore_conflicts(pg_insert(model).values(list(rows)), conflict_columns, constraint)
+    return db.execute(stmt).rowcount
+
+
+def insert_from_select(
+    db: Session,
+    model: Type[Any],
+    columns: Sequence[str],
+    select_stmt: Select,
+    conflict_columns: Optional[Sequence[str]] = None,
+    constraint: Optional[str] = None,
+) -> int:
+    """
+    INSERT INTO model (columns) SELECT ... ON CONFLICT DO NOTHING.
+    Returns the number of rows actually inserted.
+    """
+    stmt = _ignore_conflicts(
+        pg_insert(model).from_select(list(columns), select_stmt), conflict_columns, constraint
+    )
+    return db.execute(stmt).rowcount
+
+
+def update_where(db: Session, model: Type[Any], values: Dict[str, Any], *criteria: Any) -> int:
+    """
+    UPDATE model SET values WHERE criteria. Returns the number of rows updated.
+    """
+    stmt = (
+        update(model)
+        .where(*criteria)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).rowcount
@@ -0,0 +1,163 @@
+# app/catalog.py
+"""
+Shared in-memory snapshot of the global Activity catalog.
+
+The catalog is read by every "Add Activities" dialog but only changes
+when someone creates a custom activity. Each worker keeps one immutable
+CatalogSnapshot: the rows in name order, the full-list responses already
+serialized, and folded names for search. It is rebuilt on the next read
+after the "catalog" version (app/http_cache.py) moves; invalidate_catalog()
+bumps it after a commit, so with the redis backend every worker notices.
+With the memory backend other workers only notice once their snapshot
+is CATALOG_MAX_AGE_SECONDS old.
+
+search() ranks matches by tier, then by name:
+  0. the name starts with the query
+  1. a word of the name starts with the query
+  2. the query appears anywhere in the name
+  3. fuzzy: difflib ratio >= CATALOG_FUZZY_CUTOFF against the name or
+     one of its words (queries of CATALOG_FUZZY_MIN_LENGTH+ characters)
+"""
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.http_cache import scope_version, touch_global
+
+CATALOG_FUZZY_CUTOFF = float(os.getenv("CATALOG_FUZZY_CUTOFF", "0.75"))
+CATALOG_FUZZY_MIN_LENGTH = int(os.getenv("CATALOG_FUZZY_MIN_LENGTH", "3"))
+CATALOG_MAX_AGE_SECONDS = float(os.getenv("CATALOG_MAX_AGE_SECONDS", "300"))
+
+# Version scope shared with the conditional-GET routes
+CATALOG_SCOPE = "catalog"
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_catalog_items = TypeAdapter(List[schemas.ActivityCatalogItem])
+_definitions = TypeAdapter(List[schemas.ActivityDefinitionRead])
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    item: schemas.ActivityCatalogItem
+    folded: str
+    words: Tuple[str, ...]
+
+
+def _fuzzy(query: str, target: str) -> bool:
+    matcher = SequenceMatcher(None, query, target)
+    # Cheap upper bounds first; ratio() is the expensive one
+    return (
+        matcher.real_quick_ratio() >= CATALOG_FUZZY_CUTOFF
+        and matcher.quick_ratio() >= CATALOG_FUZZY_CUTOFF
+        and matcher.ratio() >= CATALOG_FUZZY_CUTOFF
+    )
+
+
+def _match_tier(query: str, entry: CatalogEntry) -> Optional[int]:
+    if entry.folded.startswith(query):
+        return 0
+    if any(word.startswith(query) for word in entry.words):
+        return 1
+    if query in entry.folded:
+        return 2
+    if len(query) >= CATALOG_FUZZY_MIN_LENGTH and (
+        _fuzzy(query, entry.folded) or any(_fuzzy(query, word) for word in entry.words)
+    ):
+        return 3
+    return None
+
+
+class CatalogSnapshot:
+    def __init__(self, activities: List[models.Activity], version: int):
+        # `activities` arrive ordered by name (database collation)
+        self.version = version
+        self.built_at = time.monotonic()
+        self.entries = [
+            CatalogEntry(
+                item=schemas.ActivityCatalogItem(
+                    id=a.id,
+                    name=a.name,
+                    description=a.description,
+                    is_custom=a.is_custom,
+                ),
+                folded=a.name.lower(),
+                words=tuple(_WORD_RE.findall(a.name.lower())),
+            )
+            for a in activities
+        ]
+        items = [entry.item for entry in self.entries]
+
+        # GET /activities/catalog: built-in activities first (stable sort keeps name order)
+        self.catalog_body = _catalog_items.dump_json(sorted(items, key=lambda i: bool(i.is_custom)))
+        # GET /projects/{id}/activities/catalog: same fields, name order
+        self.project_catalog_body = _catalog_items.dump_json(items)
+        # GET /activities: full definitions
+        self.definitions_body = _definitions.dump_json(
+            [schemas.ActivityDefinitionRead.model_validate(a) for a in activities]
+        )
+
+    def search(self, query: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        folded = query.strip().lower()
+        if not folded:
+            matches = self.entries
+        else:
+            tiers: List[List[CatalogEntry]] = [[], [], [], []]
+            for entry in self.entries:
+                tier = _match_tier(folded, entry)
+                if tier is not None:
+                    tiers[tier].append(entry)
+            matches = [entry for tier in tiers for entry in tier]
+
+        page = matches[offset: offset + limit]
+        end = offset + len(page)
+        return {
+            "items": [entry.item for entry in page],
+            "total": len(matches),
+            "next_offset": end if end < len(matches) else None,
+        }
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_catalog(db: Session) -> CatalogSnapshot:
+    """
+    The current snapshot, reloaded with `db` if the catalog has changed
+    or the snapshot is older than CATALOG_MAX_AGE_SECONDS.
+    """
+    global _snapshot
+    version = scope_version(CATALOG_SCOPE)
+
+    def current(snapshot: Optional[CatalogSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == version
+            and time.monotonic() - snapshot.built_at < CATALOG_MAX_AGE_SECONDS
+        )
+
+    snapshot = _snapshot
+    if current(snapshot):
+        return snapshot
+
+    with _snapshot_lock:
+        if not current(_snapshot):
+            activities = db.query(models.Activity).order_by(models.Activity.name.asc()).all()
+            _snapshot = CatalogSnapshot(activities, version)
+        return _snapshot
+
+
+def invalidate_catalog() -> None:
+    """
+    Call after committing a new or changed Activity.
+    """
+    touch_global(CATALOG_SCOPE)
@@ -0,0 +1,287 @@
+# app/chunking.py
+import json
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+
+# Target chunk size and overlap, in tokens
+CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "300"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "40"))
+
+# Max tokens of document context placed into a single prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "2000"))
+
+# Markdown headings, numbered spec sections ("3.2 Roofing"), or ALL CAPS lines
+_HEADING_RE = re.compile(
+    r"^(?:#{1,6}\s+\S.*|\d+(?:\.\d+)*\.?\s+[A-Z].{0,80}|[A-Z][A-Z0-9 &/,\-]{3,80}:?)$"
+)
+# Top-level key of a json.dumps(..., indent=2) object
+_JSON_TOP_KEY_RE = re.compile(r'^  "((?:[^"\\]|\\.)+)":')
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass(frozen=True)
+class TextChunk:
+    """
+    A slice of a ProjectDocument used for retrieval.
+    `start` / `end` are character offsets into the document content.
+    """
+
+    document_id: str
+    title: str
+    index: int
+    text: str
+    start: int
+    end: int
+    section: str = ""
+    token_count: int = 0
+
+
+# ---------- Token counting ----------
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken missing or its BPE files can't be fetched (offline)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count for the configured model, or a ~4 chars/token estimate
+    when tiktoken is unavailable.
+    """
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# ---------- Segmentation ----------
+
+
+@dataclass(frozen=True)
+class _Segment:
+    start: int
+    end: int
+    section: str
+    tokens: int
+
+
+def _line_spans(text: str) -> Iterable[tuple[int, int]]:
+    start = 0
+    for line in text.splitlines(keepends=True):
+        yield start, start + len(line)
+        start += len(line)
+
+
+def _split_oversized(text: str, start: int, end: int, section: str) -> List[_Segment]:
+    """
+    Break a span that is bigger than one chunk into sentences, and
+    sentences into fixed token windows as a last resort.
+    """
+    pieces: List[_Segment] = []
+    cursor = start
+    boundaries = [m.end() + start for m in _SENTENCE_END_RE.finditer(text[start:end])]
+    for boundary in boundaries + [end]:
+        if boundary <= cursor:
+            continue
+        piece = text[cursor:boundary]
+        tokens = count_tokens(piece)
+        if tokens <= CHUNK_TOKENS:
+            pieces.append(_Segment(cursor, boundary, section, tokens))
+        else:
+            # ~4 chars per token; good enough for a hard split
+            step = CHUNK_TOKENS * 4
+            for s in range(cursor, boundary, step):
+                e = min(s + step, boundary)
+                pieces.append(_Segment(s, e, section, count_tokens(text[s:e])))
+        cursor = boundary
+    return pieces
+
+
+def _segments_for_text(text: str) -> List[_Segment]:
+    """
+    Paragraph segments (blank-line separated); headings start a new section.
+    """
+    segments: List[_Segment] = []
+    section = ""
+    para_start: Optional[int] = None
+    para_end = 0
+
+    def flush() -> None:
+        nonlocal para_start
+        if para_start is None:
+            return
+        if text[para_start:para_end].strip():
+            tokens = count_tokens(text[para_start:para_end])
+            if tokens > CHUNK_TOKENS:
+                segments.extend(_split_oversized(text, para_start, para_end, section))
+            else:
+                segments.append(_Segment(para_start, para_end, section, tokens))
+        para_start = None
+
+    for start, end in _line_spans(text):
+        line = text[start:end].strip()
+        if not line:
+            flush()
+            continue
+        if _HEADING_RE.match(line):
+            flush()
+            section = line.lstrip("#").strip().rstrip(":")
+        if para_start is None:
+            para_start = start
+        para_end = end
+
+    flush()
+    return segments
+
+
+def _segments_for_json(text: str) -> Optional[List[_Segment]]:
+    """
+    Intake documents are json.dumps(..., indent=2) objects; keep each
+    top-level key together and use the key as the section name.
+    """
+    try:
+        parsed = json.loads(text)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(parsed, dict):
+        return None
+
+    segments: List[_Segment] = []
+    key: Optional[str] = None
+    block_start: Optional[int] = None
+    block_end = 0
+
+    def flush() -> None:
+        if block_start is None or key is None:
+            return
+        tokens = count_tokens(text[block_start:block_end])
+        if tokens > CHUNK_TOKENS:
+            segments.extend(_split_oversized(text, block_start, block_end, key))
+        else:
+            segments.append(_Segment(block_start, block_end, key, tokens))
+
+    for start, end in _line_spans(text):
+        match = _JSON_TOP_KEY_RE.match(text[start:end])
+        if match:
+            flush()
+            key = match.group(1)
+            block_start = start
+        if block_start is not None and text[start:end].strip() not in ("{", "}"):
+            block_end = end
+
+    flush()
+    # Compact / single-line JSON has no indented top-level keys: let the
+    # caller fall back to plain-text segmentation
+    return segments or None
+
+
+# ---------- Chunk packing ----------
+
+
+def chunk_text(text: str) -> List[_Segment]:
+    """
+    Pack structure-aware segments into chunks of about CHUNK_TOKENS,
+    overlapping by up to CHUNK_OVERLAP_TOKENS of trailing segments.
+    A new section always starts a new chunk.
+    """
+    if not text or not text.strip():
+        return []
+
+    segments = _segments_for_json(text)
+    if segments is None:
+        segments = _segments_for_text(text)
+
+    chunks: List[_Segment] = []
+    current: List[_Segment] = []
+    current_tokens = 0
+
+    def emit() -> None:
+        if current:
+            chunks.append(
+                _Segment(
+                    current[0].start,
+                    current[-1].end,
+                    current[0].section,
+                    count_tokens(text[current[0].start : current[-1].end]),
+                )
+            )
+
+    for segment in segments:
+        new_section = bool(current) and segment.section != current[0].section
+        if current and (new_section or current_tokens + segment.tokens > CHUNK_TOKENS):
+            emit()
+            # Carry trailing segments of the same section forward as overlap
+            carry: List[_Segment] = []
+            carry_tokens = 0
+            if not new_section:
+                for prev in reversed(current):
+                    if carry_tokens + prev.tokens > CHUNK_OVERLAP_TOKENS:
+                        break
+                    carry.insert(0, prev)
+                    carry_tokens += prev.tokens
+            current, current_tokens = carry, carry_tokens
+
+        current.append(segment)
+        current_tokens += segment.tokens
+
+    emit()
+    return chunks
+
+
+def chunk_document(document_id: str, title: str, content: str) -> List[TextChunk]:
+    """
+    Chunk a single document into TextChunk objects.
+    """
+    content = content or ""
+    return [
+        TextChunk(
+            document_id=document_id,
+            title=title,
+            index=i,
+            text=content[span.start : span.end],
+            start=span.start,
+            end=span.end,
+            section=span.section,
+            token_count=span.tokens,
+        )
+        for i, span in enumerate(chunk_text(content))
+    ]
+
+
+def fit_to_budget(
+    chunks: Iterable[TextChunk],
+    budget: int = CONTEXT_TOKEN_BUDGET,
+) -> List[TextChunk]:
+    """
+    Take chunks in rank order until the token budget is used up.
+    """
+    selected: List[TextChunk] = []
+    used = 0
+    for chunk in chunks:
+        tokens = chunk.token_count or count_tokens(chunk.text)
+        if used + tokens > budget:
+            continue
+        selected.append(chunk)
+        used += tokens
+    return selected
@@ -1,21 +1,226 @@
+import itertools
 import os
+import threading
+import time
+from typing import List, Optional
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
 
+from app.metrics import CallbackMetric, Histogram
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Comma-separated read-replica URLs; reads fall back to the primary when empty
+DATABASE_READ_URLS = [
+    url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()
+]
+# asyncpg URL for the async session; derived from DATABASE_URL when unset
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ---------- Pool settings ----------
+
+# Per worker process. If DB_MAX_CONNECTIONS (the total connection budget
+# for this app) is set, pool size + overflow are derived from it and the
+# uvicorn/gunicorn worker count (WEB_CONCURRENCY) instead.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))          # seconds to wait for a connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))          # seconds; -1 disables
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+# Server-side limits, applied per connection (Postgres only); 0 disables
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", "5000"))
+
+DB_ECHO = _env_bool("DB_ECHO", False)
+
+
+def pool_limits() -> tuple[int, int]:
+    """
+    (pool_size, max_overflow) for each pool in this worker process.
+    """
+    if DB_MAX_CONNECTIONS <= 0:
+        return DB_POOL_SIZE, DB_MAX_OVERFLOW
+    # Every worker holds a sync and an async pool against the primary
+    per_worker = max(1, DB_MAX_CONNECTIONS // (2 * max(1, WEB_CONCURRENCY)))
+    # Keep about two thirds as steady connections, the rest as burst overflow
+    pool_size = max(1, (per_worker * 2) // 3)
+    return pool_size, per_worker - pool_size
+
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,
+# ---------- Pool metrics ----------
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool.",
+    label_names=("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited.
+    """
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, pool=self.metrics_name)
+
+
+_engines: dict[str, Engine] = {}
+
+
+def _pool_values(stat: str):
+    return lambda: {(name,): float(getattr(e.pool, stat)()) for name, e in _engines.items()}
+
+
+DB_POOL_CHECKED_OUT = CallbackMetric(
+    "db_pool_checked_out", "Connections currently checked out.", "gauge", ("pool",),
+    _pool_values("checkedout"),
+)
+DB_POOL_OVERFLOW = CallbackMetric(
+    "db_pool_overflow", "Overflow connections currently open.", "gauge", ("pool",),
+    _pool_values("overflow"),
 )
 
+
+# ---------- Engines ----------
+
+
+def _pool_kwargs(name: str, base_pool: type) -> dict:
+    pool_size, max_overflow = pool_limits()
+    return dict(
+        echo=DB_ECHO,
+        poolclass=type(f"{base_pool.__name__}_{name}", (base_pool,), {"metrics_name": name}),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+def make_engine(url: str, name: str = "primary") -> Engine:
+    """
+    Engine with pool / timeout settings from the environment.
+    """
+    connect_args = {}
+    if url.startswith("postgresql"):
+        options = []
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            options.append(f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}")
+        if DB_LOCK_TIMEOUT_MS > 0:
+            options.append(f"-c lock_timeout={DB_LOCK_TIMEOUT_MS}")
+        if options:
+            connect_args["options"] = " ".join(options)
+        connect_args["application_name"] = f"project-pretzel:{name}"
+
+    engine = create_engine(url, connect_args=connect_args, **_pool_kwargs(name, TimedQueuePool))
+    _engines[name] = engine
+    return engine
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """
+    Asyncio flavour of TimedQueuePool, for AsyncEngine.
+    """
+
+
+def to_async_url(url: str) -> str:
+    """
+    postgresql[+psycopg2]://... -> postgresql+asyncpg://...
+    asyncpg spells libpq's `sslmode` as `ssl`.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        return url
+    query = dict(parsed.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return parsed.set(drivername="postgresql+asyncpg", query=query).render_as_string(
+        hide_password=False
+    )
+
+
+def make_async_engine(url: str, name: str = "primary_async") -> AsyncEngine:
+    """
+    AsyncEngine (asyncpg) with the same pool / timeout settings as make_engine.
+    """
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        settings = {"application_name": f"project-pretzel:{name}"}
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        if DB_LOCK_TIMEOUT_MS > 0:
+            settings["lock_timeout"] = str(DB_LOCK_TIMEOUT_MS)
+        connect_args["server_settings"] = settings
+
+    async_engine = create_async_engine(
+        url, connect_args=connect_args, **_pool_kwargs(name, TimedAsyncQueuePool)
+    )
+    _engines[name] = async_engine.sync_engine
+    return async_engine
+
+
+engine = make_engine(DATABASE_URL)
+
+read_engines: List[Engine] = [
+    make_engine(url, name=f"replica{i}") for i, url in enumerate(DATABASE_READ_URLS, start=1)
+]
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
 )
 
+async_engine = make_async_engine(ASYNC_DATABASE_URL or to_async_url(DATABASE_URL))
+
+# expire_on_commit=False: expired attributes can't be lazy-loaded from async code
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+_read_cycle = itertools.cycle(read_engines) if read_engines else None
+_read_cycle_lock = threading.Lock()
+
+
+def ReadSessionLocal() -> Session:
+    """
+    Session bound to the next read replica (round robin), or to the
+    primary when no replicas are configured. Replicas may lag, so use it
+    only for reads that tolerate slightly stale data.
+    """
+    if _read_cycle is None:
+        return SessionLocal()
+    with _read_cycle_lock:
+        bind: Optional[Engine] = next(_read_cycle)
+    return Session(bind=bind, autoflush=False)
+
+
 Base = declarative_base()
@@ -1,14 +1,24 @@
 # app/deps.py
-from typing import Generator, Optional
+import os
+from typing import Any, AsyncGenerator, Dict, Generator, Hashable, Optional, Tuple
 from uuid import UUID
 
 from fastapi import Depends, Header, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect as sa_inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 
-from app.database import SessionLocal
+from app.cache import LRUCache
+from app.database import AsyncSessionLocal, ReadSessionLocal, SessionLocal
 from app import models
 from app.auth_utils import decode_access_token
 
+# Authenticated users are cached per (user id, token iat) for this long.
+# invalidate_user() drops them at once in this process; other workers
+# notice a change after at most the TTL.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -22,13 +32,64 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    authorization: Optional[str] = Header(default=None),
-) -> models.User:
+def get_read_db() -> Generator[Session, None, None]:
     """
-    Extracts the Bearer token from the Authorization header,
-    decodes it, and returns the current User from the DB.
+    Like get_db, but bound to a read replica when DATABASE_READ_URLS is
+    set. Only for read-only routes that tolerate replica lag.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async counterpart of get_db (asyncpg). Routes using it run on the
+    event loop instead of FastAPI's threadpool; relationships must be
+    eager-loaded, since lazy loads are not allowed on an AsyncSession.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ---------- Current user ----------
+
+_user_cache: LRUCache[models.User] = LRUCache(
+    "current_user", max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS
+)
+# Bumped by invalidate_user(); part of the cache key, so older entries
+# for that user are never read again.
+_user_versions: Dict[UUID, int] = {}
+
+
+def invalidate_user(user_id: UUID) -> None:
+    """
+    Forget cached copies of a user. Call after changing or deactivating it.
+    """
+    _user_versions[user_id] = _user_versions.get(user_id, 0) + 1
+
+
+def _user_cache_key(user_id: UUID, issued_at: Any) -> Hashable:
+    return (user_id, issued_at, _user_versions.get(user_id, 0))
+
+
+def _detached_copy(user: models.User) -> models.User:
+    """
+    Column-only copy of `user` in detached state, safe to share between
+    requests and to db.merge(..., load=False) into any session.
+    """
+    copy = models.User(
+        **{attr.key: getattr(user, attr.key) for attr in sa_inspect(models.User).column_attrs}
+    )
+    make_transient_to_detached(copy)
+    return copy
+
+
+def _token_claims(authorization: Optional[str]) -> Tuple[UUID, Any]:
+    """
+    (user id, iat) from a "Bearer <jwt>" Authorization header; 401 otherwise.
     """
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing Authorization header.")
@@ -48,12 +109,77 @@ def get_current_user(
         user_id = UUID(payload["sub"])
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid token subject.")
+    return user_id, payload.get("iat")
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
 
+def _check_user(user: Optional[models.User]) -> models.User:
     if not user:
         raise HTTPException(status_code=401, detail="User not found.")
     if not user.is_active:
         raise HTTPException(status_code=403, detail="User is inactive.")
 
-    return user
\ No newline at end of file
+    return user
+
+
+def _load_user(db: Session, user_id: UUID, issued_at: Any) -> Optional[models.User]:
+    key = _user_cache_key(user_id, issued_at)
+    cached = _user_cache.get(key)
+    if cached is not None:
+        return db.merge(cached, load=False)
+
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Only active users are cached, so reactivation takes effect at once
+    if user is not None and user.is_active:
+        _user_cache.set(key, _detached_copy(user))
+    return user
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    authorization: Optional[str] = Header(default=None),
+) -> models.User:
+    """
+    Extracts the Bearer token from the Authorization header,
+    decodes it, and returns the current User from the DB.
+    """
+    user_id, issued_at = _token_claims(authorization)
+    return _check_user(_load_user(db, user_id, issued_at))
+
+
+def get_current_user_optional(
+    db: Session = Depends(get_db),
+    authorization: Optional[str] = Header(default=None),
+) -> Optional[models.User]:
+    """
+    Like get_current_user, but returns None if there's no valid Bearer token
+    instead of raising 401/403. Useful for endpoints that are public for
+    global use, but project-specific access can still require auth.
+    """
+    try:
+        user_id, issued_at = _token_claims(authorization)
+    except HTTPException:
+        return None
+
+    user = _load_user(db, user_id, issued_at)
+    if not user or not user.is_active:
+        return None
+    return user
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    authorization: Optional[str] = Header(default=None),
+) -> models.User:
+    """
+    get_current_user for routes on get_async_db (same session).
+    """
+    user_id, issued_at = _token_claims(authorization)
+    key = _user_cache_key(user_id, issued_at)
+    cached = _user_cache.get(key)
+    if cached is not None:
+        return _check_user(await db.merge(cached, load=False))
+
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
+    if user is not None and user.is_active:
+        _user_cache.set(key, _detached_copy(user))
+    return _check_user(user)
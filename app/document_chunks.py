@@ -0,0 +1,154 @@
+# app/document_chunks.py
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.chunking import TextChunk, chunk_document
+from app.database import SessionLocal
+from app import models
+
+
+def store_document_chunks(db: Session, document: models.ProjectDocument) -> List[TextChunk]:
+    """
+    Re-chunk a document and replace its rows in project_document_chunks.
+
+    Runs inside the caller's transaction (call after flush, before commit)
+    so the document and its chunks are written atomically.
+    """
+    chunks = chunk_document(str(document.id), document.title, document.content)
+
+    db.query(models.ProjectDocumentChunk).filter(
+        models.ProjectDocumentChunk.document_id == document.id
+    ).delete(synchronize_session=False)
+
+    db.add_all(
+        models.ProjectDocumentChunk(
+            document_id=document.id,
+            project_id=document.project_id,
+            chunk_index=chunk.index,
+            section=chunk.section[:255] or None,
+            content=chunk.text,
+            start_offset=chunk.start,
+            end_offset=chunk.end,
+            token_count=chunk.token_count,
+        )
+        for chunk in chunks
+    )
+    return chunks
+
+
+def load_project_chunks(project_id: str) -> List[TextChunk]:
+    """
+    All stored chunks for a project. Documents written before chunking
+    existed (no chunk rows yet) are chunked on the fly.
+    """
+    project_uuid = UUID(project_id)
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(
+                models.ProjectDocumentChunk.document_id,
+                models.ProjectDocument.title,
+                models.ProjectDocumentChunk.chunk_index,
+                models.ProjectDocumentChunk.content,
+                models.ProjectDocumentChunk.start_offset,
+                models.ProjectDocumentChunk.end_offset,
+                models.ProjectDocumentChunk.section,
+                models.ProjectDocumentChunk.token_count,
+            )
+            .join(
+                models.ProjectDocument,
+                models.ProjectDocument.id == models.ProjectDocumentChunk.document_id,
+            )
+            .filter(models.ProjectDocumentChunk.project_id == project_uuid)
+            .order_by(
+                models.ProjectDocumentChunk.document_id,
+                models.ProjectDocumentChunk.chunk_index,
+            )
+            .all()
+        )
+
+        chunks = [
+            TextChunk(
+                document_id=str(doc_id),
+                title=title,
+                index=chunk_index,
+                text=content,
+                start=start,
+                end=end,
+                section=section or "",
+                token_count=token_count,
+            )
+            for doc_id, title, chunk_index, content, start, end, section, token_count in rows
+        ]
+
+        unchunked_docs = (
+            db.query(
+                models.ProjectDocument.id,
+                models.ProjectDocument.title,
+                models.ProjectDocument.content,
+            )
+            .filter(
+                models.ProjectDocument.project_id == project_uuid,
+                ~models.ProjectDocument.chunks.any(),
+            )
+            .all()
+        )
+        for doc_id, title, content in unchunked_docs:
+            chunks.extend(chunk_document(str(doc_id), title, content))
+
+        return chunks
+    finally:
+        db.close()
+
+
+def store_missing_chunks(db: Session, project_id: UUID) -> int:
+    """
+    Chunk and store a project's documents that have no chunk rows yet
+    (written before chunking existed). Commits; returns how many
+    documents were chunked. A concurrent backfill of the same document
+    wins and this one is rolled back.
+    """
+    documents = (
+        db.query(models.ProjectDocument)
+        .filter(
+            models.ProjectDocument.project_id == project_id,
+            ~models.ProjectDocument.chunks.any(),
+            func.btrim(models.ProjectDocument.content) != "",
+        )
+        .all()
+    )
+    if not documents:
+        return 0
+    for document in documents:
+        store_document_chunks(db, document)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return 0
+    return len(documents)
+
+
+def backfill_all_chunks(db: Session) -> int:
+    """
+    (Re)chunk every ProjectDocument. Returns the number of documents processed.
+    """
+    count = 0
+    for document in db.query(models.ProjectDocument).all():
+        store_document_chunks(db, document)
+        count += 1
+    db.commit()
+    return count
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        n = backfill_all_chunks(db)
+        print(f"Chunked {n} project documents.")
+    finally:
+        db.close()
@@ -0,0 +1,39 @@
+# app/document_hooks.py
+"""
+Keep derived state (search indexes, cached answers, the "documents"
+HTTP cache scope) in sync with ProjectDocument writes.
+
+Routes that create or update a ProjectDocument call
+`store_document_chunks` before committing, then these hooks AFTER the
+commit succeeds.
+"""
+from typing import List
+from uuid import UUID
+
+from app.chunking import TextChunk
+from app.embedding_index import get_vector_index
+from app.http_cache import touch_project
+from app.models import ProjectDocument
+from app.response_cache import get_response_cache
+from app.text_search import get_document_search
+
+
+def document_saved(document: ProjectDocument, chunks: List[TextChunk]) -> None:
+    """
+    Called after a document is created or its title/content changed,
+    with the chunks that were stored for it.
+    """
+    get_vector_index().upsert_document(document, chunks)
+    get_document_search().document_saved(document, chunks)
+    get_response_cache().invalidate_project(str(document.project_id))
+    touch_project(document.project_id, "documents")
+
+
+def document_deleted(project_id: UUID | str, document_id: UUID | str) -> None:
+    """
+    Called after a document is deleted.
+    """
+    get_vector_index().remove_document(str(project_id), str(document_id))
+    get_document_search().document_deleted(str(project_id), str(document_id))
+    get_response_cache().invalidate_project(str(project_id))
+    touch_project(project_id, "documents")
@@ -0,0 +1,288 @@
+# app/embedding_index.py
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.chunking import TextChunk
+from app.document_chunks import load_project_chunks
+from app.models import ProjectDocument
+
+load_dotenv()
+
+# "hashing" (offline, deterministic) or "openai"
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "hashing")
+EMBEDDING_DIM = int(os.getenv("RAG_EMBEDDING_DIM", "512"))
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Chunks scoring below this cosine similarity are treated as irrelevant
+MIN_SCORE = float(os.getenv("RAG_MIN_SCORE", "0.1"))
+
+# Other workers may change documents; rebuild a project's index from the
+# DB once it is older than this many seconds.
+INDEX_MAX_AGE_SECONDS = float(os.getenv("RAG_INDEX_MAX_AGE_SECONDS", "300"))
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+# ---------- Embedding backends ----------
+
+
+class EmbeddingBackend:
+    """
+    Turns texts into L2-normalized float32 vectors of shape (n, dim).
+    """
+
+    dim: int
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Deterministic, offline embedding using the hashing trick over
+    unigrams + bigrams with sublinear term frequency.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        sign = 1.0 if value & 1 else -1.0
+        return (value >> 1) % self.dim, sign
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_RE.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+            counts: Dict[str, int] = {}
+            for feature in features:
+                counts[feature] = counts.get(feature, 0) + 1
+
+            for feature, count in counts.items():
+                bucket, sign = self._bucket(feature)
+                matrix[row, bucket] += sign * (1.0 + math.log(count))
+
+        return _normalize(matrix)
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    OpenAI embeddings via langchain_openai. Needs network + API key.
+    """
+
+    def __init__(self, model: str = OPENAI_EMBEDDING_MODEL):
+        from langchain_openai import OpenAIEmbeddings
+
+        self._client = OpenAIEmbeddings(model=model)
+        self.dim = len(self._client.embed_query("dimension probe"))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        vectors = self._client.embed_documents(texts)
+        return _normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def get_embedding_backend(name: str = EMBEDDING_BACKEND) -> EmbeddingBackend:
+    if name == "openai":
+        return OpenAIEmbeddingBackend()
+    if name == "hashing":
+        return HashingEmbeddingBackend()
+    raise ValueError(f"Unknown RAG_EMBEDDING_BACKEND: {name!r}")
+
+
+# ---------- Per-project vector index ----------
+
+
+class ProjectVectorIndex:
+    """
+    Chunk vectors for one project stored in a single (n, dim) float32 matrix.
+
+    The matrix and its chunk list form one immutable snapshot; updates
+    build a new one and swap it in with a single assignment, so searches
+    never see a half-updated index and don't need a lock.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._snapshot: Tuple[np.ndarray, Tuple[TextChunk, ...]] = (
+            np.zeros((0, dim), dtype=np.float32),
+            (),
+        )
+        self.built_at = time.monotonic()
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._snapshot[0]
+
+    @property
+    def chunks(self) -> Tuple[TextChunk, ...]:
+        return self._snapshot[1]
+
+    @staticmethod
+    def _without(
+        snapshot: Tuple[np.ndarray, Tuple[TextChunk, ...]],
+        document_ids: Set[str],
+    ) -> Tuple[np.ndarray, Tuple[TextChunk, ...]]:
+        matrix, chunks = snapshot
+        keep = [i for i, c in enumerate(chunks) if c.document_id not in document_ids]
+        if len(keep) == len(chunks):
+            return snapshot
+        return matrix[keep], tuple(chunks[i] for i in keep)
+
+    def upsert(self, chunks: List[TextChunk], vectors: np.ndarray) -> None:
+        matrix, kept = self._without(self._snapshot, {c.document_id for c in chunks})
+        if chunks:
+            matrix, kept = np.vstack([matrix, vectors]), kept + tuple(chunks)
+        self._snapshot = (matrix, kept)
+
+    def remove(self, document_ids: Iterable[str]) -> None:
+        document_ids = set(document_ids)
+        if document_ids:
+            self._snapshot = self._without(self._snapshot, document_ids)
+
+    def search(self, query_vector: np.ndarray, k: int) -> List[tuple[float, TextChunk]]:
+        matrix, chunks = self._snapshot
+        if not chunks:
+            return []
+
+        scores = matrix @ query_vector
+        k = min(k, len(chunks))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), chunks[i]) for i in top]
+
+
+class VectorIndexRegistry:
+    """
+    Process-wide map of project_id -> ProjectVectorIndex.
+
+    Indexes are built lazily from the DB on first search and then kept
+    up to date through `upsert_document` / `remove_document`. Each
+    project has its own lock, so a (re)build only blocks that project,
+    and document updates embed their chunks before taking it.
+    """
+
+    def __init__(self, backend: EmbeddingBackend):
+        self.backend = backend
+        self._indexes: Dict[str, ProjectVectorIndex] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()  # guards _locks only
+
+    def _project_lock(self, project_id: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(project_id)
+            if lock is None:
+                lock = self._locks[project_id] = threading.Lock()
+            return lock
+
+    def _build(self, project_id: str) -> ProjectVectorIndex:
+        index = ProjectVectorIndex(self.backend.dim)
+        chunks = load_project_chunks(project_id)
+        if chunks:
+            index.upsert(chunks, self.backend.embed([_chunk_input(c) for c in chunks]))
+        return index
+
+    def get(self, project_id: str) -> ProjectVectorIndex:
+        index = self._indexes.get(project_id)
+        if index is not None and time.monotonic() - index.built_at < INDEX_MAX_AGE_SECONDS:
+            return index
+
+        lock = self._project_lock(project_id)
+        # Another thread is already rebuilding a stale index: keep serving it
+        if not lock.acquire(blocking=index is None):
+            return index
+        try:
+            index = self._indexes.get(project_id)
+            if index is None or time.monotonic() - index.built_at >= INDEX_MAX_AGE_SECONDS:
+                index = self._build(project_id)
+                self._indexes[project_id] = index
+            return index
+        finally:
+            lock.release()
+
+    def upsert_document(self, document: ProjectDocument, chunks: List[TextChunk]) -> None:
+        project_id = str(document.project_id)
+        lock = self._project_lock(project_id)
+        # Waits for a build in progress (possibly the first one, which may
+        # have read the DB before this document was committed)
+        with lock:
+            if project_id not in self._indexes:
+                # Not loaded yet; the first search will build it from the DB.
+                return
+        vectors = self.backend.embed([_chunk_input(c) for c in chunks]) if chunks else None
+        with lock:
+            index = self._indexes.get(project_id)
+            if index is None:
+                return
+            if vectors is None:
+                index.remove([str(document.id)])
+                return
+            index.upsert(chunks, vectors)
+
+    def remove_document(self, project_id: str, document_id: str) -> None:
+        with self._project_lock(project_id):
+            index = self._indexes.get(project_id)
+            if index is not None:
+                index.remove([document_id])
+
+    def search(
+        self,
+        project_id: str,
+        query: str,
+        k: int = 3,
+        min_score: float = MIN_SCORE,
+    ) -> List[tuple[float, TextChunk]]:
+        """
+        Top-k chunks for `query` by cosine similarity.
+        """
+        index = self.get(project_id)
+        if not index.chunks:
+            return []
+
+        query_vector = self.backend.embed([query])[0]
+        return [
+            (score, chunk)
+            for score, chunk in index.search(query_vector, k)
+            if score >= min_score
+        ]
+
+
+def _chunk_input(chunk: TextChunk) -> str:
+    # Title is included so "roof spec" can match a doc titled "Roofing".
+    return f"{chunk.title}\n{chunk.text}"
+
+
+_registry: Optional[VectorIndexRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_vector_index() -> VectorIndexRegistry:
+    """
+    Shared registry, created on first use so importing this module
+    doesn't call out to an embedding provider.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = VectorIndexRegistry(get_embedding_backend())
+    return _registry
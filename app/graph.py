@@ -1,7 +1,8 @@
 import os
 import re
 import math
-from typing import TypedDict, List, Optional, Dict, Any
+import operator
+from typing import Annotated, TypedDict, List, Optional, Dict, Any
 import uuid
 from uuid import UUID
 
@@ -11,13 +12,22 @@ from langgraph.graph import StateGraph, END
 
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
-from app.models import Project, ProjectMember, Role, ProjectDocument
+from app.models import Project, ProjectMember, Role
+from app.cache import LRUCache
+from app.chunking import TextChunk
+from app.embedding_index import get_vector_index
+from app.intent_router import intent_router
+from app.permissions import role_has_permission
+from app.prompt_assembly import assemble_prompt
+from app.response_cache import RESPONSE_CACHE_MAX_HISTORY, get_response_cache
+from app.text_search import get_document_search
 
 
 # Load environment variables once when this module is imported
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+CALCULATOR_CACHE_SIZE = int(os.getenv("CALCULATOR_CACHE_SIZE", "4096"))
 
 if not OPENAI_API_KEY:
     raise ValueError(
@@ -27,15 +37,18 @@ if not OPENAI_API_KEY:
 
 # ---------- GRAPH STATE ----------
 
-class ChatState(TypedDict):
-    # Conversation history in "USER: ..." / "ASSISTANT: ..." format
-    messages: List[str]
+class ChatState(TypedDict, total=False):
+    # Conversation history in "USER: ..." / "ASSISTANT: ..." format.
+    # Nodes return only their new turns; the reducer appends them.
+    messages: Annotated[List[str], operator.add]
     # Active project this chat is about (UUID as string)
     projectId: Optional[str]
     # who is asking
     userId: Optional[str]
     # their role in that project (e.g., "PROJECT_MANAGER")
     roleKey: Optional[str]
+    # Token count per prompt section of the LLM call, if one was made
+    promptTokens: Optional[Dict[str, int]]
 
 
 # Create LLM client (shared by all nodes)
@@ -44,6 +57,11 @@ llm = ChatOpenAI(
     api_key=OPENAI_API_KEY,
 )
 
+# LLM calls that produce the user-facing answer carry this tag, so
+# graph.stream(stream_mode="messages") consumers can forward their tokens
+# and skip internal calls (e.g. history summaries).
+ANSWER_TAG = "answer"
+
 
 # ---------- Construction Measurement Helper (feet/inches) ----------
 
@@ -80,19 +98,11 @@ def parse_feet_inches(text: str) -> Optional[float]:
     return feet * 12 + inches
 
 
-def construction_measurement_node(state: ChatState) -> ChatState:
+def measurement_reply(text: str) -> str:
     """
-    Node that acts as a construction-specific calculator for measurements.
-    It looks at the last USER message, tries to parse a feet/inches value,
-    and responds with a handy breakdown.
+    Construction-specific calculator for measurements: parse a feet/inches
+    value from the user's text and respond with a handy breakdown.
     """
-    last = state["messages"][-1]
-    # Strip "USER:" prefix if present
-    if last.lower().startswith("user:"):
-        text = last[5:].strip()
-    else:
-        text = last
-
     total_inches = parse_feet_inches(text)
 
     if total_inches is None:
@@ -115,13 +125,14 @@ def construction_measurement_node(state: ChatState) -> ChatState:
             f" - Feet & inches: {feet_inches_str}\n"
         )
 
-    new_messages = state["messages"] + [f"ASSISTANT: {reply}"]
-    return {
-        "messages": new_messages,
-        "projectId": state.get("projectId"),
-        "userId": state.get("userId"),
-        "roleKey": state.get("roleKey"),
-    }
+    return reply
+
+
+def construction_measurement_node(state: ChatState) -> ChatState:
+    """
+    Node that acts as a construction-specific calculator for measurements.
+    """
+    return _calculator_node(state, "measure")
 
 
 # ---------- Board-Foot Helper ----------
@@ -175,16 +186,10 @@ def parse_board_foot(text: str) -> Optional[dict]:
     }
 
 
-def board_foot_node(state: ChatState) -> ChatState:
+def board_foot_reply(text: str) -> str:
     """
-    Node that calculates board feet for dimensional lumber.
+    Calculate board feet for dimensional lumber.
     """
-    last = state["messages"][-1]
-    if last.lower().startswith("user:"):
-        text = last[5:].strip()
-    else:
-        text = last
-
     parsed = parse_board_foot(text)
 
     if not parsed:
@@ -211,13 +216,14 @@ def board_foot_node(state: ChatState) -> ChatState:
             f" - Total board feet: {total_bf:.2f} bf\n"
         )
 
-    new_messages = state["messages"] + [f"ASSISTANT: {reply}"]
-    return {
-        "messages": new_messages,
-        "projectId": state.get("projectId"),
-        "userId": state.get("userId"),
-        "roleKey": state.get("roleKey"),
-    }
+    return reply
+
+
+def board_foot_node(state: ChatState) -> ChatState:
+    """
+    Node that calculates board feet for dimensional lumber.
+    """
+    return _calculator_node(state, "board_foot")
 
 
 # ---------- Sheet Count Helper (Tool 1) ----------
@@ -271,17 +277,11 @@ def parse_sheet_area(text: str) -> float:
     return default_area
 
 
-def sheet_count_node(state: ChatState) -> ChatState:
+def sheet_count_reply(text: str) -> str:
     """
-    Node that estimates how many sheets are needed to cover an area.
+    Estimate how many sheets are needed to cover an area.
     Assumes flat coverage (no waste factor, corners, openings, etc.).
     """
-    last = state["messages"][-1]
-    if last.lower().startswith("user:"):
-        text = last[5:].strip()
-    else:
-        text = last
-
     area = parse_area_sqft(text)
     if area is None:
         reply = (
@@ -305,13 +305,14 @@ def sheet_count_node(state: ChatState) -> ChatState:
             "Note: This does not include waste, cuts, or openings."
         )
 
-    new_messages = state["messages"] + [f"ASSISTANT: {reply}"]
-    return {
-        "messages": new_messages,
-        "projectId": state.get("projectId"),
-        "userId": state.get("userId"),
-        "roleKey": state.get("roleKey"),
-    }
+    return reply
+
+
+def sheet_count_node(state: ChatState) -> ChatState:
+    """
+    Node that estimates how many sheets are needed to cover an area.
+    """
+    return _calculator_node(state, "sheet")
 
 
 # ---------- Material Cost Estimator (Tool 5) ----------
@@ -360,39 +361,27 @@ def parse_quantity_with_unit(text: str) -> Optional[int]:
     return None
 
 
-def material_cost_node(state: ChatState) -> ChatState:
+COST_PERMISSION = "financials.view_budget"
+TEAM_PERMISSION = "member.manage"
+
+
+def material_cost_reply(text: str, can_view_costs: bool) -> str:
     """
     Estimate material cost based on:
       - board-foot dimensions + price per bf
       - OR quantity + price per unit (sheets/boards/etc.)
 
-    Role-aware behavior:
-      - PROJECT_MANAGER and ESTIMATOR roles get full cost breakdown
+    Permission-aware behavior:
+      - roles with financials.view_budget (by default PROJECT_MANAGER and
+        ESTIMATOR) get the full cost breakdown
       - Others are told that detailed cost visibility is restricted
     """
-    role_key = state.get("roleKey")
-
-    allowed_roles_for_cost = {"PROJECT_MANAGER", "ESTIMATOR"}
-    if role_key not in allowed_roles_for_cost:
-        reply = (
+    if not can_view_costs:
+        return (
             "I can help you with quantities and measurements, but detailed "
             "material cost estimates are restricted to the Project Manager "
             "or Estimator. Please ask them for the exact cost breakdown."
         )
-        return {
-            "messages": state["messages"] + [f"ASSISTANT: {reply}"],
-            "projectId": state.get("projectId"),
-            "userId": state.get("userId"),
-            "roleKey": role_key,
-        }
-
-    # --- existing cost logic below this line ---
-
-    last = state["messages"][-1]
-    if last.lower().startswith("user:"):
-        text = last[5:].strip()
-    else:
-        text = last
 
     t = text.lower()
 
@@ -458,86 +447,135 @@ def material_cost_node(state: ChatState) -> ChatState:
                 f" - Estimated material cost: ${total_cost:.2f}\n"
             )
 
-    new_messages = state["messages"] + [f"ASSISTANT: {reply}"]
+    return reply
+
+
+def material_cost_node(state: ChatState) -> ChatState:
+    """
+    Node that estimates material cost (role-aware, see material_cost_reply).
+    """
+    return _calculator_node(state, "cost")
+
+
+# ---------- Calculator reply cache ----------
+
+# Calculator replies are pure functions of (route, text, permission), so
+# they are memoized on normalized text. Only the cost reply depends on the
+# caller, and only through whether their role has COST_PERMISSION.
+CALCULATOR_ROUTES = {"measure", "board_foot", "sheet", "cost"}
+ROLE_DEPENDENT_ROUTES = {"cost"}
+
+_calculator_cache: LRUCache[str] = LRUCache("calculator", max_size=CALCULATOR_CACHE_SIZE)
+
+
+def _normalize_calculator_text(text: str) -> str:
+    # Every calculator parser lowercases its input; whitespace is insignificant
+    return " ".join(text.lower().split())
+
+
+def calculator_reply(route: str, text: str, role_key: Optional[str] = None) -> str:
+    """
+    Reply for a calculator route, served from the LRU cache when possible.
+    """
+    text = _normalize_calculator_text(text)
+    can_view_costs = route in ROLE_DEPENDENT_ROUTES and role_has_permission(role_key, COST_PERMISSION)
+
+    def compute() -> str:
+        if route == "measure":
+            return measurement_reply(text)
+        if route == "board_foot":
+            return board_foot_reply(text)
+        if route == "sheet":
+            return sheet_count_reply(text)
+        if route == "cost":
+            return material_cost_reply(text, can_view_costs)
+        raise ValueError(f"Not a calculator route: {route!r}")
+
+    return _calculator_cache.get_or_compute((route, text, can_view_costs), compute)
+
+
+def _calculator_node(state: ChatState, route: str) -> ChatState:
+    last = state["messages"][-1]
+    # Strip "USER:" prefix if present
+    if last.lower().startswith("user:"):
+        text = last[5:].strip()
+    else:
+        text = last
+
+    reply = calculator_reply(route, text, state.get("roleKey"))
     return {
-        "messages": new_messages,
+        "messages": [f"ASSISTANT: {reply}"],
         "projectId": state.get("projectId"),
         "userId": state.get("userId"),
-        "roleKey": role_key,
+        "roleKey": state.get("roleKey"),
     }
 
 
 # ---------- Project Document RAG Helpers ----------
 
-def _fetch_project_documents(project_id: str) -> List[ProjectDocument]:
+def _get_top_project_docs(
+    project_id: Optional[str],
+    question: str,
+    k: int = 8,
+) -> List[TextChunk]:
     """
-    Load all documents for a given project UUID string.
-    Returns an empty list if project_id is invalid or no docs exist.
+    Return up to k of the most relevant document chunks for this
+    project + question, ranked by cosine similarity in the project's
+    vector index. The prompt assembler trims them to the token budget.
     """
+    if not project_id:
+        return []
+
     try:
-        project_uuid = UUID(project_id)
+        UUID(project_id)
     except (ValueError, TypeError):
         return []
 
-    db: Session = SessionLocal()
-    try:
-        docs = (
-            db.query(ProjectDocument)
-            .filter(ProjectDocument.project_id == project_uuid)
-            .order_by(ProjectDocument.created_at.desc())
-            .all()
-        )
-        return docs
-    finally:
-        db.close()
+    hits = get_vector_index().search(project_id, question, k=k)
+    return [chunk for _, chunk in hits]
 
 
-def _score_doc_relevance(doc: ProjectDocument, query: str) -> int:
+def _response_cacheable(state: ChatState) -> bool:
     """
-    Very simple relevance scoring:
-    - tokenizes the query
-    - counts how many query tokens appear in title+content (case-insensitive)
+    Cached answers are only used for project questions asked with little
+    or no prior conversation, where the question stands on its own.
     """
-    query_tokens = set(re.findall(r"\w+", query.lower()))
-    if not query_tokens:
-        return 0
-
-    text = f"{doc.title}\n{doc.content}".lower()
-    score = 0
-    for token in query_tokens:
-        if token in text:
-            score += 1
-    return score
+    prior_turns = len(state["messages"]) - 1
+    return bool(state.get("projectId")) and prior_turns <= RESPONSE_CACHE_MAX_HISTORY
 
 
-def _get_top_project_docs(
-    project_id: Optional[str],
-    question: str,
-    k: int = 3,
-) -> List[tuple[str, str]]:
+def _cache_scope(state: ChatState, node: str) -> Optional[str]:
     """
-    Return up to k (title, content) tuples of the most relevant docs
-    for this project + question, using the simple keyword-overlap scorer.
+    Response-cache scope (including the document version) as of now;
+    None when the question isn't cacheable.
     """
-    if not project_id:
-        return []
+    if not _response_cacheable(state):
+        return None
+    return get_response_cache().scope(state["projectId"], state.get("roleKey"), node)
 
-    docs = _fetch_project_documents(project_id)
-    if not docs:
-        return []
 
-    scored: List[tuple[int, ProjectDocument]] = []
-    for d in docs:
-        score = _score_doc_relevance(d, question)
-        if score > 0:
-            scored.append((score, d))
+def _cached_answer(scope: Optional[str], question: str) -> Optional[str]:
+    if scope is None:
+        return None
+    entry = get_response_cache().lookup(scope, question)
+    return entry.reply if entry else None
 
-    if not scored:
-        return []
 
-    scored.sort(key=lambda pair: pair[0], reverse=True)
-    top_docs = [d for _, d in scored[:k]]
-    return [(d.title, d.content) for d in top_docs]
+def _remember_answer(
+    scope: Optional[str],
+    question: str,
+    reply: str,
+    prompt_tokens: Dict[str, int],
+) -> None:
+    if scope is not None:
+        get_response_cache().store(scope, question, reply, prompt_tokens)
+
+
+def _complete(prompt: str) -> str:
+    """
+    Plain LLM completion, used to summarize older conversation turns.
+    """
+    return llm.invoke(prompt).content
 
 
 # ---------- Assistant Node (general chat with project RAG) ----------
@@ -546,10 +584,9 @@ def assistant_node(state: ChatState) -> ChatState:
     """
     General assistant powered by the LLM.
 
-    If a projectId is present in the state, it will:
-      - fetch project documents
-      - select the most relevant ones
-      - pass them into the LLM as context for RAG-style answers
+    Builds a token-budgeted prompt from:
+      - a rolling summary of older turns + the most recent turns verbatim
+      - if a projectId is present, the most relevant project document chunks
     """
     last = state["messages"][-1]
     if last.lower().startswith("user:"):
@@ -559,32 +596,46 @@ def assistant_node(state: ChatState) -> ChatState:
 
     project_id = state.get("projectId")
 
+    cache_scope = _cache_scope(state, "assistant")
+    cached = _cached_answer(cache_scope, user_text)
+    if cached is not None:
+        return {
+            "messages": [f"ASSISTANT: {cached}"],
+            "projectId": project_id,
+            "userId": state.get("userId"),
+            "roleKey": state.get("roleKey"),
+        }
+
     # --- RAG: pull relevant project docs, if any ---
-    top_docs = _get_top_project_docs(project_id, user_text, k=3)
+    top_docs = _get_top_project_docs(project_id, user_text)
 
+    instructions = ""
     if top_docs:
-        docs_block = "\n\n".join(
-            f"[Document: {title}]\n{content}"
-            for title, content in top_docs
-        )
-        prompt = (
+        instructions = (
             "You are a construction/project assistant. Use the project documents below "
             "if they are relevant to the user's question. If they are not relevant, "
-            "answer from your own knowledge but do NOT invent project-specific facts.\n\n"
-            f"{docs_block}\n\n"
-            f"User question: {user_text}"
+            "answer from your own knowledge but do NOT invent project-specific facts."
         )
-    else:
-        prompt = user_text
 
-    response = llm.invoke(prompt)
+    prompt = assemble_prompt(
+        user_text,
+        history=state["messages"][:-1],
+        chunks=top_docs,
+        instructions=instructions,
+        complete=_complete,
+        model=MODEL,
+    )
+
+    response = llm.invoke(prompt.text, config={"tags": [ANSWER_TAG]})
     ai_reply = response.content
+    _remember_answer(cache_scope, user_text, ai_reply, prompt.tokens)
 
     return {
-        "messages": state["messages"] + [f"ASSISTANT: {ai_reply}"],
+        "messages": [f"ASSISTANT: {ai_reply}"],
         "projectId": project_id,
         "userId": state.get("userId"),
         "roleKey": state.get("roleKey"),
+        "promptTokens": prompt.tokens,
     }
 
 
@@ -594,7 +645,7 @@ def project_info_node(state: ChatState) -> ChatState:
     """
     Returns a summary of the project based on projectId inside the state.
     Behavior varies by role:
-      - PROJECT_MANAGER: full overview including members
+      - roles with member.manage (PROJECT_MANAGER): full overview including members
       - Others: basic project info, limited team details
     """
     project_id_str = state.get("projectId")
@@ -606,7 +657,7 @@ def project_info_node(state: ChatState) -> ChatState:
             "Try asking again from inside an active project."
         )
         return {
-            "messages": state["messages"] + [f"ASSISTANT: {reply}"],
+            "messages": [f"ASSISTANT: {reply}"],
             "projectId": project_id_str,
             "userId": state.get("userId"),
             "roleKey": role_key,
@@ -620,7 +671,7 @@ def project_info_node(state: ChatState) -> ChatState:
             "Please try again from an active project."
         )
         return {
-            "messages": state["messages"] + [f"ASSISTANT: {reply}"],
+            "messages": [f"ASSISTANT: {reply}"],
             "projectId": project_id_str,
             "userId": state.get("userId"),
             "roleKey": role_key,
@@ -635,7 +686,7 @@ def project_info_node(state: ChatState) -> ChatState:
                 "It may have been deleted or you may not have access."
             )
             return {
-                "messages": state["messages"] + [f"ASSISTANT: {reply}"],
+                "messages": [f"ASSISTANT: {reply}"],
                 "projectId": project_id_str,
                 "userId": state.get("userId"),
                 "roleKey": role_key,
@@ -649,8 +700,7 @@ def project_info_node(state: ChatState) -> ChatState:
         )
 
         # Decide if this role can see full team details
-        privileged_roles = {"PROJECT_MANAGER"}  # expand later as needed
-        can_view_full_team = role_key in privileged_roles
+        can_view_full_team = role_has_permission(role_key, TEAM_PERMISSION)
 
         if can_view_full_team:
             member_lines = []
@@ -681,7 +731,7 @@ def project_info_node(state: ChatState) -> ChatState:
         db.close()
 
     return {
-        "messages": state["messages"] + [f"ASSISTANT: {reply}"],
+        "messages": [f"ASSISTANT: {reply}"],
         "projectId": project_id_str,
         "userId": state.get("userId"),
         "roleKey": role_key,
@@ -693,8 +743,10 @@ def document_search_node(state: ChatState) -> ChatState:
     RAG-lite node: search project documents and answer using their content.
 
     - Requires projectId in state
-    - Searches title/content with a simple ILIKE text search
-    - Feeds top matches into the LLM along with the user's question
+    - Ranks document chunks with the configured search backend
+      (in-memory BM25 or Postgres full-text, see app/text_search.py)
+    - Feeds the top chunks that fit the model's RAG token budget into the
+      LLM along with the user's question and compacted history
     """
     project_id_str = state.get("projectId")
     role_key = state.get("roleKey")
@@ -712,7 +764,7 @@ def document_search_node(state: ChatState) -> ChatState:
             "Try asking again from inside an active project."
         )
         return {
-            "messages": state["messages"] + [f"ASSISTANT: {reply}"],
+            "messages": [f"ASSISTANT: {reply}"],
             "projectId": project_id_str,
             "userId": user_id,
             "roleKey": role_key,
@@ -726,72 +778,62 @@ def document_search_node(state: ChatState) -> ChatState:
             "seems invalid. Please try again from an active project."
         )
         return {
-            "messages": state["messages"] + [f"ASSISTANT: {reply}"],
+            "messages": [f"ASSISTANT: {reply}"],
             "projectId": project_id_str,
             "userId": user_id,
             "roleKey": role_key,
         }
 
-    db: Session = SessionLocal()
-    try:
-        # Basic text search against project documents
-        q = (
-            db.query(ProjectDocument)
-            .filter(ProjectDocument.project_id == project_uuid)
-            .filter(
-                (ProjectDocument.title.ilike(f"%{query_text}%"))
-                | (ProjectDocument.content.ilike(f"%{query_text}%"))
-            )
-            .order_by(ProjectDocument.created_at.desc())
-            .limit(5)
-        )
-
-        docs = q.all()
-
-        if not docs:
-            reply = (
-                "I searched the project documents but couldn't find anything clearly "
-                "related to your question. Try rephrasing or adding more detail."
-            )
-            return {
-                "messages": state["messages"] + [f"ASSISTANT: {reply}"],
-                "projectId": project_id_str,
-                "userId": user_id,
-                "roleKey": role_key,
-            }
-
-        # Build a context string from the top documents
-        context_chunks = []
-        for idx, d in enumerate(docs, start=1):
-            snippet = d.content[:600]  # first 600 chars
-            context_chunks.append(
-                f"Document {idx} - {d.title}:\n{snippet}\n"
-            )
+    cache_scope = _cache_scope(state, "doc_search")
+    cached = _cached_answer(cache_scope, query_text)
+    if cached is not None:
+        return {
+            "messages": [f"ASSISTANT: {cached}"],
+            "projectId": project_id_str,
+            "userId": user_id,
+            "roleKey": role_key,
+        }
 
-        context_text = "\n\n".join(context_chunks)
+    hits = get_document_search().search(str(project_uuid), query_text, k=10)
 
-        prompt = (
-            "You are an AI assistant helping with a construction project. "
-            "Use ONLY the following project documents to answer the user's question. "
-            "If the documents do not contain the answer, say you couldn't find "
-            "anything definitive in the project documents.\n\n"
-            f"User's question:\n{query_text}\n\n"
-            f"Project documents:\n{context_text}\n\n"
-            "Now provide a concise, helpful answer referencing the documents when appropriate."
+    if not hits:
+        reply = (
+            "I searched the project documents but couldn't find anything clearly "
+            "related to your question. Try rephrasing or adding more detail."
         )
-
-        response = llm.invoke(prompt)
-        ai_reply = response.content
-
         return {
-            "messages": state["messages"] + [f"ASSISTANT: {ai_reply}"],
+            "messages": [f"ASSISTANT: {reply}"],
             "projectId": project_id_str,
             "userId": user_id,
             "roleKey": role_key,
         }
 
-    finally:
-        db.close()
+    prompt = assemble_prompt(
+        query_text,
+        history=state["messages"][:-1],
+        chunks=[hit.chunk for hit in hits],
+        instructions=(
+            "You are an AI assistant helping with a construction project. "
+            "Use ONLY the following project document excerpts to answer the user's question. "
+            "If the excerpts do not contain the answer, say you couldn't find "
+            "anything definitive in the project documents. Provide a concise, "
+            "helpful answer referencing the documents when appropriate."
+        ),
+        complete=_complete,
+        model=MODEL,
+    )
+
+    response = llm.invoke(prompt.text, config={"tags": [ANSWER_TAG]})
+    ai_reply = response.content
+    _remember_answer(cache_scope, query_text, ai_reply, prompt.tokens)
+
+    return {
+        "messages": [f"ASSISTANT: {ai_reply}"],
+        "projectId": project_id_str,
+        "userId": user_id,
+        "roleKey": role_key,
+        "promptTokens": prompt.tokens,
+    }
 
 
 # ---------- Router Node + Routing Logic ----------
@@ -801,7 +843,7 @@ def router_identity(state: ChatState) -> ChatState:
     Router node doesn't change state; it just exists so we can attach
     conditional edges based on the latest user message.
     """
-    return state
+    return {}
 
 
 def route_from_text(state: ChatState) -> str:
@@ -816,101 +858,16 @@ def route_from_text(state: ChatState) -> str:
         "measure"      -> construction_measurement_node
         "doc_search"   -> document_search_node
         "chat"         -> assistant_node
+
+    Scoring rules live in app/intent_router.py.
     """
     last = state["messages"][-1]
     if last.lower().startswith("user:"):
-        text = last[5:].strip().lower()
+        text = last[5:].strip()
     else:
-        text = last.lower()
-
-    # Project-related questions
-    project_keywords = [
-        "project overview",
-        "project summary",
-        "about this project",
-        "what is this project",
-        "project info",
-        "team",
-        "members",
-        "who is on this project",
-        "who is on the team",
-    ]
-    if any(k in text for k in project_keywords):
-        return "project_info"
-
-    # Document / specs questions
-    doc_keywords = [
-        "spec",
-        "specs",
-        "specification",
-        "document",
-        "documents",
-        "docs",
-        "plans",
-        "blueprint",
-        "rfis",
-        "rfi",
-        "change order",
-        "submittal",
-    ]
-    if any(k in text for k in doc_keywords):
-        return "doc_search"
-
-    # Cost-focused queries
-    cost_keywords = [
-        "cost",
-        "price",
-        "total",
-        "material",
-        "per sheet",
-        "per board",
-        "per bf",
-        "$",
-    ]
-    if any(k in text for k in cost_keywords):
-        return "cost"
-
-    # Explicit board-foot requests
-    board_foot_keywords = [
-        "board foot",
-        "board feet",
-        "bf",
-    ]
-    if any(k in text for k in board_foot_keywords):
-        return "board_foot"
-
-    # Sheet-related requests
-    sheet_keywords = [
-        "sheet",
-        "sheets",
-        "drywall",
-        "plywood",
-        "osb",
-        "panel",
-        "panels",
-        "sq ft",
-        "sqft",
-        "square feet",
-        "sf",
-    ]
-    if any(k in text for k in sheet_keywords):
-        return "sheet"
-
-    # Measurement (length) requests
-    measurement_keywords = [
-        "ft", "feet", "foot",
-        "in", "inch", "inches",
-        "'", "\"",
-        "measurement",
-        "convert",
-        "stud",
-        "2x4",
-        "framing",
-    ]
-    if any(k in text for k in measurement_keywords):
-        return "measure"
-
-    return "chat"
+        text = last
+
+    return intent_router.route(text)
 
 
 def build_graph():
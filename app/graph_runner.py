@@ -0,0 +1,181 @@
+# app/graph_runner.py
+"""
+Run the (synchronous) LangGraph pipeline off the event loop.
+
+Graph nodes make blocking OpenAI HTTP calls and SQLAlchemy queries. Calling
+them directly from an `async def` route stalls every other request on the
+worker, so chat routes hand graph runs to a dedicated, bounded thread pool:
+
+  GRAPH_MAX_CONCURRENCY  graph runs executing at once per worker (0 = run
+                         inline on the event loop, the old behavior)
+  GRAPH_MAX_PENDING      runs allowed to wait for a free thread before new
+                         requests get 503
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, TypeVar
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.metrics import Histogram
+
+load_dotenv()
+
+GRAPH_MAX_CONCURRENCY = int(os.getenv("GRAPH_MAX_CONCURRENCY", "8"))
+GRAPH_MAX_PENDING = int(os.getenv("GRAPH_MAX_PENDING", "64"))
+
+GRAPH_QUEUE_WAIT = Histogram(
+    "chat_graph_queue_wait_seconds",
+    "Time a chat graph run waited for a free graph worker thread.",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+
+T = TypeVar("T")
+
+
+class GraphRunner:
+    """
+    Bounded thread pool for graph runs, with a cap on queued work.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = GRAPH_MAX_CONCURRENCY,
+        max_pending: int = GRAPH_MAX_PENDING,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if max_concurrency > 0:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_concurrency,
+                thread_name_prefix="graph",
+            )
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _check_capacity(self) -> None:
+        if self._in_flight >= self.max_concurrency + self.max_pending:
+            raise HTTPException(
+                status_code=503,
+                detail="The assistant is busy. Please try again in a moment.",
+            )
+
+    def _reserve(self) -> None:
+        with self._lock:
+            self._check_capacity()
+            self._in_flight += 1
+
+    def _release(self, _future: Any = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _submit(self, fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        """
+        Submit an already reserved run. The slot is released when the worker
+        thread is done (or the run is cancelled before it started), not when
+        the awaiting coroutine goes away.
+        """
+        submitted_at = time.perf_counter()
+
+        def run() -> T:
+            GRAPH_QUEUE_WAIT.observe(time.perf_counter() - submitted_at)
+            return fn(*args)
+
+        try:
+            future = self._executor.submit(run)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Await fn(*args) on a graph worker thread, e.g. run(app_graph.invoke, state).
+        """
+        if self._executor is None:
+            return fn(*args)
+
+        self._reserve()
+        return await self._submit(fn, *args)
+
+    def stream(self, make_iterator: Callable[[], Iterator[T]]) -> AsyncIterator[T]:
+        """
+        Iterate make_iterator() on a single graph worker thread and hand the
+        items to the event loop as they are produced.
+
+        The capacity check runs immediately, so a 503 is raised before the
+        caller starts a streaming response. The slot itself is only taken
+        once the body is iterated, so a response that never starts (client
+        gone before the first read) holds nothing.
+        """
+        if self._executor is None:
+            return self._stream_inline(make_iterator)
+
+        self._check_capacity()
+        return self._stream_threaded(make_iterator)
+
+    async def _stream_inline(self, make_iterator: Callable[[], Iterator[T]]) -> AsyncIterator[T]:
+        for item in make_iterator():
+            yield item
+
+    async def _stream_threaded(self, make_iterator: Callable[[], Iterator[T]]) -> AsyncIterator[T]:
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        cancelled = threading.Event()
+        done = object()
+
+        def put(item: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Event loop already closed; nobody is listening
+                cancelled.set()
+
+        def produce() -> None:
+            # The whole iteration stays on one thread; LangGraph's stream
+            # sets context vars that must be reset on the thread that set them.
+            try:
+                if cancelled.is_set():
+                    return
+                iterator = make_iterator()
+                try:
+                    for item in iterator:
+                        if cancelled.is_set():
+                            break
+                        put(item)
+                finally:
+                    close = getattr(iterator, "close", None)
+                    if close is not None:
+                        close()
+            finally:
+                put(done)
+
+        # Admitted by stream() already: take the slot without re-checking,
+        # since a 503 can no longer be sent once the response has started.
+        with self._lock:
+            self._in_flight += 1
+        future = self._submit(produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+            await future
+        finally:
+            # Client went away (or we finished): stop the producer early.
+            # The slot is released by _submit once the thread has exited.
+            cancelled.set()
+
+
+graph_runner = GraphRunner()
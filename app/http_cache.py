@@ -0,0 +1,267 @@
+# app/http_cache.py
+"""
+Conditional GETs (ETag / Last-Modified -> 304) for read-heavy routes.
+
+Each cached response depends on a few version scopes:
+  - per project: "project", "members", "activities", "documents"
+    (touch_project() in the routes that write them);
+  - global: "catalog" (activity definitions) and "global" (roles, user
+    profiles), via touch_global().
+
+The ETag is a hash of the store's epoch, the route, its vary key (e.g.
+the user id for per-user summaries) and the current scope versions.
+The epoch changes whenever the versions restart from 0 (a new process
+for "memory", a flushed Redis), so an ETag from before never matches
+newer data.
+
+The ETag is known before any query runs: a matching If-None-Match gets
+a 304 straight away, and a cached serialized body is served from an
+in-process LRU without touching the ORM. Bodies also expire after
+HTTP_CACHE_TTL_SECONDS. Auth and membership checks still run first
+(both are cached, see app/deps.py and app/authz.py).
+
+Backends for the versions: "memory" (per process; only correct with a
+single worker, also the stand-in for tests) or "redis" (shared across
+workers, needs the `redis` package and REDIS_URL), via
+HTTP_CACHE_BACKEND.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app.cache import LRUCache
+from app.metrics import CallbackMetric
+
+load_dotenv()
+
+HTTP_CACHE_BACKEND = os.getenv("HTTP_CACHE_BACKEND", "memory")
+HTTP_CACHE_SIZE = int(os.getenv("HTTP_CACHE_SIZE", "2048"))
+HTTP_CACHE_TTL_SECONDS = float(os.getenv("HTTP_CACHE_TTL_SECONDS", "300"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# scope key -> (version, unix time of the last change)
+Stamp = Tuple[int, float]
+_STARTED_AT = time.time()
+
+
+# ---------- Version stores ----------
+
+
+class MemoryVersionStore:
+    def __init__(self):
+        self._stamps: Dict[str, Stamp] = {}
+        self._lock = threading.Lock()
+        # Versions restart at 0 with every process
+        self._epoch = uuid.uuid4().hex
+
+    def get(self, keys: Sequence[str]) -> List[Stamp]:
+        return [self._stamps.get(key, (0, _STARTED_AT)) for key in keys]
+
+    def get_with_epoch(self, keys: Sequence[str]) -> Tuple[str, List[Stamp]]:
+        return self._epoch, self.get(keys)
+
+    def bump(self, keys: Sequence[str]) -> None:
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                version, _ = self._stamps.get(key, (0, now))
+                self._stamps[key] = (version + 1, now)
+
+
+class RedisVersionStore:
+    """
+    INCR counter plus a change timestamp per scope key, and a shared
+    epoch that is re-created if Redis loses the counters.
+    """
+
+    def __init__(self, url: str = REDIS_URL):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, keys: Sequence[str]) -> List[Stamp]:
+        return self.get_with_epoch(keys)[1]
+
+    def get_with_epoch(self, keys: Sequence[str]) -> Tuple[str, List[Stamp]]:
+        raw = self._client.mget(
+            [f"httpcache:{k}" for k in keys]
+            + [f"httpcache:{k}:at" for k in keys]
+            + ["httpcache:epoch"]
+        )
+        versions, times, epoch = raw[: len(keys)], raw[len(keys):-1], raw[-1]
+        if epoch is None:
+            # First use, or Redis lost its data: counters restarted at 0
+            self._client.set("httpcache:epoch", uuid.uuid4().hex, nx=True)
+            epoch = self._client.get("httpcache:epoch")
+        stamps = [
+            (int(v) if v else 0, float(t) if t else _STARTED_AT)
+            for v, t in zip(versions, times)
+        ]
+        return epoch.decode() if isinstance(epoch, bytes) else str(epoch), stamps
+
+    def bump(self, keys: Sequence[str]) -> None:
+        now = time.time()
+        pipe = self._client.pipeline()
+        for key in keys:
+            pipe.incr(f"httpcache:{key}")
+            pipe.set(f"httpcache:{key}:at", now)
+        pipe.execute()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if HTTP_CACHE_BACKEND == "redis":
+                    _store = RedisVersionStore()
+                elif HTTP_CACHE_BACKEND == "memory":
+                    _store = MemoryVersionStore()
+                else:
+                    raise ValueError(f"Unknown HTTP_CACHE_BACKEND: {HTTP_CACHE_BACKEND!r}")
+    return _store
+
+
+def project_scope(project_id: UUID | str, resource: str) -> str:
+    return f"{resource}:{project_id}"
+
+
+def touch_project(project_id: UUID | str, *resources: str) -> None:
+    """
+    Invalidate cached responses for these resources of a project. Call
+    after the write has committed.
+    """
+    _get_store().bump([project_scope(project_id, r) for r in resources])
+
+
+def touch_global(*names: str) -> None:
+    _get_store().bump(list(names))
+
+
+def scope_version(key: str) -> int:
+    """
+    Current version of one scope, e.g. for keeping a derived in-process
+    snapshot in step with the other workers.
+    """
+    return _get_store().get([key])[0][0]
+
+
+# ---------- Responses ----------
+
+_bodies: LRUCache[bytes] = LRUCache(
+    "http_bodies", max_size=HTTP_CACHE_SIZE, ttl=HTTP_CACHE_TTL_SECONDS
+)
+
+# (route, outcome) -> count; outcome is not_modified, body_hit or miss
+_outcomes: Dict[Tuple[str, str], int] = {}
+_outcomes_lock = threading.Lock()
+
+
+def _count(route: str, outcome: str) -> None:
+    with _outcomes_lock:
+        _outcomes[(route, outcome)] = _outcomes.get((route, outcome), 0) + 1
+
+
+HTTP_CACHE_REQUESTS = CallbackMetric(
+    "http_cache_requests_total",
+    "Conditional-GET routes by outcome (not_modified, body_hit, miss).",
+    "counter",
+    ("route", "outcome"),
+    lambda: {key: float(n) for key, n in dict(_outcomes).items()},
+)
+
+
+class _Conditional:
+    def __init__(self, request: Request, route: str, scopes: Sequence[str], vary: Hashable):
+        epoch, stamps = _get_store().get_with_epoch(scopes)
+        versions = [(key, version) for key, (version, _) in zip(scopes, stamps)]
+        digest = hashlib.sha1(repr((epoch, route, vary, versions)).encode()).hexdigest()[:20]
+        self.route = route
+        self.etag = f'W/"{digest}"'
+        self.last_modified = max(at for _, at in stamps)
+        self.headers = {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": "private, no-cache",
+        }
+        self.request = request
+
+    def not_modified(self) -> Optional[Response]:
+        if_none_match = self.request.headers.get("if-none-match")
+        if if_none_match is not None:
+            matched = self.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        else:
+            matched = self._not_modified_since()
+        if matched:
+            _count(self.route, "not_modified")
+            return Response(status_code=304, headers=self.headers)
+        return None
+
+    def _not_modified_since(self) -> bool:
+        since = self.request.headers.get("if-modified-since")
+        if not since:
+            return False
+        try:
+            return parsedate_to_datetime(since).timestamp() >= int(self.last_modified)
+        except (TypeError, ValueError):
+            return False
+
+    def cached(self) -> Optional[Response]:
+        body = _bodies.get(self.etag)
+        if body is None:
+            return None
+        _count(self.route, "body_hit")
+        return self._response(body)
+
+    def store(self, payload: Any) -> Response:
+        _count(self.route, "miss")
+        if isinstance(payload, bytes):  # already serialized JSON
+            body = payload
+        else:
+            body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        _bodies.set(self.etag, body)
+        return self._response(body)
+
+    def _response(self, body: bytes) -> Response:
+        return Response(content=body, media_type="application/json", headers=self.headers)
+
+
+def conditional_json(
+    request: Request,
+    route: str,
+    scopes: Sequence[str],
+    build: Callable[[], Any],
+    vary: Hashable = None,
+) -> Response:
+    """
+    304 / cached body / freshly built JSON for a sync route. `build`
+    returns the route's usual (already validated) payload, or the JSON
+    body as bytes.
+    """
+    cond = _Conditional(request, route, scopes, vary)
+    return cond.not_modified() or cond.cached() or cond.store(build())
+
+
+async def conditional_json_async(
+    request: Request,
+    route: str,
+    scopes: Sequence[str],
+    build: Callable[[], Awaitable[Any]],
+    vary: Hashable = None,
+) -> Response:
+    cond = _Conditional(request, route, scopes, vary)
+    return cond.not_modified() or cond.cached() or cond.store(await build())
@@ -0,0 +1,193 @@
+# app/intent_router.py
+"""
+Single-pass intent router for the chat graph.
+
+All route patterns are compiled into one alternation regex anchored at
+token boundaries; every match adds its weight to its route and the
+best-scoring route wins (ties go to ROUTE_PRIORITY order). Messages with no route
+scoring at least MIN_ROUTE_SCORE go to general chat, or to the optional
+naive Bayes classifier when INTENT_CLASSIFIER_EXAMPLES points at a JSONL
+file of {"text": ..., "route": ...} examples.
+
+Benchmark: python -m benchmarks.bench_intent_router
+"""
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INTENT_CLASSIFIER_EXAMPLES = os.getenv("INTENT_CLASSIFIER_EXAMPLES")
+INTENT_CLASSIFIER_MIN_PROB = float(os.getenv("INTENT_CLASSIFIER_MIN_PROB", "0.6"))
+
+MIN_ROUTE_SCORE = 1.0
+DEFAULT_ROUTE = "chat"
+
+# Tie-break order (same precedence the keyword router used)
+ROUTE_PRIORITY = ("project_info", "doc_search", "cost", "board_foot", "sheet", "measure")
+
+_NUM = r"\d+(?:\.\d+)?"
+
+# (route, pattern, weight). Within the combined regex the leftmost match
+# wins and earlier alternatives win at the same position, so specific
+# multi-word patterns are listed before the single words they contain.
+ROUTE_PATTERNS: List[Tuple[str, str, float]] = [
+    # --- project info ---
+    ("project_info", r"\bproject\s+(?:overview|summary|info|information|details)\b", 3.0),
+    ("project_info", r"\b(?:about|what\s+is)\s+(?:this|the)\s+project\b", 3.0),
+    ("project_info", r"\bwho(?:'s|\s+is|\s+are)\s+on\s+(?:this|the|our)\s+(?:project|team|crew|job)\b", 3.0),
+    ("project_info", r"\bwho(?:'s|\s+is)\s+(?:the|our)\s+(?:pm|project\s+manager|super|superintendent|foreman)\b", 2.0),
+    ("project_info", r"\bteam\b", 1.5),
+    ("project_info", r"\bmembers?\b", 1.5),
+    # --- documents ---
+    ("doc_search", r"\bchange\s+orders?\b", 2.0),
+    ("doc_search", r"\bscope\s+of\s+work\b", 2.0),
+    ("doc_search", r"\bspec(?:s|ification|ifications)?\b", 2.0),
+    ("doc_search", r"\b(?:documents?|docs)\b", 2.0),
+    ("doc_search", r"\b(?:blueprints?|rfis?|submittals?)\b", 2.0),
+    ("doc_search", r"\b(?:plans|drawings?|contract)\b", 1.5),
+    # --- cost ---
+    ("cost", r"\$\s*" + _NUM, 2.5),
+    ("cost", r"\bper\s+(?:sheet|board|bf|piece|unit|sq\.?\s?ft|sqft|square\s+foot)\b", 1.5),
+    ("cost", r"\b(?:at|@)\s*" + _NUM + r"\s*(?:each|per|/|a\s+piece)", 1.5),
+    ("cost", r"\bcost(?:s|ing)?\b", 2.0),
+    ("cost", r"\bpric(?:e|es|ed|ing)\b", 2.0),
+    ("cost", r"\bhow\s+much\s+(?:will|would|does|do|is|are)\b", 1.0),
+    ("cost", r"\bbudget\b", 1.0),
+    ("cost", r"\b(?:total|materials?)\b", 0.5),
+    # --- board feet ---
+    ("board_foot", r"\bboard[-\s]?f(?:oo|ee)t\b", 3.0),
+    ("board_foot", _NUM + r"\s*x\s*" + _NUM + r"\s*x\s*" + _NUM, 2.0),
+    ("board_foot", r"\bbf\b", 2.0),
+    # --- sheets ---
+    ("sheet", _NUM + r"\s*(?:sq\.?\s?ft|sqft|square\s+f(?:oo|ee)t|sf)\b", 2.0),
+    ("sheet", r"\bsheets?\b", 2.0),
+    ("sheet", r"\b(?:drywall|plywood|osb|sheathing|gypsum|panels?)\b", 1.5),
+    ("sheet", r"\b" + _NUM + r"\s*x\s*" + _NUM + r"\b", 0.5),
+    # --- measurements ---
+    ("measure", _NUM + r"\s*(?:feet|foot|ft\b|')", 2.0),
+    ("measure", _NUM + r"\s*(?:inches|inch|in\b|\")", 2.0),
+    ("measure", r"\b(?:convert|measurements?)\b", 1.5),
+    ("measure", r"\b(?:studs?|framing)\b", 1.0),
+]
+
+
+# ---------- Optional local classifier ----------
+
+_TOKEN_RE = re.compile(r"[a-z0-9$']+")
+
+
+class NaiveBayesClassifier:
+    """
+    Multinomial naive Bayes over lowercase word tokens (add-one smoothing).
+    """
+
+    def __init__(self) -> None:
+        self.route_counts: Counter = Counter()
+        self.token_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.vocab: set = set()
+
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> "NaiveBayesClassifier":
+        for text, route in examples:
+            tokens = _TOKEN_RE.findall(text.lower())
+            self.route_counts[route] += 1
+            self.token_counts[route].update(tokens)
+            self.vocab.update(tokens)
+        return self
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        (route, posterior probability); (None, 0.0) before training.
+        """
+        if not self.route_counts:
+            return None, 0.0
+
+        tokens = _TOKEN_RE.findall(text.lower())
+        total = sum(self.route_counts.values())
+        vocab_size = len(self.vocab) + 1
+        log_probs: Dict[str, float] = {}
+        for route, count in self.route_counts.items():
+            counts = self.token_counts[route]
+            denominator = sum(counts.values()) + vocab_size
+            log_prob = math.log(count / total)
+            for token in tokens:
+                log_prob += math.log((counts[token] + 1) / denominator)
+            log_probs[route] = log_prob
+
+        best = max(log_probs, key=log_probs.get)
+        peak = log_probs[best]
+        norm = sum(math.exp(lp - peak) for lp in log_probs.values())
+        return best, 1.0 / norm
+
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["text"], row["route"]) for row in rows]
+
+
+# ---------- Router ----------
+
+
+class IntentRouter:
+    def __init__(
+        self,
+        patterns: List[Tuple[str, str, float]] = ROUTE_PATTERNS,
+        classifier: Optional[NaiveBayesClassifier] = None,
+        classifier_min_prob: float = INTENT_CLASSIFIER_MIN_PROB,
+    ):
+        self._groups: Dict[str, Tuple[str, float]] = {}
+        alternatives = []
+        for i, (route, pattern, weight) in enumerate(patterns):
+            name = f"p{i}"
+            self._groups[name] = (route, weight)
+            alternatives.append(f"(?P<{name}>{pattern})")
+        # Every pattern starts at a token boundary; the lookbehind lets the
+        # engine skip mid-word positions without trying each alternative.
+        self._regex = re.compile(
+            r"(?<![a-z0-9])(?:" + "|".join(alternatives) + ")", re.IGNORECASE
+        )
+        self.classifier = classifier
+        self.classifier_min_prob = classifier_min_prob
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """
+        Summed pattern weights per route, from one pass over `text`.
+        """
+        totals: Dict[str, float] = {}
+        for match in self._regex.finditer(text):
+            route, weight = self._groups[match.lastgroup]
+            totals[route] = totals.get(route, 0.0) + weight
+        return totals
+
+    def route(self, text: str) -> str:
+        totals = self.scores(text)
+        if totals:
+            best = max(
+                totals,
+                key=lambda r: (totals[r], -ROUTE_PRIORITY.index(r)),
+            )
+            if totals[best] >= MIN_ROUTE_SCORE:
+                return best
+
+        if self.classifier is not None:
+            route, prob = self.classifier.predict(text)
+            if route and prob >= self.classifier_min_prob:
+                return route
+
+        return DEFAULT_ROUTE
+
+
+def build_router() -> IntentRouter:
+    classifier = None
+    if INTENT_CLASSIFIER_EXAMPLES:
+        classifier = NaiveBayesClassifier().fit(load_examples(INTENT_CLASSIFIER_EXAMPLES))
+    return IntentRouter(classifier=classifier)
+
+
+intent_router = build_router()
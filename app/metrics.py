@@ -0,0 +1,142 @@
+# app/metrics.py
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Values are per worker process; scrape each worker (or aggregate in the
+collector) when running several uvicorn workers.
+"""
+import bisect
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+from app.cache import cache_stats
+
+# Seconds; tuned for LLM latencies (sub-second first tokens up to slow completions)
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, optionally split by label values.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self._series: Dict[LabelValues, Tuple[List[int], float]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._series[key] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+        for key, (counts, total) in sorted(series.items()):
+            base = [f'{name}="{value}"' for name, value in zip(self.label_names, key)]
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + [float("inf")], counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = ",".join(base + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{labels}}} {cumulative}")
+            suffix = "{" + ",".join(base) + "}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Counter or gauge whose values are read from a callback at scrape time,
+    for state that already keeps its own counts (e.g. cache hit/miss).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        label_names: Sequence[str],
+        collect: Callable[[], Dict[LabelValues, float]],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names)
+        self.collect = collect
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for key, value in sorted(self.collect().items()):
+            labels = ",".join(f'{name}="{v}"' for name, v in zip(self.label_names, key))
+            suffix = "{" + labels + "}" if labels else ""
+            lines.append(f"{self.name}{suffix} {value}")
+        return lines
+
+
+REGISTRY: List[Union[Histogram, CallbackMetric]] = []
+
+
+def render_metrics() -> str:
+    """
+    All registered metrics in Prometheus text format.
+    """
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------- Chat metrics ----------
+
+CHAT_TIME_TO_FIRST_TOKEN = Histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from /chat/stream request start to the first streamed answer text.",
+    label_names=("node",),
+)
+
+
+# ---------- Cache metrics ----------
+
+
+def _cache_values(field: str) -> Callable[[], Dict[LabelValues, float]]:
+    return lambda: {(name,): stats[field] for name, stats in cache_stats().items()}
+
+
+CACHE_HITS = CallbackMetric(
+    "cache_hits_total", "In-process cache hits.", "counter", ("cache",), _cache_values("hits")
+)
+CACHE_MISSES = CallbackMetric(
+    "cache_misses_total", "In-process cache misses.", "counter", ("cache",), _cache_values("misses")
+)
+CACHE_SIZE = CallbackMetric(
+    "cache_entries", "Entries currently held in an in-process cache.", "gauge", ("cache",),
+    _cache_values("size"),
+)
@@ -4,9 +4,11 @@ from enum import Enum as PyEnum
 
 from sqlalchemy import (
     Boolean,
+    CheckConstraint,
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     JSON,
     String,
@@ -270,6 +272,10 @@ class ProjectMember(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination: WHERE project_id = ? AND (created_at, id) < (?, ?)
+        Index("ix_messages_project_created_id", "project_id", "created_at", "id"),
+    )
 
     id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     project_id = Column(PGUUID(as_uuid=True), ForeignKey("projects.id"), nullable=False)
@@ -310,7 +316,7 @@ class MessageAttachment(Base):
     __tablename__ = "message_attachments"
 
     id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    message_id = Column(PGUUID(as_uuid=True), ForeignKey("messages.id"), nullable=False)
+    message_id = Column(PGUUID(as_uuid=True), ForeignKey("messages.id"), nullable=False, index=True)
 
     file_name = Column(String(255), nullable=False)
     file_type = Column(String(100), nullable=True)  # e.g. "image/png", "video/mp4"
@@ -329,8 +335,9 @@ class MessageAttachment(Base):
 
 class MessageRead(Base):
     """
-    Tracks which users have read which messages.
-    Drives has_unread_messages on project cards.
+    Per-message read receipts. Unread state now comes from
+    ProjectReadWatermark; these rows are only written when
+    WRITE_MESSAGE_RECEIPTS is on (see app/read_state.py).
     """
 
     __tablename__ = "message_reads"
@@ -350,6 +357,52 @@ class MessageRead(Base):
     user = relationship("User", back_populates="message_reads")
 
 
+class ProjectReadWatermark(Base):
+    """
+    Per-(project, user) read position: every message at or before
+    (last_read_at, last_read_message_id) counts as read. Drives
+    has_unread_messages / unread counts on project cards.
+    """
+
+    __tablename__ = "project_read_watermarks"
+
+    project_id = Column(
+        PGUUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True
+    )
+    user_id = Column(
+        PGUUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    # (created_at, id) of the newest read message; id breaks created_at ties
+    last_read_at = Column(DateTime(timezone=True), nullable=False)
+    last_read_message_id = Column(PGUUID(as_uuid=True), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=text("now()"),
+    )
+
+
+class ProjectProgress(Base):
+    """
+    Denormalized ActivitySchedule counts per project, kept in step by
+    app/progress.py in the same transaction as every schedule write, and
+    periodically reconciled from activity_schedules.
+    """
+
+    __tablename__ = "project_progress"
+
+    project_id = Column(
+        PGUUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True
+    )
+    total_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    completed_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    blocked_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    in_progress_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=text("now()"),
+    )
+
+
 # ---------- AI RUNS ----------
 
 
@@ -423,6 +476,56 @@ class ProjectDocument(Base):
     project = relationship("Project", back_populates="documents")
     created_by = relationship("User", back_populates="created_documents")
 
+    chunks = relationship(
+        "ProjectDocumentChunk",
+        back_populates="document",
+        cascade="all, delete-orphan",
+        passive_deletes=True,  # ON DELETE CASCADE does the work
+        order_by="ProjectDocumentChunk.chunk_index",
+    )
+
+
+class ProjectDocumentChunk(Base):
+    """
+    Retrieval unit for RAG: an overlapping, structure-aware slice of a
+    ProjectDocument. Rebuilt whenever the document is created or updated.
+    """
+
+    __tablename__ = "project_document_chunks"
+    __table_args__ = (
+        UniqueConstraint("document_id", "chunk_index", name="uq_document_chunk_index"),
+    )
+
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    document_id = Column(
+        PGUUID(as_uuid=True),
+        ForeignKey("project_documents.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # Denormalized so retrieval can filter by project without a join
+    project_id = Column(
+        PGUUID(as_uuid=True),
+        ForeignKey("projects.id"),
+        nullable=False,
+        index=True,
+    )
+
+    chunk_index = Column(Integer, nullable=False)
+    section = Column(String(255), nullable=True)   # heading or intake JSON key
+    content = Column(Text, nullable=False)
+
+    # Character offsets into ProjectDocument.content
+    start_offset = Column(Integer, nullable=False)
+    end_offset = Column(Integer, nullable=False)
+    token_count = Column(Integer, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=text("now()"),
+    )
+
+    document = relationship("ProjectDocument", back_populates="chunks")
+
 
 # Add reverse side for created_documents on User
 User.created_documents = relationship(
@@ -549,6 +652,44 @@ class ActivitySchedule(Base):
     check_ins = relationship("MemberCheckIn", back_populates="activity_schedule")
 
 
+class ActivityDependency(Base):
+    """
+    Finish-to-start edge between two ActivitySchedules of one project: the
+    successor can start `lag_days` after the predecessor finishes. Read by
+    the critical-path engine in app/schedule.py.
+    """
+
+    __tablename__ = "activity_dependencies"
+
+    predecessor_id = Column(
+        PGUUID(as_uuid=True),
+        ForeignKey("activity_schedules.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    successor_id = Column(
+        PGUUID(as_uuid=True),
+        ForeignKey("activity_schedules.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    # Denormalized so a project's whole graph loads with one indexed query
+    project_id = Column(
+        PGUUID(as_uuid=True),
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    lag_days = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=text("now()"),
+    )
+
+    __table_args__ = (
+        CheckConstraint("predecessor_id <> successor_id", name="ck_activity_dependency_not_self"),
+    )
+
+
 class MemberCheckIn(Base):
     """
     Tracks when a member is on-site for a project (optionally tied to a scheduled activity).
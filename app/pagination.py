@@ -0,0 +1,32 @@
+# app/pagination.py
+"""
+Opaque keyset cursors over (created_at, id).
+
+A cursor marks one row; pages continue strictly before or after it using
+a row comparison, `(created_at, id) < (:ts, :id)`, which Postgres serves
+from a (..., created_at, id) index without OFFSET scans. `id` breaks ties
+between rows created in the same microsecond.
+"""
+import base64
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    (created_at, id) for a cursor from encode_cursor; 400 if malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
@@ -0,0 +1,124 @@
+# app/permissions.py
+"""
+Compiled role -> permission matrix.
+
+Every Permission key gets one bit (ordered by id) and each role's allowed
+RolePermission rows are folded into a single int mask, so a check is a
+dict lookup plus a bitwise AND. The matrix is built at startup, rebuilt
+by refresh_permission_matrix() after /roles or /permissions writes, and
+rebuilt lazily in other workers once it is older than
+PERMISSION_MATRIX_MAX_AGE_SECONDS.
+
+Routes:      access: ProjectAccess = Depends(require("financials.view_budget"))
+Graph nodes: role_has_permission(role_key, "financials.view_budget")
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app import models
+from app.authz import ProjectAccess, project_access
+from app.database import SessionLocal
+
+PERMISSION_MATRIX_MAX_AGE_SECONDS = float(os.getenv("PERMISSION_MATRIX_MAX_AGE_SECONDS", "300"))
+
+
+class PermissionMatrix:
+    def __init__(
+        self,
+        permission_bits: Dict[str, int],
+        role_masks: Dict[int, int],
+        role_ids: Dict[str, int],
+    ):
+        self.permission_bits = permission_bits  # permission key -> single-bit mask
+        self.role_masks = role_masks            # role id -> OR of allowed bits
+        self.role_ids = role_ids                # role key -> role id
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db: Session) -> "PermissionMatrix":
+        keys = db.query(models.Permission.key).order_by(models.Permission.id).all()
+        permission_bits = {key: 1 << i for i, (key,) in enumerate(keys)}
+
+        role_masks: Dict[int, int] = {}
+        rows = (
+            db.query(models.RolePermission.role_id, models.Permission.key)
+            .join(models.Permission, models.RolePermission.permission_id == models.Permission.id)
+            .filter(models.RolePermission.allowed.is_(True))
+            .all()
+        )
+        for role_id, key in rows:
+            role_masks[role_id] = role_masks.get(role_id, 0) | permission_bits[key]
+
+        role_ids = {key: role_id for key, role_id in db.query(models.Role.key, models.Role.id).all()}
+        return cls(permission_bits, role_masks, role_ids)
+
+    def allows(self, role_id: Optional[int], permission_key: str) -> bool:
+        # Unknown keys have no bit and are never granted
+        bit = self.permission_bits.get(permission_key, 0)
+        return bit != 0 and self.role_masks.get(role_id, 0) & bit == bit
+
+    def role_key_allows(self, role_key: Optional[str], permission_key: str) -> bool:
+        return self.allows(self.role_ids.get(role_key), permission_key)
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.built_at > PERMISSION_MATRIX_MAX_AGE_SECONDS
+
+
+_matrix: Optional[PermissionMatrix] = None
+_matrix_lock = threading.Lock()
+
+
+def refresh_permission_matrix(db: Optional[Session] = None) -> PermissionMatrix:
+    """
+    Rebuild the matrix from the database (call after role / permission writes).
+    """
+    global _matrix
+    with _matrix_lock:
+        if db is not None:
+            _matrix = PermissionMatrix.load(db)
+        else:
+            with SessionLocal() as own_db:
+                _matrix = PermissionMatrix.load(own_db)
+        return _matrix
+
+
+def get_permission_matrix() -> PermissionMatrix:
+    matrix = _matrix
+    if matrix is None or matrix.is_stale():
+        matrix = refresh_permission_matrix()
+    return matrix
+
+
+def has_permission(access: Optional[ProjectAccess], permission_key: str) -> bool:
+    return access is not None and get_permission_matrix().allows(access.role_id, permission_key)
+
+
+def role_has_permission(role_key: Optional[str], permission_key: str) -> bool:
+    return get_permission_matrix().role_key_allows(role_key, permission_key)
+
+
+# ---------- Dependencies ----------
+
+
+def require(permission_key: str, detail: Optional[str] = None) -> Callable[..., ProjectAccess]:
+    """
+    Dependency factory: the caller's ProjectAccess for the route's
+    `project_id`, or 403 unless their project role grants `permission_key`.
+    """
+
+    def dependency(access: Optional[ProjectAccess] = Depends(project_access)) -> ProjectAccess:
+        if access is None:
+            raise HTTPException(status_code=403, detail="You are not a member of this project.")
+        if not get_permission_matrix().allows(access.role_id, permission_key):
+            raise HTTPException(
+                status_code=403,
+                detail=detail or f"You don't have the '{permission_key}' permission on this project.",
+            )
+        return access
+
+    return dependency
@@ -0,0 +1,218 @@
+# app/progress.py
+"""
+Materialized per-project progress counters (project_progress).
+
+Project cards show completion from ActivitySchedule counts. Instead of a
+grouped COUNT over activity_schedules on every read, each schedule write
+applies a delta to the project's counter row in its own transaction:
+
+  - record_created()        new schedules (single or bulk)
+  - record_status_change()  a schedule moved between statuses
+
+Both are a single INSERT ... ON CONFLICT DO UPDATE SET n = n + delta, so
+concurrent writers queue on the counter row instead of losing updates.
+Reads are primary-key lookups (progress_counts()).
+
+reconcile() recomputes the rows from activity_schedules and fixes any
+drift (writes that bypassed these helpers, e.g. from a SQL console).
+Run it from cron:
+
+    python -m app.progress
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import models
+
+Progress = models.ProjectProgress
+Schedule = models.ActivitySchedule
+
+RECONCILE_BATCH_SIZE = 500
+
+# Status -> counter column, besides total_count which counts every schedule
+STATUS_COLUMNS = {
+    models.ActivityStatus.COMPLETED: "completed_count",
+    models.ActivityStatus.BLOCKED: "blocked_count",
+    models.ActivityStatus.IN_PROGRESS: "in_progress_count",
+}
+COUNT_COLUMNS = ("total_count", "completed_count", "blocked_count", "in_progress_count")
+
+
+@dataclass(frozen=True)
+class ProgressCounts:
+    total: int = 0
+    completed: int = 0
+    blocked: int = 0
+    in_progress: int = 0
+
+    @property
+    def completion_percentage(self) -> float:
+        return self.completed / self.total * 100.0 if self.total > 0 else 0.0
+
+
+def _apply(db: Session, project_id: UUID, deltas: Dict[str, int]) -> None:
+    if not any(deltas.values()):
+        return
+    stmt = pg_insert(Progress).values(
+        project_id=project_id,
+        **{column: deltas.get(column, 0) for column in COUNT_COLUMNS},
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Progress.project_id],
+        set_={
+            **{
+                column: getattr(Progress, column) + getattr(stmt.excluded, column)
+                for column in COUNT_COLUMNS
+            },
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+
+def record_created(
+    db: Session,
+    project_id: UUID,
+    statuses: Iterable[Optional[models.ActivityStatus]],
+) -> None:
+    """
+    Count new schedules of a project. Commit is handled by the caller.
+    """
+    deltas = {"total_count": 0}
+    for status in statuses:
+        deltas["total_count"] += 1
+        column = STATUS_COLUMNS.get(status)
+        if column is not None:
+            deltas[column] = deltas.get(column, 0) + 1
+    _apply(db, project_id, deltas)
+
+
+def record_status_change(
+    db: Session,
+    project_id: UUID,
+    old: Optional[models.ActivityStatus],
+    new: Optional[models.ActivityStatus],
+) -> None:
+    """
+    Move one schedule between status counters. Commit is handled by the
+    caller.
+    """
+    deltas: Dict[str, int] = {}
+    if old in STATUS_COLUMNS:
+        deltas[STATUS_COLUMNS[old]] = -1
+    if new in STATUS_COLUMNS:
+        deltas[STATUS_COLUMNS[new]] = deltas.get(STATUS_COLUMNS[new], 0) + 1
+    _apply(db, project_id, deltas)
+
+
+def progress_counts(db: Session, project_ids: Iterable[UUID]) -> Dict[UUID, ProgressCounts]:
+    """
+    project id -> counters; projects without a row have no schedules yet.
+    """
+    project_ids = list(project_ids)
+    if not project_ids:
+        return {}
+    rows = db.query(
+        Progress.project_id,
+        Progress.total_count,
+        Progress.completed_count,
+        Progress.blocked_count,
+        Progress.in_progress_count,
+    ).filter(Progress.project_id.in_(project_ids))
+    return {
+        row.project_id: ProgressCounts(
+            total=row.total_count,
+            completed=row.completed_count,
+            blocked=row.blocked_count,
+            in_progress=row.in_progress_count,
+        )
+        for row in rows
+    }
+
+
+# ---------- Reconciliation ----------
+
+
+def _source_counts(project_ids: List[UUID]):
+    def count_status(status: models.ActivityStatus):
+        return func.count(Schedule.id).filter(Schedule.status == status)
+
+    return (
+        select(
+            models.Project.id,
+            func.count(Schedule.id),
+            count_status(models.ActivityStatus.COMPLETED),
+            count_status(models.ActivityStatus.BLOCKED),
+            count_status(models.ActivityStatus.IN_PROGRESS),
+        )
+        .select_from(models.Project)
+        .outerjoin(Schedule, Schedule.project_id == models.Project.id)
+        .where(models.Project.id.in_(project_ids))
+        .group_by(models.Project.id)
+    )
+
+
+def reconcile_projects(db: Session, project_ids: List[UUID]) -> int:
+    """
+    Recompute the counters of these projects from activity_schedules.
+    Returns how many rows were missing or wrong. Commit is handled by
+    the caller.
+
+    The counter rows are locked first, so a schedule write that commits
+    after the recount queues behind this transaction and applies its
+    delta on top of the fresh numbers instead of being overwritten.
+    """
+    if not project_ids:
+        return 0
+    db.execute(
+        select(Progress.project_id)
+        .where(Progress.project_id.in_(project_ids))
+        .order_by(Progress.project_id)
+        .with_for_update()
+    )
+
+    stmt = pg_insert(Progress).from_select(
+        ["project_id", *COUNT_COLUMNS], _source_counts(project_ids)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Progress.project_id],
+        set_={
+            **{column: getattr(stmt.excluded, column) for column in COUNT_COLUMNS},
+            "updated_at": func.now(),
+        },
+        # Only rewrite rows that drifted
+        where=or_(
+            *(getattr(Progress, column) != getattr(stmt.excluded, column) for column in COUNT_COLUMNS)
+        ),
+    )
+    return db.execute(stmt).rowcount
+
+
+def reconcile(db: Session, batch_size: int = RECONCILE_BATCH_SIZE) -> int:
+    """
+    Reconcile every project, committing per batch to keep locks short.
+    """
+    fixed = 0
+    last_id: Optional[UUID] = None
+    while True:
+        query = select(models.Project.id).order_by(models.Project.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(models.Project.id > last_id)
+        project_ids = list(db.scalars(query))
+        if not project_ids:
+            return fixed
+        fixed += reconcile_projects(db, project_ids)
+        db.commit()
+        last_id = project_ids[-1]
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    with SessionLocal() as session:
+        print(f"[progress] reconciled; {reconcile(session)} project counter rows corrected")
@@ -10,6 +10,8 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
+from app.document_chunks import store_document_chunks
+from app.document_hooks import document_saved
 from app.models import Project, ProjectDocument
 from app.schemas import ProjectIntakeCreate  # defined in schemas.py
 
@@ -91,8 +93,11 @@ def save_project_intake(
         created_by_id=project.created_by_id,
     )
     db.add(doc)
+    db.flush()  # get doc.id
+    chunks = store_document_chunks(db, doc)
     db.commit()
     db.refresh(doc)
+    document_saved(doc, chunks)
 
     return {"status": "ok", "document_id": str(doc.id)}
 
@@ -178,8 +183,10 @@ def patch_project_intake(
     merged = _deep_merge(existing_content, payload.patch)
 
     doc.content = json.dumps(merged, indent=2)
+    chunks = store_document_chunks(db, doc)
     db.commit()
     db.refresh(doc)
+    document_saved(doc, chunks)
 
     return ProjectIntakeRead(
         project_id=project_id,
@@ -1,16 +1,42 @@
 # app/project_routes.py
+import logging
+import uuid
 from datetime import date, datetime
 from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query
-from sqlalchemy import func as sa_func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func as sa_func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from app.deps import get_db, get_current_user
-from app import models, schemas
+from app.authz import (
+    ProjectAccess,
+    invalidate_project_access,
+    project_access,
+    project_access_async,
+)
+from app.bulk import insert_rows, update_where
+from app.catalog import CATALOG_SCOPE, get_catalog, invalidate_catalog
+from app.deps import get_async_db, get_current_user, get_current_user_async, get_db
+from app.http_cache import conditional_json, conditional_json_async, project_scope, touch_project
+from app.pagination import decode_cursor, encode_cursor
+from app.progress import ProgressCounts, progress_counts, record_created, record_status_change
+from app.read_state import mark_read, unread_counts
+from app.realtime import publish_checkin, publish_message, publish_read
+from app.schedule import (
+    CycleError,
+    ScheduleNode,
+    apply_change,
+    dependency_would_cycle,
+    lock_project_dependencies,
+    project_schedule_summary,
+    refresh_project_status,
+)
+from app import audit, models, schemas
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 # ---------- Helpers ----------
@@ -24,20 +50,33 @@ def log_action(
     entity_id: UUID | str,
     project_id: UUID | None = None,
     metadata: Dict[str, Any] | None = None,
+    sync: bool = False,
 ) -> None:
     """
-    Write a generic audit log entry.
-    Commit is handled by the caller.
+    Write a generic audit log entry once the caller's transaction commits.
+    Batched in the background unless `sync` (see app/audit.py).
     """
-    log = models.AuditLog(
+    audit.record(
+        db,
         user_id=user_id,
-        project_id=project_id,
         action=action,
         entity_type=entity_type,
-        entity_id=str(entity_id),
-        metadata_json=metadata or {},
+        entity_id=entity_id,
+        project_id=project_id,
+        metadata=metadata,
+        sync=sync,
     )
-    db.add(log)
+
+
+def refresh_schedule_status(db: Session, project_id: UUID, user_id: UUID) -> None:
+    """
+    Re-derive the project's status after a committed schedule change.
+    Never raises: the change itself is already saved.
+    """
+    try:
+        refresh_project_status(db, project_id, user_id)
+    except CycleError as exc:
+        logger.warning("schedule status not refreshed for project %s: %s", project_id, exc)
 
 
 def _to_date(value: Any) -> date:
@@ -54,48 +93,51 @@ def _to_date(value: Any) -> date:
     raise ValueError(f"Cannot interpret value as date: {value!r}")
 
 
-def build_project_summary(
+def _project_status_key(project: models.Project) -> str | None:
+    """
+    Prefer the normalized ProjectStatus key; fall back to the string status.
+    """
+    if getattr(project, "status_ref", None) is not None and getattr(
+        project.status_ref, "key", None
+    ):
+        return project.status_ref.key
+    if project.status:
+        return project.status
+    return None
+
+
+def build_project_summaries(
     db: Session,
-    project: models.Project,
-    role_key: str | None,
-    role_name: str | None,
+    rows: List[tuple[models.Project, str | None, str | None]],
     current_user: models.User,
-) -> schemas.ProjectWithRoleSummary:
+) -> list[schemas.ProjectWithRoleSummary]:
     """
-    Compute the ProjectWithRoleSummary DTO for a single project,
-    including completion %, today's activities, and unread messages.
-    """
-    today = date.today()
+    Compute ProjectWithRoleSummary DTOs for many projects at once.
 
-    # ---- Completion percentage based on ActivitySchedule rows ----
-    total_schedules = (
-        db.query(models.ActivitySchedule)
-        .filter(models.ActivitySchedule.project_id == project.id)
-        .count()
-    )
+    `rows` is a list of (project, role_key, role_name) tuples. Progress
+    counters, today's activities, on-site flags and unread counts are
+    loaded with a fixed number of queries (one each), no matter how many
+    projects the user is on.
+    """
+    if not rows:
+        return []
 
-    completed_schedules = (
-        db.query(models.ActivitySchedule)
-        .filter(
-            models.ActivitySchedule.project_id == project.id,
-            models.ActivitySchedule.status == models.ActivityStatus.COMPLETED,
-        )
-        .count()
-    )
+    today = date.today()
+    project_ids = [project.id for project, _, _ in rows]
 
-    completion_percentage = (
-        float(completed_schedules) / float(total_schedules) * 100.0
-        if total_schedules > 0
-        else 0.0
-    )
+    # ---- Completion percentage: materialized counters (app/progress.py) ----
+    counts = progress_counts(db, project_ids)
 
-    # ---- Today's activities (schedules whose scheduled_start_date == today) ----
+    # ---- Today's activities for every project in one joined query ----
     todays_rows = (
         db.query(
-            models.ActivitySchedule,
-            models.Activity,
-            models.ProjectMember,
-            models.User,
+            models.ActivitySchedule.id,
+            models.ActivitySchedule.project_id,
+            models.ActivitySchedule.project_member_id,
+            models.Activity.name,
+            models.User.id,
+            models.User.full_name,
+            models.User.email,
         )
         .join(models.Activity, models.ActivitySchedule.activity_id == models.Activity.id)
         .outerjoin(
@@ -107,95 +149,111 @@ def build_project_summary(
             models.ProjectMember.user_id == models.User.id,
         )
         .filter(
-            models.ActivitySchedule.project_id == project.id,
+            models.ActivitySchedule.project_id.in_(project_ids),
             models.ActivitySchedule.scheduled_start_date == today,
         )
         .order_by(models.ActivitySchedule.scheduled_start_date)
         .all()
     )
 
-    todays_summaries: list[schemas.ProjectActivityTodaySummary] = []
-
-    for sched, activity, pm, user in todays_rows:
-        member_name: str | None = None
-        member_on_site = False
-
-        if pm is not None and user is not None:
-            member_name = user.full_name or user.email or None
-
-            # "On site" = open check-in for this member today
-            open_checkin_exists = (
-                db.query(models.MemberCheckIn)
+    # ---- On-site members: open check-ins today, one query for all members ----
+    scheduled_member_ids = {
+        row.project_member_id
+        for row in todays_rows
+        if row.project_member_id is not None
+    }
+    on_site: set[tuple[UUID, int]] = set()
+    if scheduled_member_ids:
+        on_site = {
+            (project_id, member_id)
+            for project_id, member_id in (
+                db.query(
+                    models.MemberCheckIn.project_id,
+                    models.MemberCheckIn.project_member_id,
+                )
                 .filter(
-                    models.MemberCheckIn.project_id == project.id,
-                    models.MemberCheckIn.project_member_id == pm.id,
+                    models.MemberCheckIn.project_id.in_(project_ids),
+                    models.MemberCheckIn.project_member_id.in_(scheduled_member_ids),
                     models.MemberCheckIn.check_out_time.is_(None),
                     sa_func.date(models.MemberCheckIn.check_in_time) == today,
                 )
-                .count()
-                > 0
+                .distinct()
+                .all()
             )
-            member_on_site = open_checkin_exists
+        }
 
-        todays_summaries.append(
+    todays_by_project: Dict[UUID, list[schemas.ProjectActivityTodaySummary]] = {}
+    for sched_id, project_id, member_id, title, user_id, full_name, email in todays_rows:
+        member_name: str | None = None
+        member_on_site = False
+        if member_id is not None and user_id is not None:
+            member_name = full_name or email or None
+            member_on_site = (project_id, member_id) in on_site
+
+        todays_by_project.setdefault(project_id, []).append(
             schemas.ProjectActivityTodaySummary(
-                id=sched.id,
-                title=activity.name,
+                id=sched_id,
+                title=title,
                 member_name=member_name,
                 member_on_site=member_on_site,
             )
         )
 
-    # ---- Unread messages flag ----
-    sub_read = (
-        db.query(models.MessageRead.message_id)
-        .filter(models.MessageRead.user_id == current_user.id)
-        .subquery()
-    )
+    # ---- Unread counts: messages past this user's read watermark ----
+    unread = unread_counts(db, project_ids, current_user.id)
 
-    unread_exists = (
-        db.query(models.Message)
-        .filter(
-            models.Message.project_id == project.id,
-            models.Message.sender_id != current_user.id,
-            ~models.Message.id.in_(sub_read),
+    summaries: list[schemas.ProjectWithRoleSummary] = []
+    for project, role_key, role_name in rows:
+        progress = counts.get(project.id, ProgressCounts())
+
+        summaries.append(
+            schemas.ProjectWithRoleSummary(
+                project_id=project.id,
+                project_name=project.name,
+                description=project.description,
+                status=_project_status_key(project),
+                role_key=role_key,
+                role_name=role_name,
+                address_line1=getattr(project, "address_line1", None),
+                address_line2=getattr(project, "address_line2", None),
+                city=project.city,
+                state=project.state,
+                postal_code=project.postal_code,
+                latitude=project.latitude,
+                longitude=project.longitude,
+                completion_percentage=progress.completion_percentage,
+                total_activities=progress.total,
+                completed_activities=progress.completed,
+                blocked_activities=progress.blocked,
+                in_progress_activities=progress.in_progress,
+                has_unread_messages=project.id in unread,
+                unread_message_count=unread.get(project.id, 0),
+                todays_activities=todays_by_project.get(project.id, []),
+                project_type=getattr(project, "project_type", None),
+                end_date=getattr(project, "end_date", None),
+                is_owner=(project.created_by_id == current_user.id),
+            )
         )
-        .count()
-        > 0
-    )
 
-    # ---- Status key ----
-    status_key: str | None = None
-    # If you added ProjectStatus, prefer its key; otherwise fall back to string status.
-    if getattr(project, "status_ref", None) is not None and getattr(
-        project.status_ref, "key", None
-    ):
-        status_key = project.status_ref.key
-    elif project.status:
-        status_key = project.status
+    return summaries
 
-    # 🔹 NEW: project_type, end_date, is_owner
-    return schemas.ProjectWithRoleSummary(
-        project_id=project.id,
-        project_name=project.name,
-        description=project.description,
-        status=status_key,
-        role_key=role_key,
-        role_name=role_name,
-        address_line1=getattr(project, "address_line1", None),
-        address_line2=getattr(project, "address_line2", None),
-        city=project.city,
-        state=project.state,
-        postal_code=project.postal_code,
-        latitude=project.latitude,
-        longitude=project.longitude,
-        completion_percentage=completion_percentage,
-        has_unread_messages=unread_exists,
-        todays_activities=todays_summaries,
-        project_type=getattr(project, "project_type", None),
-        end_date=getattr(project, "end_date", None),
-        is_owner=(project.created_by_id == current_user.id),
-    )
+
+def build_project_summary(
+    db: Session,
+    project: models.Project,
+    role_key: str | None,
+    role_name: str | None,
+    current_user: models.User,
+) -> schemas.ProjectWithRoleSummary:
+    """
+    Compute the ProjectWithRoleSummary DTO for a single project,
+    including completion %, today's activities, and unread messages.
+    """
+    return build_project_summaries(
+        db=db,
+        rows=[(project, role_key, role_name)],
+        current_user=current_user,
+    )[0]
 
 
 # ---------- ROUTES: PROJECTS ----------
@@ -324,6 +382,7 @@ def create_project(
 
     db.commit()
     db.refresh(project)
+    invalidate_project_access(current_user.id)
 
     return {
         "id": str(project.id),
@@ -345,17 +404,17 @@ def create_project(
     "/projects/my",
     response_model=List[schemas.ProjectWithRoleSummary],
 )
-def list_my_projects(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+async def list_my_projects(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
     """
     Return all projects where the current user is a member,
     plus their role, completion %, today's activities, and unread flag.
     """
 
-    rows = (
-        db.query(
+    result = await db.execute(
+        select(
             models.Project,
             models.Role.key.label("role_key"),
             models.Role.name.label("role_name"),
@@ -368,25 +427,21 @@ def list_my_projects(
             models.Role,
             models.Role.id == models.ProjectMember.role_id,
         )
-        .filter(models.ProjectMember.user_id == current_user.id)
+        .options(joinedload(models.Project.status_ref))
+        .where(models.ProjectMember.user_id == current_user.id)
         .order_by(models.Project.created_at.desc())
-        .all()
     )
-
-    summaries: list[schemas.ProjectWithRoleSummary] = []
-
-    for project, role_key, role_name in rows:
-        summaries.append(
-            build_project_summary(
-                db=db,
-                project=project,
-                role_key=role_key,
-                role_name=role_name,
-                current_user=current_user,
-            )
+    rows = [(project, role_key, role_name) for project, role_key, role_name in result.all()]
+
+    # One batch of grouped queries for the whole dashboard instead of
+    # a per-project fan-out (sync query code, run on the async connection).
+    return await db.run_sync(
+        lambda sync_db: build_project_summaries(
+            db=sync_db,
+            rows=rows,
+            current_user=current_user,
         )
-
-    return summaries
+    )
 
 
 @router.get(
@@ -395,13 +450,38 @@ def list_my_projects(
 )
 def get_project(
     project_id: UUID,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     """
     Return a single project summary for the current user.
     """
 
+    if access is None:
+        raise HTTPException(status_code=404, detail="Project not found or not accessible")
+
+    # Per user (role, unread count) and per day (status depends on today)
+    return conditional_json(
+        request,
+        "project",
+        [
+            project_scope(project_id, "project"),
+            project_scope(project_id, "activities"),
+            project_scope(project_id, "members"),
+            "global",
+        ],
+        lambda: _project_summary_for(db, project_id, current_user),
+        vary=(current_user.id, date.today()),
+    )
+
+
+def _project_summary_for(
+    db: Session,
+    project_id: UUID,
+    current_user: models.User,
+) -> schemas.ProjectWithRoleSummary:
     row = (
         db.query(
             models.Project,
@@ -554,6 +634,13 @@ def update_project(
 
     db.commit()
     db.refresh(project)
+    if "end_date" in changes:
+        # The end date is the schedule's target finish
+        touch_project(project.id, "project", "activities")
+        if payload.status is None:
+            refresh_schedule_status(db, project.id, current_user.id)
+    else:
+        touch_project(project.id, "project")
 
     return build_project_summary(
         db=db,
@@ -570,24 +657,27 @@ def update_project(
 )
 def get_project_members(
     project_id: UUID,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     """
     Return all members for a given project.
     """
 
-    project_exists = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not project_exists:
+    if access is None:
         raise HTTPException(status_code=404, detail="Project not found or not accessible")
 
+    return conditional_json(
+        request,
+        "project_members",
+        [project_scope(project_id, "members"), "global"],
+        lambda: _project_member_details(db, project_id),
+    )
+
+
+def _project_member_details(db: Session, project_id: UUID) -> List[schemas.ProjectMemberDetail]:
     rows = (
         db.query(
             models.User.id.label("user_id"),
@@ -630,18 +720,19 @@ def get_project_members(
     response_model=List[schemas.ActivityDefinitionRead],
 )
 def list_activities(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     """
     List all activity definitions (global catalog + custom).
     """
-    rows = (
-        db.query(models.Activity)
-        .order_by(models.Activity.name.asc())
-        .all()
+    return conditional_json(
+        request,
+        "activities",
+        [CATALOG_SCOPE],
+        lambda: get_catalog(db).definitions_body,
     )
-    return rows
 
 
 @router.post(
@@ -676,6 +767,7 @@ def create_activity_definition(
 
     db.commit()
     db.refresh(activity)
+    invalidate_catalog()
     return activity
 
 
@@ -687,19 +779,12 @@ def list_activity_schedules_for_project(
     project_id: UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     """
     List all scheduled activities for a project, ordered by scheduled_start_date.
     """
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(status_code=404, detail="Project not found or not accessible")
 
     rows = (
@@ -746,20 +831,13 @@ def create_activity_schedule(
     payload: schemas.ActivityScheduleItemCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     """
     Schedule a catalog activity onto a project.
     """
 
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(status_code=404, detail="Project not found or not accessible")
 
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
@@ -800,6 +878,7 @@ def create_activity_schedule(
     )
     db.add(sched)
     db.flush()
+    record_created(db, project_id, [sched.status])
 
     log_action(
         db=db,
@@ -819,6 +898,9 @@ def create_activity_schedule(
 
     db.commit()
     db.refresh(sched)
+    node = ScheduleNode.from_schedule(sched)
+    apply_change(project_id, lambda graph: graph.add_node(node))
+    refresh_schedule_status(db, project_id, current_user.id)
 
     return schemas.ActivityScheduleRead(
         id=sched.id,
@@ -835,47 +917,488 @@ def create_activity_schedule(
     )
 
 
-# GET catalog of activities (DB stored)
-@router.get("/projects/{project_id}/activities/catalog")
-def get_activity_catalog(
+@router.post(
+    "/projects/{project_id}/activity-schedules/bulk",
+    response_model=List[schemas.ActivityScheduleRead],
+)
+def create_activity_schedules_bulk(
     project_id: UUID,
+    payload: schemas.ActivityScheduleBulkCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
-    # user must be a member of the project
-    exists = (
-        db.query(models.ProjectMember)
+    """
+    Schedule many activities onto a project in one transaction, optionally
+    creating new custom activities that the items refer to by `key`.
+
+    Activity and member ids are validated with one IN query each, the
+    activities and schedules are inserted with one multi-row INSERT each,
+    and a single ACTIVITY_SCHEDULES_BULK_CREATED audit entry covers the
+    batch. Nothing is written if any item is invalid.
+    """
+
+    if access is None:
+        raise HTTPException(status_code=404, detail="Project not found or not accessible")
+
+    # 1. Validate the request shape
+    new_keys = [a.key for a in payload.new_activities]
+    if len(set(new_keys)) != len(new_keys):
+        raise HTTPException(status_code=400, detail="Duplicate key in new_activities")
+
+    for i, item in enumerate(payload.items):
+        if (item.activity_id is None) == (item.new_activity_key is None):
+            raise HTTPException(
+                status_code=400,
+                detail=f"items[{i}]: set exactly one of activity_id or new_activity_key",
+            )
+        if item.new_activity_key is not None and item.new_activity_key not in new_keys:
+            raise HTTPException(
+                status_code=400,
+                detail=f"items[{i}]: unknown new_activity_key {item.new_activity_key!r}",
+            )
+        if item.scheduled_end_date and item.scheduled_end_date < item.scheduled_start_date:
+            raise HTTPException(
+                status_code=400,
+                detail=f"items[{i}]: scheduled_end_date is before scheduled_start_date",
+            )
+
+    # 2. One lookup each for existing activities and assigned members
+    activity_ids = {item.activity_id for item in payload.items if item.activity_id is not None}
+    activities: Dict[UUID, tuple[str, Optional[str]]] = {}
+    if activity_ids:
+        activities = {
+            row.id: (row.name, row.description)
+            for row in db.query(
+                models.Activity.id,
+                models.Activity.name,
+                models.Activity.description,
+            ).filter(models.Activity.id.in_(activity_ids))
+        }
+        missing = activity_ids - activities.keys()
+        if missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid activity_id: {', '.join(sorted(str(m) for m in missing))}",
+            )
+
+    member_ids = {
+        item.project_member_id for item in payload.items if item.project_member_id is not None
+    }
+    if member_ids:
+        found = {
+            member_id
+            for (member_id,) in db.query(models.ProjectMember.id).filter(
+                models.ProjectMember.id.in_(member_ids),
+                models.ProjectMember.project_id == project_id,
+            )
+        }
+        missing_members = member_ids - found
+        if missing_members:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid project_member_id for this project: "
+                + ", ".join(str(m) for m in sorted(missing_members)),
+            )
+
+    # 3. Insert new custom activities, then all schedules
+    new_activity_ids: Dict[str, UUID] = {}
+    activity_rows = []
+    for new in payload.new_activities:
+        activity_id = uuid.uuid4()
+        new_activity_ids[new.key] = activity_id
+        activities[activity_id] = (new.name, new.description)
+        activity_rows.append(
+            {
+                "id": activity_id,
+                "name": new.name,
+                "description": new.description,
+                "is_custom": True,
+                "created_by_id": current_user.id,
+            }
+        )
+    insert_rows(db, models.Activity.__table__, activity_rows, conflict_columns=["id"])
+
+    created: List[schemas.ActivityScheduleRead] = []
+    schedule_rows = []
+    for item in payload.items:
+        activity_id = item.activity_id or new_activity_ids[item.new_activity_key]
+        schedule_id = uuid.uuid4()
+        schedule_rows.append(
+            {
+                "id": schedule_id,
+                "project_id": project_id,
+                "activity_id": activity_id,
+                "project_member_id": item.project_member_id,
+                "scheduled_start_date": item.scheduled_start_date,
+                "scheduled_end_date": item.scheduled_end_date,
+                "status": models.ActivityStatus.SCHEDULED,
+            }
+        )
+        name, description = activities[activity_id]
+        created.append(
+            schemas.ActivityScheduleRead(
+                id=schedule_id,
+                project_id=project_id,
+                activity_id=activity_id,
+                activity_name=name,
+                description=description,
+                project_member_id=item.project_member_id,
+                scheduled_start_date=item.scheduled_start_date,
+                scheduled_end_date=item.scheduled_end_date,
+                status=models.ActivityStatus.SCHEDULED.value,
+            )
+        )
+    insert_rows(db, models.ActivitySchedule.__table__, schedule_rows, conflict_columns=["id"])
+    record_created(db, project_id, [row["status"] for row in schedule_rows])
+
+    # 4. One audit entry for the whole batch
+    start_dates = [item.scheduled_start_date for item in payload.items]
+    log_action(
+        db=db,
+        user_id=current_user.id,
+        action="ACTIVITY_SCHEDULES_BULK_CREATED",
+        entity_type="Project",
+        entity_id=project_id,
+        project_id=project_id,
+        metadata={
+            "count": len(schedule_rows),
+            "schedule_ids": [str(row["id"]) for row in schedule_rows],
+            "custom_activities": [new.name for new in payload.new_activities],
+            "first_start_date": str(min(start_dates)),
+            "last_start_date": str(max(start_dates)),
+        },
+    )
+
+    db.commit()
+    touch_project(project_id, "activities", "project")
+    if activity_rows:
+        invalidate_catalog()
+    refresh_schedule_status(db, project_id, current_user.id)
+
+    return created
+
+
+def _get_schedule_or_404(
+    db: Session,
+    project_id: UUID,
+    schedule_id: UUID,
+    for_update: bool = False,
+) -> models.ActivitySchedule:
+    query = (
+        db.query(models.ActivitySchedule)
+        .options(joinedload(models.ActivitySchedule.activity))
         .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
+            models.ActivitySchedule.id == schedule_id,
+            models.ActivitySchedule.project_id == project_id,
+        )
+    )
+    if for_update:
+        # Lock only the schedule row (the activity join is an outer join)
+        query = query.with_for_update(of=models.ActivitySchedule)
+    sched = query.first()
+    if not sched:
+        raise HTTPException(status_code=404, detail="Activity schedule not found")
+    return sched
+
+
+@router.patch(
+    "/projects/{project_id}/activity-schedules/{schedule_id}",
+    response_model=schemas.ActivityScheduleRead,
+)
+def update_activity_schedule(
+    project_id: UUID,
+    schedule_id: UUID,
+    payload: schemas.ActivityScheduleUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
+):
+    """
+    Change a scheduled activity's dates, actuals, status or assignee. The
+    critical path is updated incrementally and the project status
+    re-derived.
+    """
+
+    if access is None:
+        raise HTTPException(status_code=404, detail="Project not found or not accessible")
+
+    # Locked until commit: the old status feeds the progress counter
+    # deltas, so concurrent PATCHes must not both see the same one
+    sched = _get_schedule_or_404(db, project_id, schedule_id, for_update=True)
+
+    changes: Dict[str, Dict[str, Any]] = {}
+    for field in (
+        "project_member_id",
+        "scheduled_start_date",
+        "scheduled_end_date",
+        "actual_start_date",
+        "actual_end_date",
+    ):
+        new_value = getattr(payload, field)
+        old_value = getattr(sched, field)
+        if new_value is not None and new_value != old_value:
+            setattr(sched, field, new_value)
+            changes[field] = {"old": str(old_value) if old_value else None, "new": str(new_value)}
+
+    if payload.status is not None:
+        try:
+            new_status = models.ActivityStatus(payload.status.upper())
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Unknown status {payload.status!r}")
+        if new_status != sched.status:
+            changes["status"] = {"old": sched.status.value if sched.status else None, "new": new_status.value}
+            record_status_change(db, project_id, sched.status, new_status)
+            sched.status = new_status
+
+    if "project_member_id" in changes:
+        member = (
+            db.query(models.ProjectMember.id)
+            .filter(
+                models.ProjectMember.id == sched.project_member_id,
+                models.ProjectMember.project_id == project_id,
+            )
+            .first()
+        )
+        if not member:
+            raise HTTPException(status_code=400, detail="Invalid project_member_id for this project")
+
+    if sched.scheduled_end_date and sched.scheduled_end_date < sched.scheduled_start_date:
+        raise HTTPException(
+            status_code=400,
+            detail="scheduled_end_date is before scheduled_start_date",
+        )
+
+    if changes:
+        log_action(
+            db=db,
+            user_id=current_user.id,
+            action="ACTIVITY_SCHEDULE_UPDATED",
+            entity_type="ActivitySchedule",
+            entity_id=sched.id,
+            project_id=project_id,
+            metadata={"changes": changes},
+        )
+        db.commit()
+        db.refresh(sched)
+        node = ScheduleNode.from_schedule(sched)
+        apply_change(project_id, lambda graph: graph.update_node(node))
+        refresh_schedule_status(db, project_id, current_user.id)
+
+    return schemas.ActivityScheduleRead(
+        id=sched.id,
+        project_id=sched.project_id,
+        activity_id=sched.activity_id,
+        activity_name=sched.activity.name,
+        description=sched.activity.description,
+        project_member_id=sched.project_member_id,
+        scheduled_start_date=sched.scheduled_start_date,
+        scheduled_end_date=sched.scheduled_end_date,
+        actual_start_date=sched.actual_start_date,
+        actual_end_date=sched.actual_end_date,
+        status=sched.status.value if sched.status else None,
+    )
+
+
+@router.post(
+    "/projects/{project_id}/activity-schedules/{schedule_id}/dependencies",
+    response_model=schemas.ActivityDependencyRead,
+)
+def add_activity_dependency(
+    project_id: UUID,
+    schedule_id: UUID,
+    payload: schemas.ActivityDependencyCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
+):
+    """
+    Make `schedule_id` start only after `predecessor_id` finishes (plus
+    lag_days). Rejected with 409 if it would create a cycle.
+    """
+
+    if access is None:
+        raise HTTPException(status_code=404, detail="Project not found or not accessible")
+
+    found = {
+        sched_id
+        for (sched_id,) in db.query(models.ActivitySchedule.id).filter(
+            models.ActivitySchedule.id.in_([schedule_id, payload.predecessor_id]),
+            models.ActivitySchedule.project_id == project_id,
+        )
+    }
+    if found != {schedule_id, payload.predecessor_id}:
+        raise HTTPException(status_code=404, detail="Activity schedule not found")
+
+    # Checked under the project lock against the database, not this
+    # worker's cached graph: concurrent A->B and B->A must not both pass
+    lock_project_dependencies(db, project_id)
+    if dependency_would_cycle(db, payload.predecessor_id, schedule_id):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Dependency would create a cycle")
+
+    dependency = (
+        db.query(models.ActivityDependency)
+        .filter(
+            models.ActivityDependency.predecessor_id == payload.predecessor_id,
+            models.ActivityDependency.successor_id == schedule_id,
         )
         .first()
     )
-    if not exists:
-        raise HTTPException(status_code=403, detail="Not a project member.")
+    if dependency is None:
+        dependency = models.ActivityDependency(
+            predecessor_id=payload.predecessor_id,
+            successor_id=schedule_id,
+            project_id=project_id,
+        )
+        db.add(dependency)
+    dependency.lag_days = payload.lag_days
 
-    items = (
-        db.query(models.Activity)
-        .order_by(models.Activity.name.asc())
-        .all()
+    log_action(
+        db=db,
+        user_id=current_user.id,
+        action="ACTIVITY_DEPENDENCY_SET",
+        entity_type="ActivitySchedule",
+        entity_id=schedule_id,
+        project_id=project_id,
+        metadata={"predecessor_id": str(payload.predecessor_id), "lag_days": payload.lag_days},
     )
+    db.commit()
 
-    return [
-        {
-            "id": str(a.id),
-            "name": a.name,
-            "description": a.description,
-            "is_custom": a.is_custom,
-        }
-        for a in items
-    ]
+    apply_change(
+        project_id,
+        lambda graph: graph.add_edge(payload.predecessor_id, schedule_id, payload.lag_days),
+    )
+    refresh_schedule_status(db, project_id, current_user.id)
+
+    return schemas.ActivityDependencyRead(
+        predecessor_id=payload.predecessor_id,
+        successor_id=schedule_id,
+        lag_days=payload.lag_days,
+    )
 
 
-@router.get("/projects/{project_id}/activities")
-def list_project_activities(
+@router.delete(
+    "/projects/{project_id}/activity-schedules/{schedule_id}/dependencies/{predecessor_id}",
+    status_code=204,
+)
+def remove_activity_dependency(
+    project_id: UUID,
+    schedule_id: UUID,
+    predecessor_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
+):
+    """
+    Drop the dependency of `schedule_id` on `predecessor_id`.
+    """
+
+    if access is None:
+        raise HTTPException(status_code=404, detail="Project not found or not accessible")
+
+    dependency = (
+        db.query(models.ActivityDependency)
+        .filter(
+            models.ActivityDependency.predecessor_id == predecessor_id,
+            models.ActivityDependency.successor_id == schedule_id,
+            models.ActivityDependency.project_id == project_id,
+        )
+        .first()
+    )
+    if not dependency:
+        raise HTTPException(status_code=404, detail="Dependency not found")
+
+    db.delete(dependency)
+    log_action(
+        db=db,
+        user_id=current_user.id,
+        action="ACTIVITY_DEPENDENCY_REMOVED",
+        entity_type="ActivitySchedule",
+        entity_id=schedule_id,
+        project_id=project_id,
+        metadata={"predecessor_id": str(predecessor_id)},
+    )
+    db.commit()
+
+    apply_change(project_id, lambda graph: graph.remove_edge(predecessor_id, schedule_id))
+    refresh_schedule_status(db, project_id, current_user.id)
+    return None
+
+
+@router.get(
+    "/projects/{project_id}/schedule",
+    response_model=schemas.ProjectScheduleRead,
+)
+def get_project_schedule(
     project_id: UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
+):
+    """
+    Critical-path timings for every scheduled activity (in dependency
+    order), the expected delay and the derived project status. Read-only:
+    the status is stored by the schedule write routes.
+    """
+
+    if access is None:
+        raise HTTPException(status_code=404, detail="Project not found or not accessible")
+
+    try:
+        summary = project_schedule_summary(db, project_id, with_timings=True)
+    except CycleError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+    return schemas.ProjectScheduleRead(
+        project_id=project_id,
+        status=summary.status,
+        delay_days=summary.delay_days,
+        projected_finish=summary.projected_finish,
+        target_finish=summary.target_finish,
+        activities=[
+            schemas.ActivityTimingRead(
+                schedule_id=t.schedule_id,
+                early_start=t.early_start,
+                early_finish=t.early_finish,
+                late_start=t.late_start,
+                late_finish=t.late_finish,
+                total_float=t.total_float,
+                critical=t.critical,
+            )
+            for t in summary.timings
+        ],
+    )
+
+
+# GET catalog of activities (DB stored)
+@router.get("/projects/{project_id}/activities/catalog")
+def get_activity_catalog(
+    project_id: UUID,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
+):
+    # user must be a member of the project
+    if access is None:
+        raise HTTPException(status_code=403, detail="Not a project member.")
+    # Same body for every project
+    return conditional_json(
+        request,
+        "project_activity_catalog",
+        [CATALOG_SCOPE],
+        lambda: get_catalog(db).project_catalog_body,
+    )
+
+
+@router.get("/projects/{project_id}/activities")
+async def list_project_activities(
+    project_id: UUID,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+    access: Optional[ProjectAccess] = Depends(project_access_async),
 ):
     """
     Return all scheduled activities for this project, in the shape
@@ -893,20 +1416,21 @@ def list_project_activities(
     """
 
     # Ensure the current user is a member of the project
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(status_code=404, detail="Project not found or not accessible")
 
+    return await conditional_json_async(
+        request,
+        "project_activities",
+        [project_scope(project_id, "activities"), CATALOG_SCOPE],
+        lambda: _project_activity_rows(db, project_id),
+    )
+
+
+async def _project_activity_rows(db: AsyncSession, project_id: UUID) -> List[dict]:
     # Join ActivitySchedule with Activity to pull the catalog info
-    rows = (
-        db.query(
+    result = await db.execute(
+        select(
             models.ActivitySchedule,
             models.Activity.name.label("activity_name"),
             models.Activity.description.label("activity_description"),
@@ -915,10 +1439,10 @@ def list_project_activities(
             models.Activity,
             models.Activity.id == models.ActivitySchedule.activity_id,
         )
-        .filter(models.ActivitySchedule.project_id == project_id)
+        .where(models.ActivitySchedule.project_id == project_id)
         .order_by(models.ActivitySchedule.scheduled_start_date.asc())
-        .all()
     )
+    rows = result.all()
 
     activities: list[dict] = []
     for sched, activity_name, activity_description in rows:
@@ -955,17 +1479,10 @@ def create_scheduled_activity(
     payload: schemas.ActivityCreatePayload,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     # 0. Confirm membership
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(status_code=403, detail="Not a project member.")
 
     # 1. Resolve or create the Activity
@@ -1001,8 +1518,8 @@ def create_scheduled_activity(
         activity_id = activity.id
 
     # 2. Who is this scheduled for?
-    # If no project_member_id provided, default to the current membership.id
-    assignee_member_id = payload.project_member_id or membership.id
+    # If no project_member_id provided, default to the caller's own membership
+    assignee_member_id = payload.project_member_id or access.member_id
 
     # 3. Create the scheduled row (now with a real activity_id)
     schedule = models.ActivitySchedule(
@@ -1015,8 +1532,14 @@ def create_scheduled_activity(
     )
 
     db.add(schedule)
+    record_created(db, project_id, [schedule.status])
     db.commit()
     db.refresh(schedule)
+    node = ScheduleNode.from_schedule(schedule)
+    apply_change(project_id, lambda graph: graph.add_node(node))
+    refresh_schedule_status(db, project_id, current_user.id)
+    if create_custom:
+        invalidate_catalog()
 
     return {
         "id": str(schedule.id),
@@ -1038,6 +1561,7 @@ def check_in_to_activity(
     payload: Dict[str, Any] = Body(default={}),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     """
     Check in the current user to a scheduled activity.
@@ -1045,15 +1569,7 @@ def check_in_to_activity(
     NOTE: activity_id here refers to ActivitySchedule.id (scheduled row).
     """
 
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(status_code=404, detail="Project not found or not accessible")
 
     sched = (
@@ -1069,23 +1585,20 @@ def check_in_to_activity(
 
     # Close any open check-ins for this member on this project
     now = datetime.utcnow()
-    open_checkins = (
-        db.query(models.MemberCheckIn)
-        .filter(
-            models.MemberCheckIn.project_id == project_id,
-            models.MemberCheckIn.project_member_id == membership.id,
-            models.MemberCheckIn.check_out_time.is_(None),
-        )
-        .all()
+    closed_count = update_where(
+        db,
+        models.MemberCheckIn,
+        {"check_out_time": now},
+        models.MemberCheckIn.project_id == project_id,
+        models.MemberCheckIn.project_member_id == access.member_id,
+        models.MemberCheckIn.check_out_time.is_(None),
     )
-    for oc in open_checkins:
-        oc.check_out_time = now
 
     notes = payload.get("notes")
 
     checkin = models.MemberCheckIn(
         project_id=project_id,
-        project_member_id=membership.id,
+        project_member_id=access.member_id,
         activity_schedule_id=sched.id,
         check_in_time=now,
         notes=notes,
@@ -1102,13 +1615,15 @@ def check_in_to_activity(
         metadata={
             "activity_schedule_id": str(sched.id),
             "notes": notes,
+            "auto_closed_checkins": closed_count,
         },
     )
 
     db.commit()
     db.refresh(checkin)
+    touch_project(checkin.project_id, "project")
 
-    return {
+    result = {
         "id": str(checkin.id),
         "project_id": str(checkin.project_id),
         "project_member_id": checkin.project_member_id,
@@ -1121,6 +1636,12 @@ def check_in_to_activity(
         else None,
         "notes": checkin.notes,
     }
+    publish_checkin(
+        checkin.project_id,
+        "checkin.created",
+        {**result, "auto_closed_checkins": closed_count},
+    )
+    return result
 
 
 @router.post(
@@ -1186,8 +1707,9 @@ def check_out(
 
     db.commit()
     db.refresh(checkin)
+    touch_project(checkin.project_id, "project")
 
-    return {
+    result = {
         "id": str(checkin.id),
         "project_id": str(checkin.project_id),
         "project_member_id": checkin.project_member_id,
@@ -1200,6 +1722,8 @@ def check_out(
         else None,
         "notes": checkin.notes,
     }
+    publish_checkin(checkin.project_id, "checkin.closed", result)
+    return result
 
 
 # ---------- MESSAGES: list, create, mark read ----------
@@ -1209,40 +1733,50 @@ def check_out(
     "/projects/{project_id}/messages",
     response_model=List[schemas.ProjectMessageRead],
 )
-def get_project_messages(
+async def get_project_messages(
     project_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+    access: Optional[ProjectAccess] = Depends(project_access_async),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
     before: Optional[datetime] = Query(None),
 ):
     """
     Paginated list of messages for a project.
     - Returns latest messages first by default.
+    - When older messages exist, the X-Next-Cursor header holds the cursor
+      for the next (older) page; pass it back as `cursor`.
+    - `before` (a timestamp) is still accepted but can skip messages that
+      share a created_at; prefer `cursor`.
     """
 
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(status_code=404, detail="Project not found or not accessible")
 
     q = (
-        db.query(models.Message, models.User)
+        select(models.Message, models.User)
         .outerjoin(models.User, models.Message.sender_id == models.User.id)
-        .filter(models.Message.project_id == project_id)
-        .order_by(models.Message.created_at.desc())
+        .options(selectinload(models.Message.attachments))
+        .where(models.Message.project_id == project_id)
+        .order_by(models.Message.created_at.desc(), models.Message.id.desc())
     )
 
-    if before is not None:
-        q = q.filter(models.Message.created_at < before)
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        q = q.where(
+            tuple_(models.Message.created_at, models.Message.id) < (cursor_created_at, cursor_id)
+        )
+    elif before is not None:
+        q = q.where(models.Message.created_at < before)
 
-    rows = q.limit(limit).all()
+    # One extra row tells us whether an older page exists
+    rows = (await db.execute(q.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
 
     results: List[schemas.ProjectMessageRead] = []
     for message, user in rows:
@@ -1280,21 +1814,14 @@ def create_project_message(
     payload: schemas.ProjectMessageCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     """
     Create a new user message in a project.
     (Attachments will come from a separate upload flow later.)
     """
 
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(status_code=404, detail="Project not found or not accessible")
 
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
@@ -1322,9 +1849,10 @@ def create_project_message(
 
     db.commit()
     db.refresh(message)
+    touch_project(project_id, "project")
 
     sender_name = current_user.full_name or current_user.email
-    return schemas.ProjectMessageRead(
+    result = schemas.ProjectMessageRead(
         id=message.id,
         project_id=message.project_id,
         sender_id=message.sender_id,
@@ -1334,6 +1862,8 @@ def create_project_message(
         created_at=message.created_at,
         attachments=[],
     )
+    publish_message(result)
+    return result
 
 
 @router.post(
@@ -1343,49 +1873,17 @@ def mark_project_messages_read(
     project_id: UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     """
     Mark all messages in a project as read for the current user.
     """
 
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(status_code=404, detail="Project not found or not accessible")
 
-    existing_reads_subq = (
-        db.query(models.MessageRead.message_id)
-        .filter(models.MessageRead.user_id == current_user.id)
-        .subquery()
-    )
-
-    unread_messages = (
-        db.query(models.Message.id)
-        .filter(
-            models.Message.project_id == project_id,
-            models.Message.sender_id != current_user.id,
-            ~models.Message.id.in_(existing_reads_subq),
-        )
-        .all()
-    )
-
-    now = datetime.utcnow()
-    created_count = 0
-
-    for (message_id,) in unread_messages:
-        read = models.MessageRead(
-            message_id=message_id,
-            user_id=current_user.id,
-            read_at=now,
-        )
-        db.add(read)
-        created_count += 1
+    # One watermark upsert, however many messages were unread
+    created_count = mark_read(db, project_id, current_user.id)
 
     if created_count > 0:
         log_action(
@@ -1399,6 +1897,9 @@ def mark_project_messages_read(
         )
 
     db.commit()
+    if created_count > 0:
+        touch_project(project_id, "project")
+        publish_read(project_id, current_user.id, created_count)
 
     return {
         "project_id": str(project_id),
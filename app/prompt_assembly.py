@@ -0,0 +1,219 @@
+# app/prompt_assembly.py
+"""
+Token-budgeted prompt assembly for the chat graph.
+
+A prompt is built from up to five sections:
+  instructions -> conversation summary -> recent turns -> document excerpts -> question
+
+Older turns are folded into a rolling summary that is cached by a hash of
+the turns it covers, so long conversations cost one extra LLM call every
+CHAT_SUMMARY_EVERY turns instead of resending the whole history.
+"""
+import hashlib
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from app.cache import LRUCache
+from app.chunking import TextChunk, count_tokens, fit_to_budget
+
+load_dotenv()
+
+MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+
+# Most recent turns always sent verbatim
+CHAT_KEEP_TURNS = int(os.getenv("CHAT_KEEP_TURNS", "6"))
+# Older turns are summarized in blocks of this many, so the summary (and
+# the LLM call that produces it) only changes every few turns.
+CHAT_SUMMARY_EVERY = int(os.getenv("CHAT_SUMMARY_EVERY", "4"))
+# Caps for the verbatim history and the summary, in tokens
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "250"))
+CHAT_SUMMARY_CACHE_SIZE = int(os.getenv("CHAT_SUMMARY_CACHE_SIZE", "2048"))
+
+# Document-context budget per model family (longest matching prefix wins).
+# RAG_CONTEXT_TOKEN_BUDGET, when set, overrides the table.
+RAG_BUDGET_BY_MODEL: Dict[str, int] = {
+    "gpt-3.5": 1500,
+    "gpt-4o-mini": 3000,
+    "gpt-4o": 4000,
+    "gpt-4.1-nano": 2000,
+    "gpt-4.1-mini": 3000,
+    "gpt-4.1": 4000,
+}
+DEFAULT_RAG_BUDGET = 2000
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and a "
+    "construction project assistant. Keep decisions, numbers, names and open "
+    "questions; drop small talk. Reply with the summary only, in at most "
+    "{max_tokens} tokens.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New turns:\n{turns}"
+)
+
+
+def rag_budget(model: str = MODEL) -> int:
+    """
+    Max tokens of document excerpts to put in a prompt for `model`.
+    """
+    override = os.getenv("RAG_CONTEXT_TOKEN_BUDGET")
+    if override:
+        return int(override)
+    matches = [prefix for prefix in RAG_BUDGET_BY_MODEL if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_RAG_BUDGET
+    return RAG_BUDGET_BY_MODEL[max(matches, key=len)]
+
+
+@lru_cache(maxsize=4096)
+def _turn_tokens(turn: str) -> int:
+    # History turns are resent on every request; count each one once.
+    return count_tokens(turn)
+
+
+# ---------- Rolling summary cache ----------
+
+
+# prefix-hash -> summary of history[:n]. Hashes chain turn by turn, so the
+# summary for a longer prefix can be built from the longest cached prefix.
+_summary_cache: LRUCache[str] = LRUCache("chat_summary", max_size=CHAT_SUMMARY_CACHE_SIZE)
+
+
+def _prefix_hashes(turns: Sequence[str]) -> List[str]:
+    """
+    hashes[i] identifies turns[:i]; hashes[0] is the empty prefix.
+    """
+    hashes = [""]
+    for turn in turns:
+        digest = hashlib.blake2b(
+            (hashes[-1] + "\x00" + turn).encode("utf-8"), digest_size=16
+        )
+        hashes.append(digest.hexdigest())
+    return hashes
+
+
+def rolling_summary(
+    turns: Sequence[str],
+    complete: Callable[[str], str],
+    cache: LRUCache[str] = _summary_cache,
+) -> str:
+    """
+    Summary of `turns`, extending the longest cached prefix summary with
+    the remaining turns in one `complete` call.
+    """
+    if not turns:
+        return ""
+
+    hashes = _prefix_hashes(turns)
+    cached = cache.get(hashes[-1])
+    if cached is not None:
+        return cached
+
+    start, summary = 0, ""
+    for n in range(len(turns) - 1, 0, -1):
+        hit = cache.get(hashes[n])
+        if hit is not None:
+            start, summary = n, hit
+            break
+
+    prompt = SUMMARY_PROMPT.format(
+        max_tokens=CHAT_SUMMARY_TOKENS,
+        summary=summary or "(none)",
+        turns="\n".join(turns[start:]),
+    )
+    summary = complete(prompt).strip()
+    cache.set(hashes[-1], summary)
+    return summary
+
+
+# ---------- Assembly ----------
+
+
+@dataclass
+class AssembledPrompt:
+    text: str
+    # Token count per section plus "total"
+    tokens: Dict[str, int] = field(default_factory=dict)
+    chunks: List[TextChunk] = field(default_factory=list)
+
+
+def split_history(history: Sequence[str]) -> tuple[List[str], List[str]]:
+    """
+    Split prior turns into (to_summarize, verbatim).
+
+    The cut point moves in steps of CHAT_SUMMARY_EVERY so the summarized
+    prefix (and its cache key) stays the same for several turns in a row.
+    """
+    overflow = max(0, len(history) - CHAT_KEEP_TURNS)
+    cut = overflow - overflow % max(1, CHAT_SUMMARY_EVERY)
+    return list(history[:cut]), list(history[cut:])
+
+
+def _trim_to_budget(turns: List[str], budget: int) -> List[str]:
+    """
+    Newest turns that fit in `budget` tokens; the newest is always kept.
+    """
+    kept: List[str] = []
+    used = 0
+    for turn in reversed(turns):
+        tokens = _turn_tokens(turn)
+        if kept and used + tokens > budget:
+            break
+        kept.append(turn)
+        used += tokens
+    kept.reverse()
+    return kept
+
+
+def format_excerpt(idx: int, chunk: TextChunk) -> str:
+    label = f"{chunk.title} / {chunk.section}" if chunk.section else chunk.title
+    return f"Excerpt {idx} - {label} (chars {chunk.start}-{chunk.end}):\n{chunk.text}\n"
+
+
+def assemble_prompt(
+    question: str,
+    history: Sequence[str] = (),
+    chunks: Iterable[TextChunk] = (),
+    instructions: str = "",
+    complete: Optional[Callable[[str], str]] = None,
+    model: str = MODEL,
+) -> AssembledPrompt:
+    """
+    Build the prompt for one LLM call.
+
+    - history: prior "USER: ..." / "ASSISTANT: ..." turns, not including `question`
+    - chunks: ranked document chunks; packed up to rag_budget(model)
+    - complete: prompt -> text callable used to summarize older turns;
+      without it older turns are simply dropped
+    """
+    older, recent = split_history(history)
+    summary = rolling_summary(older, complete) if older and complete else ""
+    recent = _trim_to_budget(recent, CHAT_HISTORY_TOKEN_BUDGET) if recent else []
+    selected = fit_to_budget(chunks, rag_budget(model))
+
+    sections: Dict[str, str] = {
+        "instructions": instructions,
+        "summary": f"Conversation so far (summary):\n{summary}" if summary else "",
+        "history": "Recent conversation:\n" + "\n".join(recent) if recent else "",
+        "context": (
+            "Project documents:\n"
+            + "\n\n".join(format_excerpt(i, c) for i, c in enumerate(selected, start=1))
+            if selected
+            else ""
+        ),
+    }
+    if any(sections.values()):
+        sections["question"] = f"User question: {question}"
+    else:
+        # Nothing to add; send the question as-is
+        sections["question"] = question
+
+    text = "\n\n".join(body for body in sections.values() if body)
+    tokens = {name: count_tokens(body) for name, body in sections.items()}
+    tokens["total"] = count_tokens(text)
+
+    return AssembledPrompt(text=text, tokens=tokens, chunks=selected)
@@ -0,0 +1,141 @@
+# app/read_state.py
+"""
+Unread-message tracking with per-(project, user) read watermarks.
+
+A ProjectReadWatermark row holds the (created_at, id) of the newest
+message the user has read in a project; everything at or before it counts
+as read. Marking a project read is one upsert instead of one MessageRead
+row per message, and unread counts are range scans over
+messages(project_id, created_at, id) starting at the watermark.
+
+Per-message receipts (message_reads) are still written by mark_read(),
+in a single INSERT ... SELECT ... ON CONFLICT DO NOTHING, when
+WRITE_MESSAGE_RECEIPTS is on, for consumers that read that table
+directly; unread state no longer depends on them.
+"""
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, func, literal, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.bulk import insert_from_select
+
+WRITE_MESSAGE_RECEIPTS = os.getenv("WRITE_MESSAGE_RECEIPTS", "false").lower() in ("1", "true", "yes", "on")
+
+Watermark = models.ProjectReadWatermark
+
+
+def _message_key():
+    return tuple_(models.Message.created_at, models.Message.id)
+
+
+def _after_watermark():
+    # Messages with no watermark row are all unread
+    return or_(
+        Watermark.project_id.is_(None),
+        _message_key() > tuple_(Watermark.last_read_at, Watermark.last_read_message_id),
+    )
+
+
+def unread_counts(db: Session, project_ids: Iterable[UUID], user_id: UUID) -> Dict[UUID, int]:
+    """
+    {project id: messages from other senders after the user's watermark};
+    projects with nothing unread are omitted.
+    """
+    project_ids = list(project_ids)
+    if not project_ids:
+        return {}
+
+    # Correlated per project so each count is one index range scan
+    count = (
+        select(func.count())
+        .select_from(models.Message)
+        .where(
+            models.Message.project_id == models.Project.id,
+            models.Message.sender_id != user_id,
+            _after_watermark(),
+        )
+        .correlate(models.Project, Watermark)
+        .scalar_subquery()
+    )
+    rows = (
+        db.query(models.Project.id, count)
+        .outerjoin(
+            Watermark,
+            and_(Watermark.project_id == models.Project.id, Watermark.user_id == user_id),
+        )
+        .filter(models.Project.id.in_(project_ids))
+        .all()
+    )
+    return {project_id: n for project_id, n in rows if n}
+
+
+def _newest_message(db: Session, project_id: UUID) -> Optional[Tuple[datetime, UUID]]:
+    row = (
+        db.query(models.Message.created_at, models.Message.id)
+        .filter(models.Message.project_id == project_id)
+        .order_by(models.Message.created_at.desc(), models.Message.id.desc())
+        .first()
+    )
+    return (row.created_at, row.id) if row else None
+
+
+def mark_read(db: Session, project_id: UUID, user_id: UUID) -> int:
+    """
+    Move the user's watermark to the newest message in the project.
+    Returns how many unread messages that covered. Commit is handled by
+    the caller.
+    """
+    newest = _newest_message(db, project_id)
+    if newest is None:
+        return 0
+
+    newly_read = unread_counts(db, [project_id], user_id).get(project_id, 0)
+
+    if WRITE_MESSAGE_RECEIPTS and newly_read:
+        unread = (
+            select(func.gen_random_uuid(), models.Message.id, literal(user_id), func.now())
+            .outerjoin(
+                Watermark,
+                and_(Watermark.project_id == models.Message.project_id, Watermark.user_id == user_id),
+            )
+            .where(
+                models.Message.project_id == project_id,
+                models.Message.sender_id != user_id,
+                _after_watermark(),
+            )
+        )
+        insert_from_select(
+            db,
+            models.MessageRead,
+            ["id", "message_id", "user_id", "read_at"],
+            unread,
+            constraint="uq_message_user_read",
+        )
+
+    last_read_at, last_read_message_id = newest
+    stmt = pg_insert(Watermark).values(
+        project_id=project_id,
+        user_id=user_id,
+        last_read_at=last_read_at,
+        last_read_message_id=last_read_message_id,
+    )
+    # Never move a watermark backwards (e.g. a stale concurrent request)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Watermark.project_id, Watermark.user_id],
+            set_={
+                "last_read_at": stmt.excluded.last_read_at,
+                "last_read_message_id": stmt.excluded.last_read_message_id,
+                "updated_at": func.now(),
+            },
+            where=tuple_(stmt.excluded.last_read_at, stmt.excluded.last_read_message_id)
+            > tuple_(Watermark.last_read_at, Watermark.last_read_message_id),
+        )
+    )
+    return newly_read
@@ -0,0 +1,258 @@
+# app/realtime.py
+"""
+Real-time project events for WebSocket clients.
+
+Routes call the publish_* helpers AFTER their commit succeeds. The broker
+carries each event to every worker, and in each worker the ProjectHub
+fans it out to the sockets subscribed to that project. An event is
+serialized to JSON once; the same string is queued for every socket.
+
+Event types:
+  - message.created  data = ProjectMessageRead, plus a keyset `cursor`
+                     (app/pagination.py) for resuming after a reconnect
+  - read.updated     a member's read watermark moved
+  - checkin.created / checkin.closed
+  - access.revoked   data = {"user_ids": [...]} or {"user_ids": null} for
+                     everyone (member removed, project deleted). Only the
+                     affected sockets get it; the route then closes them
+                     with 4403.
+
+Brokers: "local" (in-process; enough for a single worker, also the
+stand-in for tests) or "redis" (pub/sub across workers, needs the `redis`
+package and REDIS_URL). Selected with REALTIME_BROKER.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+from uuid import UUID
+
+from dotenv import load_dotenv
+
+from app import schemas
+from app.pagination import encode_cursor
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REALTIME_BROKER = os.getenv("REALTIME_BROKER", "local")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Events buffered per socket; a client that falls further behind is
+# told to resync and disconnected.
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "256"))
+
+Deliver = Callable[[str, str], None]
+
+ACCESS_REVOKED = "access.revoked"
+# publish_event() always serializes "type" first
+_REVOKED_PREFIX = json.dumps({"type": ACCESS_REVOKED})[:-1]
+
+
+# ---------- Hub (per worker) ----------
+
+
+class Subscription:
+    def __init__(
+        self,
+        project_id: str,
+        user_id: Optional[str] = None,
+        max_queue: int = REALTIME_QUEUE_SIZE,
+    ):
+        self.project_id = project_id
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+        self.revoked = False
+
+
+class ProjectHub:
+    """
+    project id -> sockets in this process. deliver() may be called from
+    any thread (sync routes run in the threadpool, the Redis listener in
+    its own thread); queues are only touched on the event loop.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, project_id: str, user_id: Optional[str] = None) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        sub = Subscription(project_id, user_id)
+        with self._lock:
+            self._subscriptions.setdefault(project_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscriptions.get(sub.project_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscriptions[sub.project_id]
+
+    def deliver(self, project_id: str, payload: str) -> None:
+        with self._lock:
+            subs = list(self._subscriptions.get(project_id, ()))
+        if subs and payload.startswith(_REVOKED_PREFIX):
+            user_ids = json.loads(payload)["data"].get("user_ids")
+            subs = [sub for sub in subs if user_ids is None or sub.user_id in user_ids]
+            for sub in subs:
+                sub.revoked = True
+        if subs and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._fan_out, subs, payload)
+
+    @staticmethod
+    def _fan_out(subs: list, payload: str) -> None:
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                sub.overflowed = True
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscriptions.values())
+
+
+# ---------- Brokers ----------
+
+
+class Broker:
+    """
+    Carries serialized events between workers.
+    """
+
+    def start(self, deliver: Deliver) -> None:
+        raise NotImplementedError
+
+    def publish(self, project_id: str, payload: str) -> None:
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    def publish(self, project_id: str, payload: str) -> None:
+        self._deliver(project_id, payload)
+
+
+class RedisBroker(Broker):
+    """
+    One Redis channel per project; every worker pattern-subscribes to all
+    of them from a background thread.
+    """
+
+    prefix = "realtime:project:"
+
+    def __init__(self, url: str = REDIS_URL):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def start(self, deliver: Deliver) -> None:
+        prefix = self.prefix
+
+        def on_message(message: Dict[str, Any]) -> None:
+            channel = message["channel"].decode()
+            deliver(channel[len(prefix):], message["data"].decode())
+
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(**{f"{prefix}*": on_message})
+        self._thread = pubsub.run_in_thread(sleep_time=0.5, daemon=True)
+
+    def publish(self, project_id: str, payload: str) -> None:
+        self._client.publish(f"{self.prefix}{project_id}", payload)
+
+
+_hub: Optional[ProjectHub] = None
+_broker: Optional[Broker] = None
+_realtime_lock = threading.Lock()
+
+
+def _make_broker() -> Broker:
+    if REALTIME_BROKER == "redis":
+        return RedisBroker()
+    if REALTIME_BROKER == "local":
+        return LocalBroker()
+    raise ValueError(f"Unknown REALTIME_BROKER: {REALTIME_BROKER!r}")
+
+
+def get_hub() -> ProjectHub:
+    global _hub, _broker
+    if _hub is None:
+        with _realtime_lock:
+            if _hub is None:
+                hub = ProjectHub()
+                _broker = _make_broker()
+                _broker.start(hub.deliver)
+                _hub = hub
+    return _hub
+
+
+def set_broker(broker: Broker) -> None:
+    """
+    Swap the broker (and start a fresh hub on it), e.g. in tests.
+    """
+    global _hub, _broker
+    with _realtime_lock:
+        _hub = ProjectHub()
+        _broker = broker
+        broker.start(_hub.deliver)
+
+
+# ---------- Publishing ----------
+
+
+def publish_event(project_id: UUID | str, event_type: str, data: Dict[str, Any]) -> None:
+    """
+    Send an event to every connected member of the project. Never raises:
+    the write that triggered it has already been committed.
+    """
+    get_hub()
+    payload = json.dumps(
+        {"type": event_type, "project_id": str(project_id), "data": data},
+        default=str,
+    )
+    try:
+        _broker.publish(str(project_id), payload)
+    except Exception as exc:
+        logger.warning("realtime publish failed for project %s: %r", project_id, exc)
+
+
+def message_event_data(message: schemas.ProjectMessageRead) -> Dict[str, Any]:
+    data = message.model_dump(mode="json")
+    data["cursor"] = encode_cursor(message.created_at, message.id)
+    return data
+
+
+def publish_message(message: schemas.ProjectMessageRead) -> None:
+    publish_event(message.project_id, "message.created", message_event_data(message))
+
+
+def publish_read(project_id: UUID, user_id: UUID, messages_marked: int) -> None:
+    publish_event(
+        project_id,
+        "read.updated",
+        {"user_id": str(user_id), "messages_marked": messages_marked},
+    )
+
+
+def publish_checkin(project_id: UUID, event_type: str, checkin: Dict[str, Any]) -> None:
+    publish_event(project_id, event_type, checkin)
+
+
+def publish_access_revoked(project_id: UUID, user_ids: Optional[Iterable[UUID]] = None) -> None:
+    """
+    Disconnect these users' sockets for the project (None: everyone's).
+    """
+    publish_event(
+        project_id,
+        ACCESS_REVOKED,
+        {"user_ids": None if user_ids is None else [str(u) for u in user_ids]},
+    )
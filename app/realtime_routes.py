@@ -0,0 +1,190 @@
+# app/realtime_routes.py
+"""
+WebSocket channel per project: /projects/{project_id}/ws
+
+Auth: the usual Bearer token, either as an Authorization header or (for
+browsers, which can't set headers on WebSockets) as ?token=<jwt>.
+
+Resume: pass ?cursor=<cursor of the last message.created seen> and the
+messages created after it are sent first, oldest first, before live
+events. Live events can overlap that backlog, so clients should ignore
+message ids they already have. If more than REALTIME_RESUME_LIMIT
+messages were missed, a {"type": "resync"} event is sent instead and the
+client should reload through GET /projects/{id}/messages.
+
+Access: removing the member or deleting the project closes the socket
+with 4403 right away (access.revoked event). Token and membership are
+also re-checked every REALTIME_ACCESS_RECHECK_SECONDS, which catches
+deactivated users and expired tokens.
+"""
+import asyncio
+import json
+import os
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import selectinload
+
+from app import models, schemas
+from app.authz import get_project_access_async
+from app.database import AsyncSessionLocal
+from app.deps import get_current_user_async
+from app.pagination import decode_cursor
+from app.realtime import Subscription, get_hub, message_event_data
+
+REALTIME_RESUME_LIMIT = int(os.getenv("REALTIME_RESUME_LIMIT", "500"))
+REALTIME_ACCESS_RECHECK_SECONDS = float(os.getenv("REALTIME_ACCESS_RECHECK_SECONDS", "60"))
+
+# Application close codes (4000-4999)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_BAD_CURSOR = 4400
+CLOSE_TOO_SLOW = 4408
+
+router = APIRouter()
+
+
+async def _send_backlog(websocket: WebSocket, project_id: UUID, cursor: str) -> None:
+    created_at, message_id = decode_cursor(cursor)
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                select(models.Message, models.User)
+                .outerjoin(models.User, models.Message.sender_id == models.User.id)
+                .options(selectinload(models.Message.attachments))
+                .where(
+                    models.Message.project_id == project_id,
+                    tuple_(models.Message.created_at, models.Message.id) > (created_at, message_id),
+                )
+                .order_by(models.Message.created_at.asc(), models.Message.id.asc())
+                .limit(REALTIME_RESUME_LIMIT + 1)
+            )
+        ).all()
+
+    if len(rows) > REALTIME_RESUME_LIMIT:
+        await websocket.send_text(json.dumps({"type": "resync", "project_id": str(project_id)}))
+        return
+
+    for message, user in rows:
+        read = schemas.ProjectMessageRead(
+            id=message.id,
+            project_id=message.project_id,
+            sender_id=message.sender_id,
+            sender_name=(user.full_name or user.email) if user else None,
+            content=message.content,
+            message_type=message.message_type,
+            created_at=message.created_at,
+            attachments=[schemas.MessageAttachmentRead.from_orm(a) for a in message.attachments],
+        )
+        await websocket.send_text(
+            json.dumps(
+                {
+                    "type": "message.created",
+                    "project_id": str(project_id),
+                    "data": message_event_data(read),
+                },
+                default=str,
+            )
+        )
+
+
+async def _check_access(authorization: Optional[str], project_id: UUID) -> Optional[int]:
+    """
+    None if the caller may (still) listen, else the close code.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            user = await get_current_user_async(db=db, authorization=authorization)
+            access = await get_project_access_async(db, user.id, project_id)
+    except HTTPException:
+        return CLOSE_UNAUTHORIZED
+    return CLOSE_FORBIDDEN if access is None else None
+
+
+async def _pump(
+    websocket: WebSocket,
+    sub: Subscription,
+    authorization: Optional[str],
+    project_id: UUID,
+) -> None:
+    """
+    Forward hub events until the client disconnects, falls behind or
+    loses access to the project.
+    """
+
+    async def send_events() -> None:
+        while True:
+            payload = await sub.queue.get()
+            if sub.revoked:
+                await websocket.close(code=CLOSE_FORBIDDEN)
+                return
+            await websocket.send_text(payload)
+            if sub.overflowed and sub.queue.empty():
+                await websocket.send_text(json.dumps({"type": "resync", "project_id": sub.project_id}))
+                await websocket.close(code=CLOSE_TOO_SLOW)
+                return
+
+    async def receive() -> None:
+        # Clients only send keepalives; this notices the disconnect
+        while True:
+            await websocket.receive_text()
+
+    async def recheck_access() -> None:
+        while True:
+            await asyncio.sleep(REALTIME_ACCESS_RECHECK_SECONDS)
+            code = await _check_access(authorization, project_id)
+            if code is not None:
+                await websocket.close(code=code)
+                return
+
+    tasks = [
+        asyncio.create_task(send_events()),
+        asyncio.create_task(receive()),
+        asyncio.create_task(recheck_access()),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.websocket("/projects/{project_id}/ws")
+async def project_events(
+    websocket: WebSocket,
+    project_id: UUID,
+    token: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+):
+    authorization = websocket.headers.get("authorization") or (f"Bearer {token}" if token else None)
+    try:
+        async with AsyncSessionLocal() as db:
+            user = await get_current_user_async(db=db, authorization=authorization)
+            access = await get_project_access_async(db, user.id, project_id)
+    except HTTPException:
+        await websocket.close(code=CLOSE_UNAUTHORIZED)
+        return
+    if access is None:
+        await websocket.close(code=CLOSE_FORBIDDEN)
+        return
+
+    await websocket.accept()
+    hub = get_hub()
+    # Subscribe before reading the backlog so nothing falls in between
+    sub = hub.subscribe(str(project_id), str(user.id))
+    try:
+        if cursor is not None:
+            try:
+                await _send_backlog(websocket, project_id, cursor)
+            except HTTPException:
+                await websocket.close(code=CLOSE_BAD_CURSOR)
+                return
+        await _pump(websocket, sub, authorization, project_id)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,298 @@
+# app/response_cache.py
+"""
+Semantic cache for LLM answers to project questions.
+
+Entries are scoped by (project, role, node, project document version):
+
+  - the question is normalized (stemmed, stopwords dropped, question
+    words and negations kept) and an exact normalized match is a hit;
+  - otherwise the cached question with the highest cosine similarity is a
+    hit if it clears RESPONSE_CACHE_MIN_SIMILARITY;
+  - saving or deleting any ProjectDocument bumps the project's version
+    (see app/document_hooks.py), so older answers are never served again
+    and age out through TTL / LRU.
+
+Backends: "memory" (per process; also the stand-in for tests), "redis"
+(shared across workers, needs the `redis` package and REDIS_URL) or "off".
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.cache import register_cache
+from app.embedding_index import get_vector_index
+from app.text_search import STOPWORDS, stem
+
+load_dotenv()
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+# With the memory backend other workers only see a document change once
+# their entries expire, so the default matches RAG_INDEX_MAX_AGE_SECONDS.
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MIN_SIMILARITY = float(os.getenv("RESPONSE_CACHE_MIN_SIMILARITY", "0.9"))
+# Cached answers kept per scope, and scopes kept by the memory backend
+RESPONSE_CACHE_PER_SCOPE = int(os.getenv("RESPONSE_CACHE_PER_SCOPE", "64"))
+RESPONSE_CACHE_MAX_SCOPES = int(os.getenv("RESPONSE_CACHE_MAX_SCOPES", "1024"))
+# Only serve/store answers when the conversation has at most this many
+# prior turns; follow-ups like "and the second one?" depend on history.
+RESPONSE_CACHE_MAX_HISTORY = int(os.getenv("RESPONSE_CACHE_MAX_HISTORY", "0"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# BM25 stopwords that change what is being asked: "when" vs "where is the
+# inspection", "can" vs "will", "or", negations.
+_KEEP_WORDS = frozenset(
+    """
+    how what when where which who why
+    no not
+    can will if or than
+    """.split()
+)
+
+
+@dataclass
+class CachedResponse:
+    question: str          # normalized question
+    vector: List[float]
+    reply: str
+    prompt_tokens: Dict[str, int] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+
+def normalize_question(question: str) -> str:
+    """
+    "What's the ROOF spec?" and "what is the roof specs" -> "what roof spec".
+    """
+    words = [w for w in _WORD_RE.findall(question.lower()) if w != "s"]
+    return " ".join(
+        stem(w) for w in words if w in _KEEP_WORDS or w not in STOPWORDS
+    )
+
+
+# ---------- Backends ----------
+
+
+class ResponseCacheBackend:
+    """
+    Storage for cached answers plus a per-project version counter.
+    """
+
+    def entries(self, scope: str) -> List[CachedResponse]:
+        raise NotImplementedError
+
+    def add(self, scope: str, entry: CachedResponse) -> None:
+        raise NotImplementedError
+
+    def version(self, project_id: str) -> int:
+        raise NotImplementedError
+
+    def bump_version(self, project_id: str) -> None:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        """
+        Number of cached answers, where cheap to know; 0 otherwise.
+        """
+        return 0
+
+
+class InMemoryResponseCacheBackend(ResponseCacheBackend):
+    def __init__(
+        self,
+        ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+        per_scope: int = RESPONSE_CACHE_PER_SCOPE,
+        max_scopes: int = RESPONSE_CACHE_MAX_SCOPES,
+    ):
+        self.ttl = ttl
+        self.per_scope = per_scope
+        self.max_scopes = max_scopes
+        self._scopes: "OrderedDict[str, List[CachedResponse]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def entries(self, scope: str) -> List[CachedResponse]:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            items = self._scopes.get(scope)
+            if items is None:
+                return []
+            self._scopes.move_to_end(scope)
+            items[:] = [e for e in items if e.created_at >= cutoff]
+            return list(items)
+
+    def add(self, scope: str, entry: CachedResponse) -> None:
+        with self._lock:
+            items = self._scopes.setdefault(scope, [])
+            self._scopes.move_to_end(scope)
+            items.append(entry)
+            del items[: -self.per_scope]
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+
+    def version(self, project_id: str) -> int:
+        return self._versions.get(project_id, 0)
+
+    def bump_version(self, project_id: str) -> None:
+        with self._lock:
+            self._versions[project_id] = self._versions.get(project_id, 0) + 1
+
+    def size(self) -> int:
+        return sum(len(items) for items in self._scopes.values())
+
+
+class RedisResponseCacheBackend(ResponseCacheBackend):
+    """
+    Shared store: one capped Redis list per scope (JSON entries, expiring
+    with the TTL) and an INCR counter per project for the version.
+    """
+
+    def __init__(
+        self,
+        url: str = REDIS_URL,
+        ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+        per_scope: int = RESPONSE_CACHE_PER_SCOPE,
+    ):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.per_scope = per_scope
+
+    def entries(self, scope: str) -> List[CachedResponse]:
+        cutoff = time.time() - self.ttl
+        raw = self._client.lrange(f"respcache:{scope}", 0, -1)
+        entries = [CachedResponse(**json.loads(item)) for item in raw]
+        return [e for e in entries if e.created_at >= cutoff]
+
+    def add(self, scope: str, entry: CachedResponse) -> None:
+        key = f"respcache:{scope}"
+        pipe = self._client.pipeline()
+        pipe.lpush(key, json.dumps(asdict(entry)))
+        pipe.ltrim(key, 0, self.per_scope - 1)
+        pipe.expire(key, int(self.ttl))
+        pipe.execute()
+
+    def version(self, project_id: str) -> int:
+        value = self._client.get(f"respcache:version:{project_id}")
+        return int(value) if value else 0
+
+    def bump_version(self, project_id: str) -> None:
+        self._client.incr(f"respcache:version:{project_id}")
+
+
+# ---------- Cache ----------
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        backend: ResponseCacheBackend,
+        min_similarity: float = RESPONSE_CACHE_MIN_SIMILARITY,
+        enabled: bool = True,
+    ):
+        self.backend = backend
+        self.min_similarity = min_similarity
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        register_cache("llm_response", self)
+
+    def __len__(self) -> int:
+        return self.backend.size()
+
+    def scope(self, project_id: str, role_key: Optional[str], node: str) -> str:
+        """
+        Cache scope at the project's current document version. Take it
+        once before answering and pass it to both lookup() and store(),
+        so an answer generated while a document was saved is filed under
+        the old version instead of the new one.
+        """
+        version = self.backend.version(project_id)
+        return f"{project_id}:{role_key or '-'}:{node}:v{version}"
+
+    def _embed(self, normalized: str) -> np.ndarray:
+        return get_vector_index().backend.embed([normalized])[0]
+
+    def lookup(self, scope: str, question: str) -> Optional[CachedResponse]:
+        normalized = normalize_question(question)
+        if not self.enabled or not normalized:
+            return None
+
+        entries = self.backend.entries(scope)
+        best: Optional[CachedResponse] = None
+        for entry in entries:
+            if entry.question == normalized:
+                best = entry
+                break
+
+        if best is None and entries:
+            query = self._embed(normalized)
+            matrix = np.asarray([e.vector for e in entries], dtype=np.float32)
+            scores = matrix @ query
+            top = int(np.argmax(scores))
+            if scores[top] >= self.min_similarity:
+                best = entries[top]
+
+        if best is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return best
+
+    def store(
+        self,
+        scope: str,
+        question: str,
+        reply: str,
+        prompt_tokens: Optional[Dict[str, int]] = None,
+    ) -> None:
+        normalized = normalize_question(question)
+        if not self.enabled or not normalized:
+            return
+        entry = CachedResponse(
+            question=normalized,
+            vector=self._embed(normalized).tolist(),
+            reply=reply,
+            prompt_tokens=prompt_tokens or {},
+        )
+        self.backend.add(scope, entry)
+
+    def invalidate_project(self, project_id: str) -> None:
+        if self.enabled:
+            self.backend.bump_version(project_id)
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if RESPONSE_CACHE_BACKEND == "off":
+                    _cache = ResponseCache(InMemoryResponseCacheBackend(), enabled=False)
+                elif RESPONSE_CACHE_BACKEND == "redis":
+                    _cache = ResponseCache(RedisResponseCacheBackend())
+                elif RESPONSE_CACHE_BACKEND == "memory":
+                    _cache = ResponseCache(InMemoryResponseCacheBackend())
+                else:
+                    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {RESPONSE_CACHE_BACKEND!r}")
+    return _cache
+
+
+def set_response_cache(cache: ResponseCache) -> None:
+    """
+    Swap the process-wide cache (e.g. a fresh in-memory one in tests).
+    """
+    global _cache
+    _cache = cache
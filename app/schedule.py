@@ -0,0 +1,703 @@
+# app/schedule.py
+"""
+Critical-path (CPM) schedule engine over a project's ActivitySchedules.
+
+A project's schedule is a DAG: nodes are ActivitySchedules, edges are
+ActivityDependency rows (finish-to-start plus lag_days). Days are date
+ordinals and finishes are exclusive, so an activity planned for the 3rd
+to the 5th occupies [3, 6).
+
+  - Forward pass: early start = max(planned start, predecessor early
+    finish + lag). Activities with actual dates are pinned to them.
+  - Backward pass: late finish = min(successor late start - lag); sinks
+    finish by the target: Project.end_date, or else the latest planned
+    end. A start that slips past the target shows up as negative float.
+  - Total float = late start - early start. The critical activities
+    are those with the least float.
+
+ScheduleGraph keeps the topological order and all four times between
+changes. An edit to one schedule or edge re-walks only what it can
+reach: descendants forward, ancestors backward, stopping wherever a
+value comes out unchanged. A new edge keeps the order valid by
+reordering just the affected window (Pearce-Kelly). Only a move of the
+target finish forces a full backward pass.
+
+Graphs are cached per worker, keyed on the project's "activities"
+version stamp (app/http_cache.py) and reloaded after
+SCHEDULE_GRAPH_MAX_AGE_SECONDS. Routes hand their change to
+apply_change() after committing; it patches the cached graph in place
+and bumps the stamp, and any other worker reloads on its next read.
+
+Project status is derived from the delay in days (see delay_days()):
+ON_TRACK, then BEHIND up to SCHEDULE_WAY_BEHIND_DAYS, then WAY_BEHIND;
+CATCHING_UP while recovering from WAY_BEHIND. Statuses set by hand
+outside that set (e.g. ON_HOLD) are left alone.
+"""
+import heapq
+import operator
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import audit, models
+from app.cache import LRUCache
+from app.http_cache import project_scope, scope_version, touch_project
+
+load_dotenv()
+
+SCHEDULE_CACHE_SIZE = int(os.getenv("SCHEDULE_CACHE_SIZE", "256"))
+# With the memory version store other workers' writes are invisible, so
+# cached graphs are also reloaded from the DB once they are this old.
+SCHEDULE_GRAPH_MAX_AGE_SECONDS = float(os.getenv("SCHEDULE_GRAPH_MAX_AGE_SECONDS", "300"))
+SCHEDULE_WAY_BEHIND_DAYS = int(os.getenv("SCHEDULE_WAY_BEHIND_DAYS", "7"))
+SCHEDULE_AUTO_STATUS = os.getenv("SCHEDULE_AUTO_STATUS", "true").lower() in ("1", "true", "yes")
+
+# Statuses the engine may overwrite; "active" is the column default
+AUTO_STATUSES = {"ON_TRACK", "CATCHING_UP", "BEHIND", "WAY_BEHIND", "ACTIVE"}
+
+Edge = Tuple[UUID, UUID, int]  # (predecessor id, successor id, lag days)
+
+
+class CycleError(ValueError):
+    """
+    The dependencies would make (or have made) the schedule cyclic.
+    """
+
+
+# ---------- Engine ----------
+
+
+@dataclass(frozen=True)
+class ScheduleNode:
+    """
+    Engine input for one ActivitySchedule.
+    """
+
+    schedule_id: UUID
+    start: date
+    end: Optional[date] = None
+    actual_start: Optional[date] = None
+    actual_end: Optional[date] = None
+    cancelled: bool = False
+
+    @classmethod
+    def from_schedule(cls, sched: Any) -> "ScheduleNode":
+        # Works for ORM objects and for column-tuple rows alike
+        actual_start = sched.actual_start_date
+        actual_end = sched.actual_end_date
+        # Status can be set without actual dates (PATCH, bulk scheduling):
+        # a completed activity is finished and an in-progress one started,
+        # on their planned dates unless told otherwise
+        if sched.status == models.ActivityStatus.COMPLETED and actual_end is None:
+            actual_start = actual_start or sched.scheduled_start_date
+            actual_end = max(
+                sched.scheduled_end_date or sched.scheduled_start_date, actual_start
+            )
+        elif sched.status == models.ActivityStatus.IN_PROGRESS and actual_start is None:
+            actual_start = sched.scheduled_start_date
+        return cls(
+            schedule_id=sched.id,
+            start=sched.scheduled_start_date,
+            end=sched.scheduled_end_date,
+            actual_start=actual_start,
+            actual_end=actual_end,
+            cancelled=sched.status == models.ActivityStatus.CANCELLED,
+        )
+
+    @property
+    def duration(self) -> int:
+        if self.cancelled:
+            return 0
+        if self.actual_start is not None and self.actual_end is not None:
+            return max(1, self.actual_end.toordinal() - self.actual_start.toordinal() + 1)
+        if self.end is None:
+            return 1
+        return max(1, self.end.toordinal() - self.start.toordinal() + 1)
+
+    @property
+    def planned_finish(self) -> int:
+        return (self.end or self.start).toordinal() + 1
+
+
+@dataclass(frozen=True)
+class ActivityTiming:
+    schedule_id: UUID
+    early_start: date
+    early_finish: date  # last working day, inclusive
+    late_start: date
+    late_finish: date   # inclusive
+    total_float: int
+    critical: bool
+
+
+class ScheduleGraph:
+    """
+    Index-based CPM state for one project. Not thread-safe by itself:
+    hold `lock` around reads and changes of a shared instance.
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[ScheduleNode],
+        edges: Iterable[Edge] = (),
+        deadline: Optional[date] = None,
+    ):
+        self.nodes: List[ScheduleNode] = []
+        self.index: Dict[UUID, int] = {}
+        # Per-node inputs as plain ints, so the passes never touch dates
+        self.duration: List[int] = []
+        self.floor: List[int] = []               # planned start
+        self.pinned: List[Optional[int]] = []    # early start fixed by actuals
+        self.planned: List[int] = []             # planned finish (exclusive)
+        self.succs: List[Dict[int, int]] = []    # successor -> lag
+        self.preds: List[Dict[int, int]] = []    # predecessor -> lag
+        self.es: List[int] = []
+        self.ef: List[int] = []
+        self.ls: List[int] = []
+        self.lf: List[int] = []
+        self.deadline = deadline.toordinal() + 1 if deadline else None
+        self.version = 0
+        self.lock = threading.Lock()
+
+        for node in nodes:
+            self._append(node)
+        for pred_id, succ_id, lag in edges:
+            u, v = self.index[pred_id], self.index[succ_id]
+            self.succs[u][v] = lag
+            self.preds[v][u] = lag
+
+        self.order = self._toposort()
+        self.pos = [0] * len(self.nodes)
+        for position, v in enumerate(self.order):
+            self.pos[v] = position
+        self.planned_max = max(self.planned, default=0)
+        self.recompute()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def _append(self, node: ScheduleNode) -> int:
+        v = len(self.nodes)
+        self.nodes.append(node)
+        self.index[node.schedule_id] = v
+        for column in (self.duration, self.floor, self.pinned, self.planned):
+            column.append(0)
+        self._set_inputs(v, node)
+        self.succs.append({})
+        self.preds.append({})
+        self.es.append(0)
+        self.ef.append(0)
+        self.ls.append(0)
+        self.lf.append(0)
+        return v
+
+    def _set_inputs(self, v: int, node: ScheduleNode) -> None:
+        self.nodes[v] = node
+        duration = node.duration
+        self.duration[v] = duration
+        self.floor[v] = node.start.toordinal()
+        self.planned[v] = node.planned_finish
+        if node.actual_start is not None:
+            self.pinned[v] = node.actual_start.toordinal()
+        elif node.actual_end is not None:
+            self.pinned[v] = node.actual_end.toordinal() + 1 - duration
+        else:
+            self.pinned[v] = None
+
+    def _toposort(self) -> List[int]:
+        # Kahn's algorithm
+        indegree = [len(p) for p in self.preds]
+        ready = [v for v, d in enumerate(indegree) if d == 0]
+        order: List[int] = []
+        while ready:
+            v = ready.pop()
+            order.append(v)
+            for s in self.succs[v]:
+                indegree[s] -= 1
+                if indegree[s] == 0:
+                    ready.append(s)
+        if len(order) != len(self.nodes):
+            stuck = sum(1 for d in indegree if d > 0)
+            raise CycleError(f"Dependency cycle among {stuck} activities")
+        return order
+
+    # --- passes ---
+
+    def _early(self, v: int) -> int:
+        es = self.pinned[v]
+        if es is None:
+            es = self.floor[v]
+            ef = self.ef
+            for p, lag in self.preds[v].items():
+                if ef[p] + lag > es:
+                    es = ef[p] + lag
+        return es
+
+    def _late(self, v: int) -> int:
+        succs = self.succs[v]
+        if not succs:
+            return self.finish
+        ls = self.ls
+        return min([ls[s] - lag for s, lag in succs.items()])
+
+    def _target_finish(self) -> int:
+        return self.deadline if self.deadline is not None else self.planned_max
+
+    def recompute(self) -> None:
+        """
+        Full forward and backward pass.
+        """
+        es, ef, duration = self.es, self.ef, self.duration
+        for v in self.order:
+            es[v] = self._early(v)
+            ef[v] = es[v] + duration[v]
+        self.finish = self._target_finish()
+        self._full_backward()
+
+    def _full_backward(self) -> None:
+        ls, lf, duration = self.ls, self.lf, self.duration
+        for v in reversed(self.order):
+            lf[v] = self._late(v)
+            ls[v] = lf[v] - duration[v]
+
+    def _forward(self, seeds: Iterable[int]) -> int:
+        queued = set(seeds)
+        heap = [(self.pos[v], v) for v in queued]
+        heapq.heapify(heap)
+        visited = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            queued.discard(v)
+            visited += 1
+            es = self._early(v)
+            ef = es + self.duration[v]
+            if es == self.es[v] and ef == self.ef[v]:
+                continue
+            self.es[v], self.ef[v] = es, ef
+            for s in self.succs[v]:
+                if s not in queued:
+                    queued.add(s)
+                    heapq.heappush(heap, (self.pos[s], s))
+        return visited
+
+    def _backward(self, seeds: Iterable[int]) -> int:
+        queued = set(seeds)
+        heap = [(-self.pos[v], v) for v in queued]
+        heapq.heapify(heap)
+        visited = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            queued.discard(v)
+            visited += 1
+            lf = self._late(v)
+            ls = lf - self.duration[v]
+            if ls == self.ls[v] and lf == self.lf[v]:
+                continue
+            self.ls[v], self.lf[v] = ls, lf
+            for p in self.preds[v]:
+                if p not in queued:
+                    queued.add(p)
+                    heapq.heappush(heap, (-self.pos[p], p))
+        return visited
+
+    def _propagate(self, forward: Sequence[int], backward: Sequence[int]) -> int:
+        """
+        Re-walk what the seeds can reach; returns the number of node
+        visits (for benchmarks).
+        """
+        visited = self._forward(forward)
+        finish = self._target_finish()
+        if finish != self.finish:
+            self.finish = finish
+            self._full_backward()
+            return visited + len(self.order)
+        return visited + self._backward(backward)
+
+    # --- changes ---
+
+    def update_node(self, node: ScheduleNode) -> int:
+        v = self.index[node.schedule_id]
+        old_planned = self.planned[v]
+        self._set_inputs(v, node)
+        if self.planned[v] >= self.planned_max:
+            self.planned_max = self.planned[v]
+        elif old_planned == self.planned_max:
+            self.planned_max = max(self.planned)
+        return self._propagate([v], [v])
+
+    def add_node(self, node: ScheduleNode) -> int:
+        # The graph may have been (re)loaded after the insert committed,
+        # so the node can already be there
+        if node.schedule_id in self.index:
+            return self.update_node(node)
+        v = self._append(node)
+        self.pos.append(len(self.order))
+        self.order.append(v)
+        self.planned_max = max(self.planned_max, self.planned[v])
+        # Unconnected, so its late times only depend on the target finish
+        self.lf[v] = self.finish
+        self.ls[v] = self.finish - self.duration[v]
+        return self._propagate([v], [v])
+
+    def add_edge(self, pred_id: UUID, succ_id: UUID, lag: int = 0) -> int:
+        u, v = self.index[pred_id], self.index[succ_id]
+        if u == v:
+            raise CycleError("An activity cannot depend on itself")
+        if v not in self.succs[u] and self.pos[u] > self.pos[v]:
+            self._reorder(u, v)
+        self.succs[u][v] = lag
+        self.preds[v][u] = lag
+        return self._propagate([v], [u])
+
+    def remove_edge(self, pred_id: UUID, succ_id: UUID) -> int:
+        u, v = self.index[pred_id], self.index[succ_id]
+        if self.succs[u].pop(v, None) is None:
+            return 0
+        del self.preds[v][u]
+        return self._propagate([v], [u])
+
+    def would_cycle(self, pred_id: UUID, succ_id: UUID) -> bool:
+        u, v = self.index[pred_id], self.index[succ_id]
+        if u == v:
+            return True
+        if self.pos[u] < self.pos[v]:
+            return False
+        return u in self._reachable(v, upper=self.pos[u])
+
+    def _reachable(self, start: int, upper: int) -> List[int]:
+        # Descendants of `start` whose position is <= upper
+        pos = self.pos
+        seen = {start}
+        stack = [start]
+        found: List[int] = []
+        while stack:
+            x = stack.pop()
+            found.append(x)
+            for s in self.succs[x]:
+                if s not in seen and pos[s] <= upper:
+                    seen.add(s)
+                    stack.append(s)
+        return found
+
+    def _reorder(self, u: int, v: int) -> None:
+        """
+        Make room for edge u -> v when u currently sorts after v: move
+        u's ancestors in the window before v's descendants in it.
+        """
+        lower, upper = self.pos[v], self.pos[u]
+        forward = self._reachable(v, upper)
+        if u in forward:
+            raise CycleError("Dependency would create a cycle")
+
+        seen = {u}
+        stack = [u]
+        backward: List[int] = []
+        while stack:
+            x = stack.pop()
+            backward.append(x)
+            for p in self.preds[x]:
+                if p not in seen and self.pos[p] > lower:
+                    seen.add(p)
+                    stack.append(p)
+
+        moved = sorted(backward, key=self.pos.__getitem__) + sorted(forward, key=self.pos.__getitem__)
+        slots = sorted(self.pos[x] for x in moved)
+        for slot, x in zip(slots, moved):
+            self.order[slot] = x
+            self.pos[x] = slot
+
+    # --- results ---
+
+    def min_float(self) -> int:
+        return min(map(operator.sub, self.ls, self.es), default=0)
+
+    def timings(self) -> List[ActivityTiming]:
+        least = self.min_float()
+        day = _day_cache()
+        result = []
+        for v in self.order:
+            es, ef, ls, lf = self.es[v], self.ef[v], self.ls[v], self.lf[v]
+            total_float = ls - es
+            result.append(
+                ActivityTiming(
+                    schedule_id=self.nodes[v].schedule_id,
+                    early_start=day(es),
+                    early_finish=day(max(es, ef - 1)),
+                    late_start=day(ls),
+                    late_finish=day(max(ls, lf - 1)),
+                    total_float=total_float,
+                    critical=total_float <= least,
+                )
+            )
+        return result
+
+    def projected_finish(self) -> Optional[date]:
+        if not self.nodes:
+            return None
+        return date.fromordinal(max(self.ef) - 1)
+
+    def target_finish(self) -> Optional[date]:
+        if not self.nodes and self.deadline is None:
+            return None
+        return date.fromordinal(self.finish - 1)
+
+    def delay_days(self, today: date) -> int:
+        """
+        Days the project will finish late at best: the plan's own overrun
+        (negative float), or an open activity already past its late
+        start (not started) or late finish (started).
+        """
+        t = today.toordinal()
+        delay = max(0, -self.min_float())
+        for node, ls, lf in zip(self.nodes, self.ls, self.lf):
+            if node.cancelled or node.actual_end is not None:
+                continue
+            if node.actual_start is None:
+                late = t - ls
+            else:
+                late = t + 1 - lf
+            if late > delay:
+                delay = late
+        return delay
+
+
+def _day_cache() -> Callable[[int], date]:
+    # Schedules span few distinct days; convert each ordinal once
+    cache: Dict[int, date] = {}
+
+    def day(ordinal: int) -> date:
+        value = cache.get(ordinal)
+        if value is None:
+            value = cache[ordinal] = date.fromordinal(ordinal)
+        return value
+
+    return day
+
+
+def derive_status(delay_days: int, previous: Optional[str] = None) -> str:
+    if delay_days <= 0:
+        return "ON_TRACK"
+    if delay_days > SCHEDULE_WAY_BEHIND_DAYS:
+        return "WAY_BEHIND"
+    if (previous or "").upper() in ("WAY_BEHIND", "CATCHING_UP"):
+        return "CATCHING_UP"
+    return "BEHIND"
+
+
+# ---------- Project graphs ----------
+
+_graphs: LRUCache[ScheduleGraph] = LRUCache(
+    "schedule_graphs", max_size=SCHEDULE_CACHE_SIZE, ttl=SCHEDULE_GRAPH_MAX_AGE_SECONDS
+)
+
+
+def _scope(project_id: UUID | str) -> str:
+    return project_scope(project_id, "activities")
+
+
+def load_graph(db: Session, project_id: UUID) -> ScheduleGraph:
+    schedules = (
+        db.query(
+            models.ActivitySchedule.id,
+            models.ActivitySchedule.scheduled_start_date,
+            models.ActivitySchedule.scheduled_end_date,
+            models.ActivitySchedule.actual_start_date,
+            models.ActivitySchedule.actual_end_date,
+            models.ActivitySchedule.status,
+        )
+        .filter(models.ActivitySchedule.project_id == project_id)
+        .order_by(models.ActivitySchedule.scheduled_start_date, models.ActivitySchedule.id)
+        .all()
+    )
+    edges = (
+        db.query(
+            models.ActivityDependency.predecessor_id,
+            models.ActivityDependency.successor_id,
+            models.ActivityDependency.lag_days,
+        )
+        .filter(models.ActivityDependency.project_id == project_id)
+        .all()
+    )
+    deadline = (
+        db.query(models.Project.end_date).filter(models.Project.id == project_id).scalar()
+    )
+    return ScheduleGraph(
+        [ScheduleNode.from_schedule(row) for row in schedules],
+        [(row.predecessor_id, row.successor_id, row.lag_days) for row in edges],
+        deadline=deadline,
+    )
+
+
+def get_schedule_graph(db: Session, project_id: UUID, fresh: bool = False) -> ScheduleGraph:
+    """
+    The project's graph, reloaded if its activities changed since it was
+    cached, if it is older than SCHEDULE_GRAPH_MAX_AGE_SECONDS, or if
+    `fresh`. Raises CycleError if the stored dependencies are cyclic.
+    """
+    key = str(project_id)
+    version = scope_version(_scope(project_id))
+    graph = None if fresh else _graphs.get(key)
+    if graph is None or graph.version != version:
+        graph = load_graph(db, project_id)
+        graph.version = version
+        _graphs.set(key, graph)
+    return graph
+
+
+def lock_project_dependencies(db: Session, project_id: UUID) -> None:
+    """
+    Serialize dependency writes of one project (row lock on the project,
+    held until the caller commits), so two requests can't each add one
+    half of a cycle after checking against the same state.
+    """
+    db.query(models.Project.id).filter(models.Project.id == project_id).with_for_update().first()
+
+
+def dependency_would_cycle(db: Session, predecessor_id: UUID, successor_id: UUID) -> bool:
+    """
+    Whether predecessor -> successor closes a cycle in the stored
+    dependencies, i.e. the predecessor is reachable from the successor.
+    Checked in SQL (recursive CTE) so it sees this transaction's state
+    rather than a possibly stale cached graph.
+    """
+    if predecessor_id == successor_id:
+        return True
+    dep = models.ActivityDependency
+    reach = (
+        select(dep.successor_id.label("id"))
+        .where(dep.predecessor_id == successor_id)
+        .cte("reach", recursive=True)
+    )
+    previous = reach.alias()
+    reach = reach.union(
+        select(dep.successor_id).where(dep.predecessor_id == previous.c.id)
+    )
+    return bool(db.scalar(select(select(reach.c.id).where(reach.c.id == predecessor_id).exists())))
+
+
+def apply_change(project_id: UUID, change: Callable[[ScheduleGraph], Any]) -> None:
+    """
+    After a committed schedule/dependency write: apply the same change
+    to the cached graph (if it is current) and bump the project's
+    activity and project versions.
+    """
+    graph = _graphs.get(str(project_id))
+    if graph is not None:
+        with graph.lock:
+            version = scope_version(_scope(project_id))
+            if graph.version == version:
+                try:
+                    change(graph)
+                    # Matches the bump below unless another write slips
+                    # in between, in which case readers just reload.
+                    graph.version = version + 1
+                except (CycleError, KeyError):
+                    _graphs.pop(str(project_id))
+    touch_project(project_id, "activities", "project")
+
+
+# ---------- Status ----------
+
+
+@dataclass(frozen=True)
+class ScheduleSummary:
+    status: Optional[str]
+    delay_days: int
+    projected_finish: Optional[date]
+    target_finish: Optional[date]
+    timings: List[ActivityTiming]
+
+
+def _derived_status(project: Optional[models.Project], delay: int) -> Optional[str]:
+    # None when the engine doesn't manage this project's status
+    status = project.status if project else None
+    if SCHEDULE_AUTO_STATUS and project is not None and (status or "ACTIVE").upper() in AUTO_STATUSES:
+        return derive_status(delay, status)
+    return None
+
+
+def project_schedule_summary(
+    db: Session,
+    project_id: UUID,
+    today: Optional[date] = None,
+    with_timings: bool = False,
+) -> ScheduleSummary:
+    """
+    Read-only: the schedule and the status the engine would derive for
+    it (the stored status if the engine doesn't manage it). Nothing is
+    written; see refresh_project_status().
+    """
+    summary, _ = _summarize(db, project_id, today, with_timings)
+    return summary
+
+
+def _summarize(
+    db: Session,
+    project_id: UUID,
+    today: Optional[date],
+    with_timings: bool,
+    fresh: bool = False,
+) -> Tuple[ScheduleSummary, Optional[models.Project]]:
+    today = today or date.today()
+    graph = get_schedule_graph(db, project_id, fresh=fresh)
+    with graph.lock:
+        delay = graph.delay_days(today)
+        projected = graph.projected_finish()
+        target = graph.target_finish()
+        timings = graph.timings() if with_timings else []
+
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    status = _derived_status(project, delay) or (project.status if project else None)
+    summary = ScheduleSummary(
+        status=status,
+        delay_days=delay,
+        projected_finish=projected,
+        target_finish=target,
+        timings=timings,
+    )
+    return summary, project
+
+
+def refresh_project_status(
+    db: Session,
+    project_id: UUID,
+    user_id: UUID,
+    today: Optional[date] = None,
+    with_timings: bool = False,
+) -> ScheduleSummary:
+    """
+    Recompute the schedule and, if the project's status is managed by the
+    engine, store the derived status (committing and auditing a change).
+    For write paths only; reads use project_schedule_summary().
+    """
+    summary, project = _summarize(db, project_id, today, with_timings)
+    if project is not None and summary.status != project.status:
+        # Never store a status derived from a cached graph that may miss
+        # other workers' writes: confirm it on a graph read from the DB
+        summary, project = _summarize(db, project_id, today, with_timings, fresh=True)
+    if project is not None and summary.status != project.status:
+        old = project.status
+        status_row = (
+            db.query(models.ProjectStatus).filter(models.ProjectStatus.key == summary.status).first()
+        )
+        project.status = summary.status
+        project.status_id = status_row.id if status_row else None
+        audit.record(
+            db,
+            user_id=user_id,
+            action="PROJECT_STATUS_DERIVED",
+            entity_type="Project",
+            entity_id=project_id,
+            project_id=project_id,
+            metadata={"old": old, "new": summary.status, "delay_days": summary.delay_days},
+        )
+        db.commit()
+        touch_project(project_id, "project")
+    return summary
@@ -241,7 +241,12 @@ class ProjectWithRoleSummary(BaseModel):
 
     # 🔹 Dashboard extras
     completion_percentage: float = 0.0
+    total_activities: int = 0
+    completed_activities: int = 0
+    blocked_activities: int = 0
+    in_progress_activities: int = 0
     has_unread_messages: bool = False
+    unread_message_count: int = 0
     todays_activities: List[ProjectActivityTodaySummary] = Field(default_factory=list)
     
     project_type: Optional[str] = None
@@ -270,7 +275,13 @@ class ProjectAssistantMessage(BaseModel):
 
 
 class ProjectAssistantHistoryResponse(BaseModel):
-    messages: list[ProjectAssistantMessage]
+    messages: list[ProjectAssistantMessage]  # oldest first
+    # Opaque cursors: pass older_cursor as `before` to page back in time,
+    # newer_cursor as `after` to fetch messages newer than this page.
+    older_cursor: Optional[str] = None
+    newer_cursor: Optional[str] = None
+    has_more_older: bool = False
+    has_more_newer: bool = False
 
 
 class ProjectIntakeCreate(BaseModel):
@@ -379,6 +390,26 @@ class ActivityScheduleItemCreate(BaseModel):
     scheduled_end_date: Optional[date] = None
 
 
+class ActivityScheduleBulkNewActivity(BaseModel):
+    key: str                       # referenced by items[].new_activity_key
+    name: str
+    description: Optional[str] = None
+
+
+class ActivityScheduleBulkItem(BaseModel):
+    # Exactly one of activity_id / new_activity_key
+    activity_id: Optional[UUID] = None
+    new_activity_key: Optional[str] = None
+    project_member_id: Optional[int] = None
+    scheduled_start_date: date
+    scheduled_end_date: Optional[date] = None
+
+
+class ActivityScheduleBulkCreate(BaseModel):
+    new_activities: List[ActivityScheduleBulkNewActivity] = Field(default_factory=list, max_length=200)
+    items: List[ActivityScheduleBulkItem] = Field(min_length=1, max_length=1000)
+
+
 class ActivityScheduleRead(BaseModel):
     id: UUID
     project_id: UUID
@@ -393,6 +424,45 @@ class ActivityScheduleRead(BaseModel):
     actual_end_date: Optional[date] = None
     status: Optional[str] = None
     
+class ActivityScheduleUpdate(BaseModel):
+    project_member_id: Optional[int] = None
+    scheduled_start_date: Optional[date] = None
+    scheduled_end_date: Optional[date] = None
+    actual_start_date: Optional[date] = None
+    actual_end_date: Optional[date] = None
+    status: Optional[str] = None   # ActivityStatus value, e.g. "IN_PROGRESS"
+
+
+class ActivityDependencyCreate(BaseModel):
+    predecessor_id: UUID           # ActivitySchedule.id that must finish first
+    lag_days: int = Field(default=0, ge=0, le=365)
+
+
+class ActivityDependencyRead(BaseModel):
+    predecessor_id: UUID
+    successor_id: UUID
+    lag_days: int
+
+
+class ActivityTimingRead(BaseModel):
+    schedule_id: UUID
+    early_start: date
+    early_finish: date
+    late_start: date
+    late_finish: date
+    total_float: int
+    critical: bool
+
+
+class ProjectScheduleRead(BaseModel):
+    project_id: UUID
+    status: Optional[str] = None
+    delay_days: int
+    projected_finish: Optional[date] = None
+    target_finish: Optional[date] = None
+    activities: List[ActivityTimingRead] = Field(default_factory=list)
+
+
 class ActivityCatalogItem(BaseModel):
     id: UUID
     name: str
@@ -400,6 +470,12 @@ class ActivityCatalogItem(BaseModel):
     is_custom: Optional[bool] = False    
 
 
+class ActivityCatalogPage(BaseModel):
+    items: List[ActivityCatalogItem]
+    total: int
+    next_offset: Optional[int] = None
+
+
 class ActivityCreatePayload(BaseModel):
 
     activity_id: Optional[UUID] = None   
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 
 from .database import SessionLocal, engine, Base
 from app import models
+from app.bulk import insert_rows
 
 # Ensure tables exist (for safety in dev)
 Base.metadata.create_all(bind=engine)
@@ -13,8 +14,9 @@ def seed_roles_and_permissions(db: Session):
         # Project-level
         ("project.create", "Create projects", "Project"),
         ("project.view", "View project details", "Project"),
-        ("project.update", "Edit project details", "Project"),
+        ("project.update", "Edit project details (unused; see project.manage)", "Project"),
         ("project.archive", "Archive / close projects", "Project"),
+        ("project.manage", "Edit project name, description and status", "Project"),
 
         # Membership
         ("member.manage", "Invite/remove project members", "Membership"),
@@ -27,7 +29,9 @@ def seed_roles_and_permissions(db: Session):
 
         # Docs / tools
         ("docs.view", "View project documents", "Docs"),
-        ("docs.upload", "Upload project documents", "Docs"),
+        ("docs.upload", "Upload project documents (unused; see docs.manage)", "Docs"),
+        ("docs.manage", "Add and edit project documents", "Docs"),
+        ("docs.delete", "Delete project documents", "Docs"),
         ("tools.ai_use", "Use AI assistant on project", "Tools"),
 
         # Financials / bids
@@ -37,22 +41,16 @@ def seed_roles_and_permissions(db: Session):
         ("bids.approve", "Approve bids / selections", "Financials"),
     ]
 
-    key_to_perm = {}
-    for key, label, category in permissions:
-        perm = (
-            db.query(models.Permission)
-            .filter(models.Permission.key == key)
-            .first()
-        )
-        if not perm:
-            perm = models.Permission(
-                key=key,
-                label=label,
-                category=category,
-                description=None,
-            )
-            db.add(perm)
-        key_to_perm[key] = perm
+    # One INSERT for all permissions; existing keys are left untouched
+    insert_rows(
+        db,
+        models.Permission,
+        [
+            {"key": key, "label": label, "category": category, "description": None}
+            for key, label, category in permissions
+        ],
+        conflict_columns=["key"],
+    )
 
     # --- Define roles ---
     roles = [
@@ -66,55 +64,42 @@ def seed_roles_and_permissions(db: Session):
         ("HOMEOWNER", "Homeowner / Client", "Client-facing view only", 80),
     ]
 
-    key_to_role = {}
-    for key, name, desc, sort_order in roles:
-        role = (
-            db.query(models.Role)
-            .filter(models.Role.key == key)
-            .first()
-        )
-        if not role:
-            role = models.Role(
-                key=key,
-                name=name,
-                description=desc,
-                sort_order=sort_order,
-            )
-            db.add(role)
-        key_to_role[key] = role
+    insert_rows(
+        db,
+        models.Role,
+        [
+            {"key": key, "name": name, "description": desc, "sort_order": sort_order}
+            for key, name, desc, sort_order in roles
+        ],
+        conflict_columns=["key"],
+    )
 
-    db.flush()  # ensure ids
+    # ids for every key, including rows that already existed
+    perm_ids = dict(db.query(models.Permission.key, models.Permission.id).all())
+    role_ids = dict(db.query(models.Role.key, models.Role.id).all())
 
     # --- Role → permissions mapping ---
+    role_permission_rows = []
+
     def allow(role_key: str, perm_keys):
-        role = key_to_role[role_key]
         for p_key in perm_keys:
-            perm = key_to_perm[p_key]
-            existing = (
-                db.query(models.RolePermission)
-                .filter(
-                    models.RolePermission.role_id == role.id,
-                    models.RolePermission.permission_id == perm.id,
-                )
-                .first()
+            role_permission_rows.append(
+                {
+                    "role_id": role_ids[role_key],
+                    "permission_id": perm_ids[p_key],
+                    "allowed": True,
+                }
             )
-            if not existing:
-                db.add(
-                    models.RolePermission(
-                        role_id=role.id,
-                        permission_id=perm.id,
-                        allowed=True,
-                    )
-                )
 
     # PM: basically everything
     allow(
         "PROJECT_MANAGER",
         [
             "project.create", "project.view", "project.update", "project.archive",
+            "project.manage",
             "member.manage", "member.assign_roles",
             "message.read_all", "message.post", "message.delete_own",
-            "docs.view", "docs.upload",
+            "docs.view", "docs.upload", "docs.manage", "docs.delete",
             "tools.ai_use",
             "financials.view_budget", "financials.edit_budget",
             "bids.view", "bids.approve",
@@ -199,6 +184,14 @@ def seed_roles_and_permissions(db: Session):
         ],
     )
 
+    # Existing (role, permission) pairs are kept, including allowed=False ones
+    insert_rows(
+        db,
+        models.RolePermission,
+        role_permission_rows,
+        constraint="uq_role_permission",
+    )
+
     db.commit()
 
 
@@ -0,0 +1,350 @@
+# app/text_search.py
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.cache import LRUCache
+from app.chunking import TextChunk
+from app.database import SessionLocal
+from app.document_chunks import load_project_chunks, store_missing_chunks
+from app.models import ProjectDocument
+
+load_dotenv()
+
+# "memory" (per-project BM25 inverted index) or "postgres" (tsvector + GIN)
+DOC_SEARCH_BACKEND = os.getenv("DOC_SEARCH_BACKEND", "memory")
+INDEX_MAX_AGE_SECONDS = float(os.getenv("RAG_INDEX_MAX_AGE_SECONDS", "300"))
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Postgres text search config used by both the GIN index and the queries
+PG_TS_CONFIG = "english"
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['.][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by can do does for from had has have how i if in
+    into is it its me my no not of on or our so than that the their them then
+    there these they this to us was we were what when where which who why will
+    with you your
+    """.split()
+)
+
+
+# ---------- Tokenization + stemming ----------
+
+
+def stem(word: str) -> str:
+    """
+    Light suffix-stripping stemmer (Porter step 1 style).
+    Good enough to match "framing"/"framed"/"frames" to "frame".
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+
+    for suffix in ("ingly", "edly", "ing", "ed", "ly", "ment"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            # "framing" -> "fram" -> "frame", "stopped" -> "stopp" -> "stop"
+            if len(word) >= 2 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            elif suffix in ("ing", "ed") and re.search(r"[^aeiou][aeiou][^aeiouwxy]$", word):
+                word += "e"
+            break
+
+    return word
+
+
+def tokenize(text_value: str) -> List[tuple[str, int, int]]:
+    """
+    Return (stemmed term, start, end) for every non-stopword token.
+    """
+    tokens: List[tuple[str, int, int]] = []
+    for match in _WORD_RE.finditer(text_value.lower()):
+        word = match.group(0)
+        if word.endswith("'s"):
+            word = word[:-2]
+        if word in STOPWORDS:
+            continue
+        tokens.append((stem(word), match.start(), match.end()))
+    return tokens
+
+
+def query_terms(query: str) -> List[str]:
+    return [term for term, _, _ in tokenize(query)]
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """
+    A ranked chunk. `chunk.start` / `chunk.end` are character offsets
+    into the source document content.
+    """
+
+    score: float
+    chunk: TextChunk
+
+
+# ---------- In-memory BM25 inverted index ----------
+
+
+class ProjectInvertedIndex:
+    """
+    Postings lists (term -> {chunk_key: term frequency}) over the chunks
+    of one project's documents, scored with BM25. Not thread-safe by
+    itself: hold `lock` around searches and changes of a shared instance.
+    """
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, Dict[tuple[str, int], int]] = {}
+        self.chunks: Dict[tuple[str, int], TextChunk] = {}
+        self.lengths: Dict[tuple[str, int], int] = {}
+        self.chunk_terms: Dict[tuple[str, int], List[str]] = {}
+        self.doc_chunks: Dict[str, List[tuple[str, int]]] = {}
+        self.total_length = 0
+        self.built_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add_document(self, chunks: List[TextChunk]) -> None:
+        for chunk in chunks:
+            key = (chunk.document_id, chunk.index)
+            terms = Counter(term for term, _, _ in tokenize(f"{chunk.title}\n{chunk.text}"))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[key] = tf
+            length = sum(terms.values())
+            self.chunk_terms[key] = list(terms)
+            self.chunks[key] = chunk
+            self.lengths[key] = length
+            self.total_length += length
+            self.doc_chunks.setdefault(chunk.document_id, []).append(key)
+
+    def remove_document(self, document_id: str) -> None:
+        keys = self.doc_chunks.pop(document_id, [])
+        if not keys:
+            return
+        for key in keys:
+            self.total_length -= self.lengths.pop(key, 0)
+            self.chunks.pop(key, None)
+            for term in self.chunk_terms.pop(key, []):
+                plist = self.postings.get(term)
+                if plist is None:
+                    continue
+                plist.pop(key, None)
+                if not plist:
+                    del self.postings[term]
+
+    def search(self, terms: Iterable[str], k: int) -> List[SearchHit]:
+        n_chunks = len(self.chunks)
+        if n_chunks == 0:
+            return []
+        avg_length = self.total_length / n_chunks or 1.0
+
+        scores: Dict[tuple[str, int], float] = {}
+        for term in set(terms):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            df = len(plist)
+            idf = math.log(1.0 + (n_chunks - df + 0.5) / (df + 0.5))
+            for key, tf in plist.items():
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.lengths[key] / avg_length)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:k]
+        return [SearchHit(score=score, chunk=self.chunks[key]) for key, score in ranked]
+
+
+class DocumentSearchBackend:
+    """
+    Ranked chunk search over a project's documents.
+    """
+
+    def search(self, project_id: str, query: str, k: int = 5) -> List[SearchHit]:
+        raise NotImplementedError
+
+    def document_saved(self, document: ProjectDocument, chunks: List[TextChunk]) -> None:
+        """Incremental update hook; no-op for DB-backed search."""
+
+    def document_deleted(self, project_id: str, document_id: str) -> None:
+        """Incremental update hook; no-op for DB-backed search."""
+
+
+class BM25SearchBackend(DocumentSearchBackend):
+    """
+    One ProjectInvertedIndex per project, built lazily from the DB and
+    updated incrementally when documents change. Builds are serialized
+    per project (other projects keep searching), and a stale index keeps
+    serving while its replacement is built.
+    """
+
+    def __init__(self) -> None:
+        self._indexes: Dict[str, ProjectInvertedIndex] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()  # guards _locks only
+
+    def _project_lock(self, project_id: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(project_id)
+            if lock is None:
+                lock = self._locks[project_id] = threading.Lock()
+            return lock
+
+    def _build(self, project_id: str) -> ProjectInvertedIndex:
+        index = ProjectInvertedIndex()
+        chunks = load_project_chunks(project_id)
+        for document_id in dict.fromkeys(c.document_id for c in chunks):
+            index.add_document([c for c in chunks if c.document_id == document_id])
+        return index
+
+    def _get(self, project_id: str) -> ProjectInvertedIndex:
+        index = self._indexes.get(project_id)
+        if index is not None and time.monotonic() - index.built_at < INDEX_MAX_AGE_SECONDS:
+            return index
+        lock = self._project_lock(project_id)
+        # Another thread is already rebuilding a stale index: keep serving it
+        if not lock.acquire(blocking=index is None):
+            return index
+        try:
+            index = self._indexes.get(project_id)
+            if index is None or time.monotonic() - index.built_at >= INDEX_MAX_AGE_SECONDS:
+                index = self._build(project_id)
+                self._indexes[project_id] = index
+            return index
+        finally:
+            lock.release()
+
+    def search(self, project_id: str, query: str, k: int = 5) -> List[SearchHit]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        index = self._get(project_id)
+        with index.lock:
+            return index.search(terms, k)
+
+    def document_saved(self, document: ProjectDocument, chunks: List[TextChunk]) -> None:
+        project_id = str(document.project_id)
+        # Waits for a build in progress, then patches the index it produced
+        with self._project_lock(project_id):
+            index = self._indexes.get(project_id)
+            if index is None:
+                return
+            with index.lock:
+                index.remove_document(str(document.id))
+                index.add_document(chunks)
+
+    def document_deleted(self, project_id: str, document_id: str) -> None:
+        with self._project_lock(project_id):
+            index = self._indexes.get(project_id)
+            if index is None:
+                return
+            with index.lock:
+                index.remove_document(document_id)
+
+
+# ---------- Postgres tsvector / GIN variant ----------
+
+
+class PostgresFullTextSearch(DocumentSearchBackend):
+    """
+    Ranks rows of project_document_chunks with ts_rank, using the GIN
+    index on to_tsvector(content).
+
+    Documents from before chunking have no chunk rows; the first search
+    of a project in each worker stores them (store_missing_chunks), so
+    they are searchable without running `python -m app.document_chunks`.
+    Every write path stores chunks itself, so once is enough.
+    """
+
+    def __init__(self) -> None:
+        self._backfilled: LRUCache[bool] = LRUCache("fts_chunk_backfilled", max_size=4096)
+
+    def search(self, project_id: str, query: str, k: int = 5) -> List[SearchHit]:
+        words = [
+            w for w in _WORD_RE.findall(query.lower())
+            if w not in STOPWORDS and re.fullmatch(r"[a-z0-9]+", w)
+        ]
+        if not words:
+            return []
+
+        # OR the words together; ts_rank still prefers chunks matching more of them
+        ts_query = " | ".join(words)
+        sql = text(
+            f"""
+            SELECT c.document_id, d.title, c.chunk_index, c.content,
+                   c.start_offset, c.end_offset, c.section, c.token_count,
+                   ts_rank(
+                       to_tsvector('{PG_TS_CONFIG}', c.content),
+                       to_tsquery('{PG_TS_CONFIG}', :ts_query)
+                   ) AS rank
+            FROM project_document_chunks c
+            JOIN project_documents d ON d.id = c.document_id
+            WHERE c.project_id = :project_id
+              AND to_tsvector('{PG_TS_CONFIG}', c.content)
+                  @@ to_tsquery('{PG_TS_CONFIG}', :ts_query)
+            ORDER BY rank DESC
+            LIMIT :limit
+            """
+        )
+
+        db = SessionLocal()
+        try:
+            if not self._backfilled.get(project_id):
+                store_missing_chunks(db, UUID(project_id))
+                self._backfilled.set(project_id, True)
+            rows = db.execute(
+                sql,
+                {"project_id": UUID(project_id), "ts_query": ts_query, "limit": k},
+            ).all()
+        finally:
+            db.close()
+
+        return [
+            SearchHit(
+                score=float(rank),
+                chunk=TextChunk(
+                    document_id=str(doc_id),
+                    title=title,
+                    index=chunk_index,
+                    text=content,
+                    start=start,
+                    end=end,
+                    section=section or "",
+                    token_count=token_count,
+                ),
+            )
+            for doc_id, title, chunk_index, content, start, end, section, token_count, rank in rows
+        ]
+
+
+_backend: Optional[DocumentSearchBackend] = None
+
+
+def get_document_search() -> DocumentSearchBackend:
+    global _backend
+    if _backend is None:
+        if DOC_SEARCH_BACKEND == "postgres":
+            _backend = PostgresFullTextSearch()
+        elif DOC_SEARCH_BACKEND == "memory":
+            _backend = BM25SearchBackend()
+        else:
+            raise ValueError(f"Unknown DOC_SEARCH_BACKEND: {DOC_SEARCH_BACKEND!r}")
+    return _backend
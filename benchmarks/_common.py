@@ -0,0 +1,65 @@
+# benchmarks/_common.py
+"""
+Shared helpers for the benchmark scripts.
+
+Every benchmark seeds its own synthetic data inside a transaction that is
+always rolled back, so they are safe to point at a dev database via
+DATABASE_URL.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import engine
+
+
+@contextmanager
+def rollback_session() -> Iterator[Session]:
+    """
+    Yield a Session bound to an outer transaction that is rolled back
+    on exit. Commits inside the code under test become savepoints.
+    """
+    connection = engine.connect()
+    outer = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        outer.rollback()
+        connection.close()
+
+
+class QueryCounter:
+    """
+    Count SQL statements sent to the engine while the context is open.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def _on_execute(self, *args: Any, **kwargs: Any) -> None:
+        self.count += 1
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+def best_of(fn: Callable[[], Any], repeat: int = 5) -> Tuple[float, Any]:
+    """
+    Run `fn` `repeat` times and return (best wall time in seconds, last result).
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
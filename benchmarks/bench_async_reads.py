@@ -0,0 +1,199 @@
+# benchmarks/bench_async_reads.py
+"""
+Read endpoints under 200 concurrent clients: the old sync handlers
+(get_db + FastAPI threadpool) vs. the AsyncSession handlers now served
+by app/projects_routes.py.
+
+Unlike the other benchmarks this one needs committed rows, because
+every request opens its own connection: it seeds one user, a few
+projects with messages / schedules, and deletes them again at the end.
+
+Usage:
+    python -m benchmarks.bench_async_reads
+"""
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI, Query
+from sqlalchemy.orm import Session, joinedload
+
+from app import models, schemas
+from app.auth_utils import create_access_token
+from app.database import SessionLocal, async_engine
+from app.deps import get_current_user, get_db
+from app.projects_routes import build_project_summaries, router as projects_router
+
+CLIENTS = 200
+REQUESTS_PER_CLIENT = 5
+PROJECTS = 5
+MESSAGES_PER_PROJECT = 50
+SCHEDULES_PER_PROJECT = 20
+
+
+# ---------- Legacy sync handlers (as they were before the port) ----------
+
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/projects/my", response_model=List[schemas.ProjectWithRoleSummary])
+def legacy_my_projects(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    rows = (
+        db.query(models.Project, models.Role.key, models.Role.name)
+        .join(models.ProjectMember, models.ProjectMember.project_id == models.Project.id)
+        .outerjoin(models.Role, models.Role.id == models.ProjectMember.role_id)
+        .options(joinedload(models.Project.status_ref))
+        .filter(models.ProjectMember.user_id == current_user.id)
+        .order_by(models.Project.created_at.desc())
+        .all()
+    )
+    return build_project_summaries(db=db, rows=[tuple(r) for r in rows], current_user=current_user)
+
+
+@legacy_app.get(
+    "/projects/{project_id}/messages",
+    response_model=List[schemas.ProjectMessageRead],
+)
+def legacy_messages(
+    project_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=200),
+):
+    db.query(models.ProjectMember).filter(
+        models.ProjectMember.project_id == project_id,
+        models.ProjectMember.user_id == current_user.id,
+    ).first()
+    rows = (
+        db.query(models.Message, models.User)
+        .outerjoin(models.User, models.Message.sender_id == models.User.id)
+        .filter(models.Message.project_id == project_id)
+        .order_by(models.Message.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        schemas.ProjectMessageRead(
+            id=m.id,
+            project_id=m.project_id,
+            sender_id=m.sender_id,
+            sender_name=(u.full_name or u.email) if u else None,
+            content=m.content,
+            message_type=m.message_type,
+            created_at=m.created_at,
+            attachments=[schemas.MessageAttachmentRead.from_orm(a) for a in m.attachments],
+        )
+        for m, u in rows
+    ]
+
+
+async_app = FastAPI()
+async_app.include_router(projects_router)
+
+
+# ---------- Seed / cleanup ----------
+
+
+def seed() -> tuple[uuid.UUID, List[uuid.UUID], uuid.UUID]:
+    """
+    Returns (user id, project ids, activity id).
+    """
+    today = date.today()
+    with SessionLocal() as db:
+        user = models.User(email=f"bench-{uuid.uuid4()}@example.com", is_active=True)
+        activity = models.Activity(name=f"Bench activity {uuid.uuid4()}")
+        db.add_all([user, activity])
+        db.flush()
+
+        project_ids = []
+        for p in range(PROJECTS):
+            project = models.Project(name=f"Bench project {p}", created_by_id=user.id, is_blocked=False)
+            db.add(project)
+            db.flush()
+            db.add(models.ProjectMember(project_id=project.id, user_id=user.id))
+            db.add_all(
+                models.ActivitySchedule(
+                    project_id=project.id,
+                    activity_id=activity.id,
+                    scheduled_start_date=today - timedelta(days=s),
+                    status=models.ActivityStatus.SCHEDULED,
+                )
+                for s in range(SCHEDULES_PER_PROJECT)
+            )
+            db.add_all(
+                models.Message(project_id=project.id, sender_id=user.id, content=f"msg {m}")
+                for m in range(MESSAGES_PER_PROJECT)
+            )
+            project_ids.append(project.id)
+
+        db.commit()
+        return user.id, project_ids, activity.id
+
+
+def cleanup(user_id: uuid.UUID, project_ids: List[uuid.UUID], activity_id: uuid.UUID) -> None:
+    with SessionLocal() as db:
+        for model in (models.Message, models.ActivitySchedule, models.ProjectMember):
+            db.query(model).filter(model.project_id.in_(project_ids)).delete(synchronize_session=False)
+        db.query(models.Project).filter(models.Project.id.in_(project_ids)).delete(synchronize_session=False)
+        db.query(models.Activity).filter(models.Activity.id == activity_id).delete()
+        db.query(models.User).filter(models.User.id == user_id).delete()
+        db.commit()
+
+
+# ---------- Load ----------
+
+
+async def run_load(app: FastAPI, path: str, token: str) -> tuple[float, float, float]:
+    """
+    Returns (requests/sec, p50 ms, p95 ms).
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+        async def one_client() -> None:
+            for _ in range(REQUESTS_PER_CLIENT):
+                start = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_client() for _ in range(CLIENTS)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return len(latencies) / elapsed, statistics.median(latencies), p95
+
+
+async def bench(token: str, project_id: uuid.UUID) -> None:
+    print(f"{CLIENTS} concurrent clients x {REQUESTS_PER_CLIENT} requests\n")
+    print(f"{'endpoint':<30} {'handler':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for path in ("/projects/my", f"/projects/{project_id}/messages"):
+        label = path.replace(str(project_id), "{id}")
+        for name, app in (("sync", legacy_app), ("async", async_app)):
+            rps, p50, p95 = await run_load(app, path, token)
+            print(f"{label:<30} {name:>8} {rps:>8.1f} {p50:>8.1f} {p95:>8.1f}")
+    await async_engine.dispose()
+
+
+def run() -> None:
+    user_id, project_ids, activity_id = seed()
+    try:
+        token = create_access_token({"sub": str(user_id)})
+        asyncio.run(bench(token, project_ids[0]))
+    finally:
+        cleanup(user_id, project_ids, activity_id)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,93 @@
+# benchmarks/bench_authz.py
+"""
+SQL statements per request for membership-checked project routes, with
+the user / project-access caches cleared before every request (the old
+behaviour: user lookup + membership query each time) vs. warm caches.
+
+Usage:
+    python -m benchmarks.bench_authz
+"""
+import uuid
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import authz, deps, models
+from app.auth_utils import create_access_token
+from app.projects_routes import router as projects_router
+from benchmarks._common import QueryCounter, rollback_session
+
+REQUESTS = 20
+
+
+def seed(db: Session) -> tuple[models.User, models.Project]:
+    user = models.User(email=f"bench-{uuid.uuid4()}@example.com", is_active=True)
+    db.add(user)
+    db.flush()
+    activity = models.Activity(name="Bench activity")
+    db.add(activity)
+    db.flush()
+
+    projects = [
+        models.Project(name=f"Bench project {p}", created_by_id=user.id, is_blocked=False)
+        for p in range(10)
+    ]
+    db.add_all(projects)
+    db.flush()
+    for project in projects:
+        db.add(models.ProjectMember(project_id=project.id, user_id=user.id))
+    db.add(
+        models.ActivitySchedule(
+            project_id=projects[0].id,
+            activity_id=activity.id,
+            scheduled_start_date=date.today(),
+            status=models.ActivityStatus.SCHEDULED,
+        )
+    )
+    db.flush()
+    return user, projects[0]
+
+
+def clear_caches() -> None:
+    deps._user_cache.clear()
+    authz._access_cache.clear()
+
+
+def main() -> None:
+    with rollback_session() as db:
+        user, project = seed(db)
+
+        app = FastAPI()
+        app.include_router(projects_router)
+        app.dependency_overrides[deps.get_db] = lambda: db
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+        paths = [
+            f"/projects/{project.id}/members",
+            f"/projects/{project.id}/activity-schedules",
+            f"/projects/{project.id}/activities/catalog",
+        ]
+
+        print(f"{'route':<44} | {'cold q/req':>10} | {'warm q/req':>10}")
+        print("-" * 70)
+        for path in paths:
+            per_request = {}
+            for label in ("cold", "warm"):
+                clear_caches()
+                if label == "warm":
+                    client.get(path, headers=headers).raise_for_status()
+                with QueryCounter() as counter:
+                    for _ in range(REQUESTS):
+                        if label == "cold":
+                            clear_caches()
+                        client.get(path, headers=headers).raise_for_status()
+                per_request[label] = counter.count / REQUESTS
+            route = path.replace(str(project.id), "{id}")
+            print(f"{route:<44} | {per_request['cold']:>10.1f} | {per_request['warm']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_chat_concurrency.py
+"""
+Concurrent /chat throughput with graph runs inline on the event loop
+(GRAPH_MAX_CONCURRENCY=0, the old behavior) vs. the bounded graph pool.
+
+The graph is replaced by a function that blocks for LLM_LATENCY seconds,
+like a synchronous OpenAI call, so no API key or database is needed.
+While the chat requests run, a probe keeps hitting /metrics to show how
+long unrelated requests wait on the same worker.
+
+Usage:
+    python -m benchmarks.bench_chat_concurrency
+"""
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "bench-not-used")
+
+import main  # noqa: E402
+from app.graph_runner import GraphRunner  # noqa: E402
+
+LLM_LATENCY = 0.2
+CLIENTS = (1, 8, 32)
+REQUESTS_PER_CLIENT = 4
+POOL_SIZE = 8
+
+
+def fake_invoke(state: dict) -> dict:
+    time.sleep(LLM_LATENCY)  # blocking, like llm.invoke
+    return {**state, "messages": state["messages"] + ["ASSISTANT: ok"]}
+
+
+async def run_load(clients: int) -> tuple[float, float, float]:
+    """
+    Returns (chat requests/sec, probe p50 ms, probe max ms).
+    """
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        probe_ms: list[float] = []
+
+        async def probe() -> None:
+            while not stop.is_set():
+                start = time.perf_counter()
+                await client.get("/metrics")
+                probe_ms.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.01)
+
+        async def chat_client() -> None:
+            for _ in range(REQUESTS_PER_CLIENT):
+                response = await client.post("/chat", json={"message": "hi", "history": []})
+                response.raise_for_status()
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(chat_client() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+
+    rps = clients * REQUESTS_PER_CLIENT / elapsed
+    return rps, statistics.median(probe_ms), max(probe_ms)
+
+
+def run() -> None:
+    main.app_graph.invoke = fake_invoke
+
+    print(f"simulated LLM latency: {LLM_LATENCY * 1000:.0f} ms, graph pool size: {POOL_SIZE}\n")
+    print(f"{'clients':>8} {'mode':>8} {'chat req/s':>11} {'probe p50 ms':>13} {'probe max ms':>13}")
+    for clients in CLIENTS:
+        for label, runner in (
+            ("inline", GraphRunner(max_concurrency=0)),
+            ("pool", GraphRunner(max_concurrency=POOL_SIZE, max_pending=clients)),
+        ):
+            main.graph_runner = runner
+            rps, p50, worst = asyncio.run(run_load(clients))
+            print(f"{clients:>8} {label:>8} {rps:>11.1f} {p50:>13.1f} {worst:>13.1f}")
+
+
+if __name__ == "__main__":
+    run()
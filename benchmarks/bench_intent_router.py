@@ -0,0 +1,108 @@
+# benchmarks/bench_intent_router.py
+"""
+Routing accuracy and per-message latency: the old keyword-scan
+route_from_text vs. the compiled IntentRouter (rules only, and rules +
+naive Bayes fallback with 2-fold cross-validation on the corpus).
+
+Corpus: benchmarks/data/routing_corpus.jsonl ({"text", "route"} per line).
+
+Usage:
+    python -m benchmarks.bench_intent_router
+"""
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from app.intent_router import IntentRouter, NaiveBayesClassifier, load_examples
+
+CORPUS = Path(__file__).parent / "data" / "routing_corpus.jsonl"
+REPEAT = 200
+
+
+def legacy_route(text: str) -> str:
+    """
+    Verbatim copy of the keyword-scan route_from_text this router replaced.
+    """
+    text = text.strip().lower()
+
+    project_keywords = [
+        "project overview", "project summary", "about this project",
+        "what is this project", "project info", "team", "members",
+        "who is on this project", "who is on the team",
+    ]
+    if any(k in text for k in project_keywords):
+        return "project_info"
+
+    doc_keywords = [
+        "spec", "specs", "specification", "document", "documents", "docs",
+        "plans", "blueprint", "rfis", "rfi", "change order", "submittal",
+    ]
+    if any(k in text for k in doc_keywords):
+        return "doc_search"
+
+    cost_keywords = ["cost", "price", "total", "material", "per sheet", "per board", "per bf", "$"]
+    if any(k in text for k in cost_keywords):
+        return "cost"
+
+    board_foot_keywords = ["board foot", "board feet", "bf"]
+    if any(k in text for k in board_foot_keywords):
+        return "board_foot"
+
+    sheet_keywords = [
+        "sheet", "sheets", "drywall", "plywood", "osb", "panel", "panels",
+        "sq ft", "sqft", "square feet", "sf",
+    ]
+    if any(k in text for k in sheet_keywords):
+        return "sheet"
+
+    measurement_keywords = [
+        "ft", "feet", "foot", "in", "inch", "inches", "'", "\"",
+        "measurement", "convert", "stud", "2x4", "framing",
+    ]
+    if any(k in text for k in measurement_keywords):
+        return "measure"
+
+    return "chat"
+
+
+def evaluate(
+    name: str,
+    route: Callable[[str], str],
+    examples: List[Tuple[str, str]],
+) -> None:
+    correct = sum(route(text) == label for text, label in examples)
+    misses = Counter(
+        (label, route(text)) for text, label in examples if route(text) != label
+    )
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for text, _ in examples:
+            route(text)
+    per_message_us = (time.perf_counter() - start) / (REPEAT * len(examples)) * 1e6
+
+    print(
+        f"{name:<28} accuracy {correct / len(examples):6.1%}  "
+        f"({correct}/{len(examples)})  {per_message_us:6.2f} us/message"
+    )
+    for (label, got), count in misses.most_common(5):
+        print(f"    {label:>12} -> {got:<12} x{count}")
+
+
+def run() -> None:
+    examples = load_examples(str(CORPUS))
+    print(f"{len(examples)} labeled messages, {REPEAT} timing passes\n")
+
+    evaluate("keyword scan (old)", legacy_route, examples)
+    evaluate("compiled rules", IntentRouter().route, examples)
+
+    # Classifier fallback: train on one half, score on the other, both ways
+    halves = (examples[0::2], examples[1::2])
+    for i, (train, test) in enumerate((halves, halves[::-1]), start=1):
+        router = IntentRouter(classifier=NaiveBayesClassifier().fit(train))
+        evaluate(f"rules + naive Bayes (fold {i})", router.route, test)
+
+
+if __name__ == "__main__":
+    run()
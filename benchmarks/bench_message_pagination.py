@@ -0,0 +1,164 @@
+# benchmarks/bench_message_pagination.py
+"""
+Message history paging on a 1M-message project: the old query
+(`created_at < before`, attachments lazy-loaded per row) vs. the keyset
+cursor query (`(created_at, id) < cursor`, selectinload), at several
+depths, with and without the (project_id, created_at, id) index.
+
+Everything, including the DROP / CREATE INDEX, runs inside the rolled
+back benchmark transaction. DROP INDEX holds an exclusive lock on
+`messages` until the end, so don't point this at a shared database.
+
+Usage:
+    python -m benchmarks.bench_message_pagination
+"""
+import uuid
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.orm import Session, selectinload
+
+from app import models
+from benchmarks._common import QueryCounter, best_of, rollback_session
+
+MESSAGES = 1_000_000
+ATTACHMENT_EVERY = 10
+PAGE_SIZE = 50
+DEPTHS = (0, 10_000, 500_000, 990_000)
+
+
+def seed(db: Session) -> uuid.UUID:
+    user = models.User(email=f"bench-{uuid.uuid4()}@example.com", is_active=True)
+    db.add(user)
+    db.flush()
+    project = models.Project(name="Bench project", created_by_id=user.id, is_blocked=False)
+    db.add(project)
+    db.flush()
+
+    params = {"project_id": project.id, "user_id": user.id, "n": MESSAGES}
+    db.execute(
+        text(
+            """
+            INSERT INTO messages (id, project_id, sender_id, content, message_type, created_at)
+            SELECT gen_random_uuid(), :project_id, :user_id, 'message ' || g, 'user',
+                   now() - g * interval '1 second'
+            FROM generate_series(1, :n) AS g
+            """
+        ),
+        params,
+    )
+    db.execute(
+        text(
+            """
+            INSERT INTO message_attachments (id, message_id, file_name, storage_url)
+            SELECT gen_random_uuid(), m.id, 'photo.jpg', 'https://example.com/photo.jpg'
+            FROM (
+                SELECT id, row_number() OVER () AS rn FROM messages WHERE project_id = :project_id
+            ) m
+            WHERE m.rn % :every = 0
+            """
+        ),
+        {"project_id": project.id, "every": ATTACHMENT_EVERY},
+    )
+    db.execute(text("ANALYZE messages"))
+    db.execute(text("ANALYZE message_attachments"))
+    return project.id
+
+
+def set_indexes(db: Session, enabled: bool) -> None:
+    if enabled:
+        db.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_messages_project_created_id "
+            "ON messages (project_id, created_at, id)"
+        ))
+        db.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_message_attachments_message_id "
+            "ON message_attachments (message_id)"
+        ))
+    else:
+        db.execute(text("DROP INDEX IF EXISTS ix_messages_project_created_id"))
+        db.execute(text("DROP INDEX IF EXISTS ix_message_attachments_message_id"))
+    db.execute(text("ANALYZE messages"))
+
+
+Cursor = Optional[Tuple[datetime, uuid.UUID]]
+
+
+def cursor_at(db: Session, project_id: uuid.UUID, depth: int) -> Cursor:
+    """
+    (created_at, id) of the last message before `depth`; paging from it
+    returns the page that starts at `depth`.
+    """
+    if depth == 0:
+        return None
+    row = db.execute(
+        select(models.Message.created_at, models.Message.id)
+        .where(models.Message.project_id == project_id)
+        .order_by(models.Message.created_at.desc(), models.Message.id.desc())
+        .offset(depth - 1)
+        .limit(1)
+    ).one()
+    return row.created_at, row.id
+
+
+def old_page(db: Session, project_id: uuid.UUID, cursor: Cursor) -> Callable[[], List[Any]]:
+    def run() -> List[Any]:
+        q = (
+            select(models.Message)
+            .where(models.Message.project_id == project_id)
+            .order_by(models.Message.created_at.desc())
+        )
+        if cursor is not None:
+            q = q.where(models.Message.created_at < cursor[0])
+        rows = db.scalars(q.limit(PAGE_SIZE)).all()
+        for m in rows:
+            list(m.attachments)  # lazy load, one SELECT per message
+        db.expire_all()
+        return rows
+
+    return run
+
+
+def new_page(db: Session, project_id: uuid.UUID, cursor: Cursor) -> Callable[[], List[Any]]:
+    def run() -> List[Any]:
+        q = (
+            select(models.Message)
+            .options(selectinload(models.Message.attachments))
+            .where(models.Message.project_id == project_id)
+            .order_by(models.Message.created_at.desc(), models.Message.id.desc())
+        )
+        if cursor is not None:
+            q = q.where(tuple_(models.Message.created_at, models.Message.id) < cursor)
+        rows = db.scalars(q.limit(PAGE_SIZE + 1)).all()
+        db.expire_all()
+        return rows
+
+    return run
+
+
+def main() -> None:
+    with rollback_session() as db:
+        print(f"seeding {MESSAGES:,} messages ...")
+        project_id = seed(db)
+        cursors = {depth: cursor_at(db, project_id, depth) for depth in DEPTHS}
+
+        print(f"\n{'index':<8} | {'depth':>9} | {'query':<7} | {'ms/page':>9} | {'SQL/page':>8}")
+        print("-" * 54)
+        for indexed in (False, True):
+            set_indexes(db, indexed)
+            for depth in DEPTHS:
+                for label, make in (("old", old_page), ("cursor", new_page)):
+                    fn = make(db, project_id, cursors[depth])
+                    fn()  # warm up
+                    with QueryCounter() as counter:
+                        fn()
+                    elapsed, _ = best_of(fn)
+                    print(
+                        f"{'yes' if indexed else 'no':<8} | {depth:>9,} | {label:<7} | "
+                        f"{elapsed * 1000:>9.2f} | {counter.count:>8}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
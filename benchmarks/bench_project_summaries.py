@@ -0,0 +1,231 @@
+# benchmarks/bench_project_summaries.py
+"""
+Dashboard summary benchmark: the original per-project summary (a copy of
+the pre-batching build_project_summary, kept here as the baseline) vs.
+one build_project_summaries batch, at 10 / 100 / 500 projects.
+
+Usage:
+    python -m benchmarks.bench_project_summaries
+"""
+import uuid
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.progress import reconcile_projects
+from app.projects_routes import build_project_summaries
+from app.read_state import mark_read, unread_counts
+from benchmarks._common import QueryCounter, best_of, rollback_session
+
+PROJECT_COUNTS = (10, 100, 500)
+SCHEDULES_PER_PROJECT = 20
+TODAY_PER_PROJECT = 4
+MESSAGES_PER_PROJECT = 30
+
+
+def legacy_project_summary(
+    db: Session,
+    project: models.Project,
+    role_key: str | None,
+    role_name: str | None,
+    current_user: models.User,
+) -> schemas.ProjectWithRoleSummary:
+    """
+    build_project_summary as it was before batching: two COUNTs, the
+    today's-activities join, one check-in query per activity and one
+    unread query per project. (The unread query now reads the read
+    watermarks instead of message_reads, still one per project.)
+    """
+    today = date.today()
+
+    total_schedules = (
+        db.query(models.ActivitySchedule)
+        .filter(models.ActivitySchedule.project_id == project.id)
+        .count()
+    )
+    completed_schedules = (
+        db.query(models.ActivitySchedule)
+        .filter(
+            models.ActivitySchedule.project_id == project.id,
+            models.ActivitySchedule.status == models.ActivityStatus.COMPLETED,
+        )
+        .count()
+    )
+    completion_percentage = (
+        float(completed_schedules) / float(total_schedules) * 100.0
+        if total_schedules > 0
+        else 0.0
+    )
+
+    todays_rows = (
+        db.query(
+            models.ActivitySchedule,
+            models.Activity,
+            models.ProjectMember,
+            models.User,
+        )
+        .join(models.Activity, models.ActivitySchedule.activity_id == models.Activity.id)
+        .outerjoin(
+            models.ProjectMember,
+            models.ActivitySchedule.project_member_id == models.ProjectMember.id,
+        )
+        .outerjoin(models.User, models.ProjectMember.user_id == models.User.id)
+        .filter(
+            models.ActivitySchedule.project_id == project.id,
+            models.ActivitySchedule.scheduled_start_date == today,
+        )
+        .order_by(models.ActivitySchedule.scheduled_start_date)
+        .all()
+    )
+
+    todays_summaries = []
+    for sched, activity, pm, user in todays_rows:
+        member_name = None
+        member_on_site = False
+        if pm is not None and user is not None:
+            member_name = user.full_name or user.email or None
+            member_on_site = (
+                db.query(models.MemberCheckIn)
+                .filter(
+                    models.MemberCheckIn.project_id == project.id,
+                    models.MemberCheckIn.project_member_id == pm.id,
+                    models.MemberCheckIn.check_out_time.is_(None),
+                    sa_func.date(models.MemberCheckIn.check_in_time) == today,
+                )
+                .count()
+                > 0
+            )
+        todays_summaries.append(
+            schemas.ProjectActivityTodaySummary(
+                id=sched.id,
+                title=activity.name,
+                member_name=member_name,
+                member_on_site=member_on_site,
+            )
+        )
+
+    unread = unread_counts(db, [project.id], current_user.id).get(project.id, 0)
+
+    return schemas.ProjectWithRoleSummary(
+        project_id=project.id,
+        project_name=project.name,
+        description=project.description,
+        status=project.status,
+        role_key=role_key,
+        role_name=role_name,
+        city=project.city,
+        state=project.state,
+        postal_code=project.postal_code,
+        latitude=project.latitude,
+        longitude=project.longitude,
+        completion_percentage=completion_percentage,
+        has_unread_messages=unread > 0,
+        unread_message_count=unread,
+        todays_activities=todays_summaries,
+        project_type=project.project_type,
+        end_date=project.end_date,
+        is_owner=(project.created_by_id == current_user.id),
+    )
+
+
+def seed(db: Session, n_projects: int) -> tuple[models.User, list]:
+    today = date.today()
+    user = models.User(email=f"bench-{uuid.uuid4()}@example.com", is_active=True)
+    other = models.User(email=f"bench-{uuid.uuid4()}@example.com", is_active=True)
+    db.add_all([user, other])
+    db.flush()
+
+    activities = [models.Activity(name=f"Bench activity {i}") for i in range(10)]
+    db.add_all(activities)
+    db.flush()
+
+    rows = []
+    for p in range(n_projects):
+        project = models.Project(
+            name=f"Bench project {p}",
+            created_by_id=user.id,
+            is_blocked=False,
+        )
+        db.add(project)
+        db.flush()
+
+        member = models.ProjectMember(project_id=project.id, user_id=user.id)
+        crew = models.ProjectMember(project_id=project.id, user_id=other.id)
+        db.add_all([member, crew])
+        db.flush()
+
+        for s in range(SCHEDULES_PER_PROJECT):
+            is_today = s < TODAY_PER_PROJECT
+            db.add(
+                models.ActivitySchedule(
+                    project_id=project.id,
+                    activity_id=activities[s % len(activities)].id,
+                    project_member_id=crew.id if is_today else None,
+                    scheduled_start_date=today if is_today else today - timedelta(days=s),
+                    status=(
+                        models.ActivityStatus.COMPLETED
+                        if s % 3 == 0
+                        else models.ActivityStatus.SCHEDULED
+                    ),
+                )
+            )
+
+        db.add(
+            models.MemberCheckIn(
+                project_id=project.id,
+                project_member_id=crew.id,
+                check_in_time=datetime.utcnow(),
+            )
+        )
+
+        messages = [
+            models.Message(project_id=project.id, sender_id=other.id, content=f"msg {m}")
+            for m in range(MESSAGES_PER_PROJECT)
+        ]
+        db.add_all(messages)
+        db.flush()
+        # Half of the projects are fully read.
+        if p % 2 == 0:
+            mark_read(db, project.id, user.id)
+
+        rows.append((project, None, None))
+
+    db.flush()
+    # Schedules were added directly, so build their counters from source
+    reconcile_projects(db, [project.id for project, _, _ in rows])
+    return user, rows
+
+
+def main() -> None:
+    print(f"{'projects':>9} | {'path':<10} | {'queries':>8} | {'best ms':>9}")
+    print("-" * 46)
+    for n in PROJECT_COUNTS:
+        with rollback_session() as db:
+            user, rows = seed(db, n)
+
+            def per_project():
+                return [
+                    legacy_project_summary(
+                        db=db,
+                        project=project,
+                        role_key=role_key,
+                        role_name=role_name,
+                        current_user=user,
+                    )
+                    for project, role_key, role_name in rows
+                ]
+
+            def batched():
+                return build_project_summaries(db=db, rows=rows, current_user=user)
+
+            for label, fn in (("per-project", per_project), ("batched", batched)):
+                with QueryCounter() as counter:
+                    fn()
+                seconds, _ = best_of(fn, repeat=3)
+                print(f"{n:>9} | {label:<10} | {counter.count:>8} | {seconds * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
 import os
+import json
 import secrets
-import asyncio
+import time
 from datetime import datetime, timezone
 from uuid import UUID
-from typing import List, Optional
-from fastapi.responses import StreamingResponse
+from typing import Any, Dict, Iterator, List, Optional
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from fastapi import FastAPI, Depends, Header, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from dotenv import load_dotenv  # 👈 add this
@@ -17,17 +20,46 @@ from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 
 from app.assistant_routes import router as assistant_router
+from app.authz import (
+    ProjectAccess,
+    get_project_access,
+    invalidate_all_project_access,
+    invalidate_project_access,
+    project_access,
+    project_access_async,
+)
 from app.database import Base, engine
-from app.deps import get_db
+from app.http_cache import conditional_json_async, project_scope, touch_global, touch_project
+from app.permissions import refresh_permission_matrix, require
+from app.deps import (
+    get_async_db,
+    get_current_user,
+    get_current_user_async,
+    get_current_user_optional,
+    get_db,
+    get_read_db,
+    invalidate_user,
+)
 from app import models, schemas
 from app.auth_utils import (
     hash_password,
     verify_password,
     create_access_token,
-    decode_access_token,
 )
 
-from app.graph import app_graph
+from app.graph import (
+    ANSWER_TAG,
+    CALCULATOR_ROUTES,
+    ROLE_DEPENDENT_ROUTES,
+    app_graph,
+    calculator_reply,
+    route_from_text,
+)
+from app.graph_runner import graph_runner
+from app.metrics import CHAT_TIME_TO_FIRST_TOKEN, render_metrics
+from app.document_chunks import store_document_chunks
+from app.document_hooks import document_saved, document_deleted
+from app.realtime import publish_access_revoked
 
 load_dotenv()
 app = FastAPI()
@@ -37,6 +69,12 @@ print("Pretzel GOOGLE_CLIENT_ID:", GOOGLE_CLIENT_ID)
 
 app.include_router(assistant_router)
 
+
+@app.on_event("startup")
+def load_permission_matrix():
+    refresh_permission_matrix()
+
+
 # --- CORS so frontend can call FastAPI in dev ---
 app.add_middleware(
     CORSMiddleware,
@@ -62,85 +100,6 @@ class ChatRequest(BaseModel):
 class GoogleAuthRequest(BaseModel):
     id_token: str
     
-# ---------- AUTH HELPERS ----------
-
-def get_current_user(
-    db: Session = Depends(get_db),
-    authorization: Optional[str] = Header(default=None),
-) -> models.User:
-    """
-    Extracts the Bearer token from the Authorization header,
-    decodes it, and returns the current User from the DB.
-    """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing Authorization header.")
-
-    parts = authorization.split()
-    if len(parts) != 2 or parts[0].lower() != "bearer":
-        raise HTTPException(status_code=401, detail="Invalid Authorization header format.")
-
-    token = parts[1]
-    payload = decode_access_token(token)
-    if not payload or "sub" not in payload:
-        raise HTTPException(status_code=401, detail="Invalid or expired token.")
-
-    try:
-        user_id = UUID(payload["sub"])
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid token subject.")
-
-    user = (
-        db.query(models.User)
-        .filter(models.User.id == user_id)
-        .first()
-    )
-
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found.")
-    if not user.is_active:
-        raise HTTPException(status_code=403, detail="User is inactive.")
-
-    return user
-
-
-def get_current_user_optional(
-    db: Session = Depends(get_db),
-    authorization: Optional[str] = Header(default=None),
-) -> Optional[models.User]:
-    """
-    Like get_current_user, but returns None if there's no valid Bearer token
-    instead of raising 401/403. Useful for endpoints that are public for
-    global use, but project-specific access can still require auth.
-    """
-    if not authorization:
-        return None
-
-    parts = authorization.split()
-    if len(parts) != 2 or parts[0].lower() != "bearer":
-        return None
-
-    token = parts[1]
-    payload = decode_access_token(token)
-    if not payload or "sub" not in payload:
-        return None
-
-    try:
-        user_id = UUID(payload["sub"])
-    except ValueError:
-        return None
-
-    user = (
-        db.query(models.User)
-        .filter(models.User.id == user_id)
-        .first()
-    )
-
-    if not user or not user.is_active:
-        return None
-
-    return user
-
-
 # ---------- BASIC ROUTES ----------
 
 @app.get("/")
@@ -182,16 +141,21 @@ def update_current_user_profile(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    invalidate_user(current_user.id)
+    touch_global("global")
 
     return current_user
 
 
 # ---------- ROLES & PERMISSIONS ENDPOINTS ----------
 
+# GETs here read from a replica (get_read_db). This is reference data that
+# rarely changes and is not cached, so a stale read lasts at most the replica lag.
+
 # ------- PERMISSIONS CRUD -------
 
 @app.get("/permissions", response_model=List[schemas.PermissionRead])
-def list_permissions(db: Session = Depends(get_db)):
+def list_permissions(db: Session = Depends(get_read_db)):
     perms = (
         db.query(models.Permission)
         .order_by(models.Permission.category, models.Permission.key)
@@ -228,13 +192,14 @@ def create_permission(
     db.add(perm)
     db.commit()
     db.refresh(perm)
+    refresh_permission_matrix(db)
     return perm
 
 
 @app.get("/permissions/{permission_id}", response_model=schemas.PermissionRead)
 def get_permission(
     permission_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user),
 ):
     perm = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
@@ -274,6 +239,7 @@ def update_permission(
     db.add(perm)
     db.commit()
     db.refresh(perm)
+    refresh_permission_matrix(db)
     return perm
 
 
@@ -289,13 +255,14 @@ def delete_permission(
 
     db.delete(perm)
     db.commit()
+    refresh_permission_matrix(db)
     return None
 
 
 # ------- ROLES CRUD -------
 
 @app.get("/roles", response_model=List[schemas.RoleWithPermissionsRead])
-def list_roles(db: Session = Depends(get_db)):
+def list_roles(db: Session = Depends(get_read_db)):
     roles = (
         db.query(models.Role)
         .order_by(models.Role.sort_order, models.Role.name)
@@ -351,13 +318,14 @@ def create_role(
     db.add(role)
     db.commit()
     db.refresh(role)
+    refresh_permission_matrix(db)
     return role
 
 
 @app.get("/roles/{role_id}", response_model=schemas.RoleWithPermissionsRead)
 def get_role(
     role_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user),
 ):
     role = db.query(models.Role).filter(models.Role.id == role_id).first()
@@ -409,6 +377,9 @@ def update_role(
     db.add(role)
     db.commit()
     db.refresh(role)
+    invalidate_all_project_access()
+    refresh_permission_matrix(db)
+    touch_global("global")
     return role
 
 
@@ -424,6 +395,9 @@ def delete_role(
 
     db.delete(role)
     db.commit()
+    invalidate_all_project_access()
+    refresh_permission_matrix(db)
+    touch_global("global")
     return None
 
 
@@ -610,6 +584,7 @@ def create_project(
     db.add(membership)
     db.commit()
     db.refresh(project)
+    invalidate_project_access(current_user.id)
 
     return schemas.ProjectWithRoleSummary(
         project_id=project.id,
@@ -656,6 +631,8 @@ def get_project(
     project_id: UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     project = (
         db.query(models.Project)
@@ -665,28 +642,16 @@ def get_project(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found.")
 
-    membership_row = (
-        db.query(models.ProjectMember, models.Role)
-        .outerjoin(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-
-    if not membership_row:
+    if access is None:
         raise HTTPException(status_code=403, detail="You are not a member of this project.")
 
-    membership, role = membership_row
-
     return schemas.ProjectWithRoleSummary(
         project_id=project.id,
         project_name=project.name,
         description=project.description,
         status=project.status,
-        role_key=role.key if role else None,
-        role_name=role.name if role else None,
+        role_key=access.role_key,
+        role_name=access.role_name,
     )
 
 
@@ -696,30 +661,17 @@ def update_project(
     payload: schemas.ProjectUpdateRequest,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("project.manage", "You don't have permission to update this project.")
+    ),
 ):
     """
-    Update a project (PM only).
+    Update a project (requires project.manage).
     """
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found.")
 
-    # Ensure caller is PM on this project
-    membership = (
-        db.query(models.ProjectMember)
-        .join(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership or not membership.role or membership.role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can update this project.",
-        )
-
     if payload.name is not None:
         project.name = payload.name
     if payload.description is not None:
@@ -730,16 +682,15 @@ def update_project(
     db.add(project)
     db.commit()
     db.refresh(project)
-
-    pm_role = membership.role
+    touch_project(project.id, "project")
 
     return schemas.ProjectWithRoleSummary(
         project_id=project.id,
         project_name=project.name,
         description=project.description,
         status=project.status,
-        role_key=pm_role.key,
-        role_name=pm_role.name,
+        role_key=access.role_key,
+        role_name=access.role_name,
     )
 
 
@@ -748,32 +699,28 @@ def delete_project(
     project_id: UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("project.archive", "You don't have permission to delete this project.")
+    ),
 ):
     """
-    Delete a project (PM only).
+    Delete a project (requires project.archive).
     """
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found.")
 
-    # Ensure caller is PM
-    membership = (
-        db.query(models.ProjectMember)
-        .join(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership or not membership.role or membership.role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can delete this project.",
-        )
-
+    member_user_ids = [
+        user_id
+        for (user_id,) in db.query(models.ProjectMember.user_id)
+        .filter(models.ProjectMember.project_id == project_id)
+        .all()
+    ]
     db.delete(project)
     db.commit()
+    invalidate_project_access(*member_user_ids)
+    touch_project(project_id, "project", "members", "activities", "documents")
+    publish_access_revoked(project_id)
     return None
 
 
@@ -787,18 +734,10 @@ def list_project_members(
     project_id: UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     # Ensure caller is at least a member of this project
-    caller_membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-
-    if not caller_membership:
+    if access is None:
         raise HTTPException(
             status_code=403,
             detail="You are not a member of this project.",
@@ -839,29 +778,16 @@ def add_project_member(
     payload: schemas.ProjectMemberCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("member.manage", "You don't have permission to add members.")
+    ),
 ):
     """
-    PM-only direct member add (bypassing invite flow).
+    Direct member add, bypassing the invite flow (requires member.manage).
     """
     if project_id != payload.project_id:
         raise HTTPException(status_code=400, detail="Project ID mismatch.")
 
-    # Ensure caller is PM
-    membership = (
-        db.query(models.ProjectMember)
-        .join(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership or not membership.role or membership.role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can add members.",
-        )
-
     # Ensure user exists
     user = db.query(models.User).filter(models.User.id == payload.user_id).first()
     if not user:
@@ -897,6 +823,8 @@ def add_project_member(
     db.add(member)
     db.commit()
     db.refresh(member)
+    invalidate_project_access(member.user_id)
+    touch_project(member.project_id, "members", "project")
 
     return schemas.ProjectMemberRead(
         id=member.id,
@@ -916,26 +844,13 @@ def update_project_member(
     payload: schemas.ProjectMemberUpdate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("member.assign_roles", "You don't have permission to update members.")
+    ),
 ):
     """
-    Update a project member's role (PM only).
+    Update a project member's role (requires member.assign_roles).
     """
-    # Ensure caller is PM
-    membership = (
-        db.query(models.ProjectMember)
-        .join(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership or not membership.role or membership.role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can update members.",
-        )
-
     member = (
         db.query(models.ProjectMember)
         .filter(
@@ -963,6 +878,8 @@ def update_project_member(
     db.add(member)
     db.commit()
     db.refresh(member)
+    invalidate_project_access(member.user_id)
+    touch_project(member.project_id, "members", "project")
 
     return schemas.ProjectMemberRead(
         id=member.id,
@@ -981,26 +898,13 @@ def remove_project_member(
     member_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("member.manage", "You don't have permission to remove members.")
+    ),
 ):
     """
-    Remove a project member (PM only).
+    Remove a project member (requires member.manage).
     """
-    # Ensure caller is PM
-    membership = (
-        db.query(models.ProjectMember)
-        .join(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership or not membership.role or membership.role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can remove members.",
-        )
-
     member = (
         db.query(models.ProjectMember)
         .filter(
@@ -1012,8 +916,12 @@ def remove_project_member(
     if not member:
         raise HTTPException(status_code=404, detail="Project member not found.")
 
+    user_id = member.user_id
     db.delete(member)
     db.commit()
+    invalidate_project_access(user_id)
+    touch_project(project_id, "members", "project")
+    publish_access_revoked(project_id, [user_id])
     return None
 
 
@@ -1028,9 +936,13 @@ def create_project_invite(
     payload: schemas.InviteCreateRequest,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+
+    access: ProjectAccess = Depends(
+        require("member.manage", "You don't have permission to send invites for this project.")
+    ),
 ):
     """
-    PM-only endpoint to create an invite for a project.
+    Create an invite for a project (requires member.manage).
     Invitee can be specified by email or phone.
     Returns an invite token the frontend can wrap in
     a link (for email/SMS) or QR code.
@@ -1045,23 +957,6 @@ def create_project_invite(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found.")
 
-    # Check that inviter is PM on this project
-    membership = (
-        db.query(models.ProjectMember)
-        .join(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-
-    if not membership or not membership.role or membership.role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can send invites for this project.",
-        )
-
     # Generate a unique token for the invite
     token = secrets.token_urlsafe(32)
 
@@ -1187,23 +1082,10 @@ def list_invites_awaiting_approval(
     project_id: UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("member.manage", "You don't have permission to view invites for this project.")
+    ),
 ):
-    # Ensure caller is PM on this project
-    membership = (
-        db.query(models.ProjectMember)
-        .join(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership or not membership.role or membership.role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can view invites for this project.",
-        )
-
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found.")
@@ -1217,21 +1099,19 @@ def list_invites_awaiting_approval(
         .all()
     )
 
+    member_user_ids = {
+        user_id
+        for (user_id,) in db.query(models.ProjectMember.user_id)
+        .filter(models.ProjectMember.project_id == project_id)
+        .all()
+    }
+
     results: List[schemas.InvitePendingForPM] = []
 
     for inv in invites:
         # Only include if there's no ProjectMember yet
-        if inv.invitee_user_id:
-            existing_member = (
-                db.query(models.ProjectMember)
-                .filter(
-                    models.ProjectMember.project_id == project_id,
-                    models.ProjectMember.user_id == inv.invitee_user_id,
-                )
-                .first()
-            )
-            if existing_member:
-                continue
+        if inv.invitee_user_id in member_user_ids:
+            continue
 
         invitee = inv.invitee_user
 
@@ -1264,23 +1144,10 @@ def approve_invite_and_assign_role(
     payload: schemas.InviteApproveRequest,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("member.assign_roles", "You don't have permission to approve invites for this project.")
+    ),
 ):
-    # Ensure caller is PM on this project
-    membership = (
-        db.query(models.ProjectMember)
-        .join(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership or not membership.role or membership.role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can approve invites for this project.",
-        )
-
     invite = (
         db.query(models.ProjectInvite)
         .filter(
@@ -1326,6 +1193,8 @@ def approve_invite_and_assign_role(
         db.add(new_member)
 
     db.commit()
+    invalidate_project_access(user.id)
+    touch_project(invite.project_id, "members", "project")
 
     project = invite.project
 
@@ -1349,11 +1218,14 @@ def create_project_document(
     payload: schemas.ProjectDocumentCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("docs.manage", "You don't have permission to add documents to this project.")
+    ),
 ):
     """
     Create a simple text document attached to a project.
 
-    For now we restrict this to PROJECT_MANAGER. Later we can expand.
+    Requires the docs.manage permission.
     """
     # Ensure project exists
     project = (
@@ -1364,32 +1236,6 @@ def create_project_document(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found.")
 
-    # Ensure caller is at least a member of this project
-    membership_row = (
-        db.query(models.ProjectMember, models.Role)
-        .outerjoin(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-
-    if not membership_row:
-        raise HTTPException(
-            status_code=403,
-            detail="You are not a member of this project.",
-        )
-
-    membership, role = membership_row
-
-    # Only PM can create documents for now
-    if not role or role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can add documents to this project.",
-        )
-
     doc = models.ProjectDocument(
         project_id=project_id,
         title=payload.title,
@@ -1397,8 +1243,11 @@ def create_project_document(
         created_by_id=current_user.id,
     )
     db.add(doc)
+    db.flush()  # get doc.id
+    chunks = store_document_chunks(db, doc)
     db.commit()
     db.refresh(doc)
+    document_saved(doc, chunks)
 
     return schemas.ProjectDocumentRead.model_validate(doc)
 
@@ -1407,38 +1256,35 @@ def create_project_document(
     "/projects/{project_id}/documents",
     response_model=list[schemas.ProjectDocumentRead],
 )
-def list_project_documents(
+async def list_project_documents(
     project_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+    access: Optional[ProjectAccess] = Depends(project_access_async),
 ):
     """
     List documents for a project.
     Any project member can see the list for now.
     """
     # Ensure caller is a member
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(
             status_code=403,
             detail="You are not a member of this project.",
         )
 
-    docs = (
-        db.query(models.ProjectDocument)
-        .filter(models.ProjectDocument.project_id == project_id)
-        .order_by(models.ProjectDocument.created_at.desc())
-        .all()
-    )
+    async def build():
+        docs = await db.scalars(
+            select(models.ProjectDocument)
+            .where(models.ProjectDocument.project_id == project_id)
+            .order_by(models.ProjectDocument.created_at.desc())
+        )
+        return [schemas.ProjectDocumentRead.model_validate(d) for d in docs]
 
-    return [schemas.ProjectDocumentRead.model_validate(d) for d in docs]
+    return await conditional_json_async(
+        request, "project_documents", [project_scope(project_id, "documents")], build
+    )
 
 
 @app.get(
@@ -1450,20 +1296,13 @@ def get_project_document(
     document_id: UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: Optional[ProjectAccess] = Depends(project_access),
 ):
     """
     Get a single project document.
     """
     # Ensure caller is a member
-    membership = (
-        db.query(models.ProjectMember)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership:
+    if access is None:
         raise HTTPException(
             status_code=403,
             detail="You are not a member of this project.",
@@ -1493,33 +1332,13 @@ def update_project_document(
     payload: schemas.ProjectDocumentUpdate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("docs.manage", "You don't have permission to update documents for this project.")
+    ),
 ):
     """
-    Update a project document (PM only).
+    Update a project document (requires docs.manage).
     """
-    # Ensure project & membership
-    membership_row = (
-        db.query(models.ProjectMember, models.Role)
-        .outerjoin(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership_row:
-        raise HTTPException(
-            status_code=403,
-            detail="You are not a member of this project.",
-        )
-
-    membership, role = membership_row
-    if not role or role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can update documents for this project.",
-        )
-
     doc = (
         db.query(models.ProjectDocument)
         .filter(
@@ -1537,8 +1356,10 @@ def update_project_document(
         doc.content = payload.content
 
     db.add(doc)
+    chunks = store_document_chunks(db, doc)
     db.commit()
     db.refresh(doc)
+    document_saved(doc, chunks)
 
     return schemas.ProjectDocumentRead.model_validate(doc)
 
@@ -1552,32 +1373,13 @@ def delete_project_document(
     document_id: UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
+    access: ProjectAccess = Depends(
+        require("docs.delete", "You don't have permission to delete documents for this project.")
+    ),
 ):
     """
-    Delete a project document (PM only).
+    Delete a project document (requires docs.delete).
     """
-    membership_row = (
-        db.query(models.ProjectMember, models.Role)
-        .outerjoin(models.Role, models.ProjectMember.role_id == models.Role.id)
-        .filter(
-            models.ProjectMember.project_id == project_id,
-            models.ProjectMember.user_id == current_user.id,
-        )
-        .first()
-    )
-    if not membership_row:
-        raise HTTPException(
-            status_code=403,
-            detail="You are not a member of this project.",
-        )
-
-    membership, role = membership_row
-    if not role or role.key != "PROJECT_MANAGER":
-        raise HTTPException(
-            status_code=403,
-            detail="Only the Project Manager can delete documents for this project.",
-        )
-
     doc = (
         db.query(models.ProjectDocument)
         .filter(
@@ -1591,11 +1393,38 @@ def delete_project_document(
 
     db.delete(doc)
     db.commit()
+    document_deleted(project_id, document_id)
     return None
 
 
 # ---------- CHAT HELPERS (LangGraph glue) ----------
 
+def resolve_project_role(
+    db: Session,
+    current_user: models.User,
+    project_id: UUID,
+) -> Optional[str]:
+    """
+    Caller's role key on the project (404 if it doesn't exist, 403 if the
+    caller isn't a member). The project row is only read on failure.
+    """
+    access = get_project_access(db, current_user.id, project_id)
+    if access is not None:
+        return access.role_key
+
+    project = (
+        db.query(models.Project.id)
+        .filter(models.Project.id == project_id)
+        .first()
+    )
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found.")
+    raise HTTPException(
+        status_code=403,
+        detail="You are not a member of this project.",
+    )
+
+
 def append_user_turn(history: List[str], user_message: str) -> List[str]:
     """
     Take the existing history from the frontend and append
@@ -1619,6 +1448,84 @@ def extract_latest_assistant_reply(messages: List[str]) -> str:
     return "Sorry, I couldn't generate a response."
 
 
+def sse_event(event: str, data: Any) -> str:
+    """
+    Format one Server-Sent Event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_graph_events(state: Dict[str, Any], started_at: float) -> Iterator[str]:
+    """
+    Run the graph with stream_mode=["messages", "updates"] and yield SSE events:
+
+      token   {"text": delta}   LLM answer tokens (assistant / doc_search nodes)
+      message {"text": reply}   whole answer from a deterministic tool node
+      done    {"reply", "messages", "promptTokens", "timeToFirstTokenMs"}
+      error   {"detail": str}
+    """
+    new_messages: List[str] = []
+    prompt_tokens: Optional[Dict[str, int]] = None
+    streamed_nodes: set[str] = set()
+    first_token_at: Optional[float] = None
+
+    def mark_first_token(node: str) -> None:
+        nonlocal first_token_at
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+            CHAT_TIME_TO_FIRST_TOKEN.observe(first_token_at - started_at, node=node)
+
+    try:
+        for mode, payload in app_graph.stream(state, stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                chunk, metadata = payload
+                # Only the answer call; skip internal ones like history summaries
+                if ANSWER_TAG not in (metadata.get("tags") or []):
+                    continue
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                if not text:
+                    continue
+                node = metadata.get("langgraph_node", "")
+                mark_first_token(node)
+                streamed_nodes.add(node)
+                yield sse_event("token", {"text": text})
+                continue
+
+            # mode == "updates": {node_name: state update}
+            for node, update in payload.items():
+                if not update:
+                    continue
+                node_messages = update.get("messages") or []
+                new_messages.extend(node_messages)
+                if update.get("promptTokens"):
+                    prompt_tokens = update["promptTokens"]
+                if node_messages and node not in streamed_nodes:
+                    mark_first_token(node)
+                    yield sse_event(
+                        "message",
+                        {"text": extract_latest_assistant_reply(node_messages)},
+                    )
+    except Exception as exc:
+        yield sse_event("error", {"detail": str(exc)})
+        return
+
+    messages = state["messages"] + new_messages
+    yield sse_event(
+        "done",
+        {
+            "reply": extract_latest_assistant_reply(messages),
+            "messages": messages,
+            "projectId": state.get("projectId"),
+            "userId": state.get("userId"),
+            "roleKey": state.get("roleKey"),
+            "promptTokens": prompt_tokens,
+            "timeToFirstTokenMs": (
+                round((first_token_at - started_at) * 1000, 1) if first_token_at else None
+            ),
+        },
+    )
+
+
 # ---------- CHAT ROUTE (role-aware + LangGraph) ----------
 
 @app.post("/chat")
@@ -1633,6 +1540,11 @@ async def chat(
     - If projectId is provided, user must be a member of that project
     - Looks up their role in that project
     - Passes messages + projectId + userId + roleKey into LangGraph
+
+    Calculator questions (measurements, board feet, sheets, and costs
+    outside a project) are answered straight from the cached calculator
+    replies once the project checks have passed; they don't read project
+    data, so no graph run.
     """
     project_uuid: Optional[UUID] = None
     role_key: Optional[str] = None
@@ -1650,45 +1562,35 @@ async def chat(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid projectId format.")
 
-        project = (
-            db.query(models.Project)
-            .filter(models.Project.id == project_uuid)
-            .first()
-        )
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found.")
-
-        membership_row = (
-            db.query(models.ProjectMember, models.Role)
-            .outerjoin(models.Role, models.ProjectMember.role_id == models.Role.id)
-            .filter(
-                models.ProjectMember.project_id == project_uuid,
-                models.ProjectMember.user_id == current_user.id,
-            )
-            .first()
-        )
+        role_key = resolve_project_role(db, current_user, project_uuid)
 
-        if not membership_row:
-            raise HTTPException(
-                status_code=403,
-                detail="You are not a member of this project.",
-            )
-
-        membership, role = membership_row
-        role_key = role.key if role else None
+    # --- Calculator fast path (same auth / membership outcome as the graph) ---
+    route = route_from_text({"messages": [f"USER: {req.message}"]})
+    if route in CALCULATOR_ROUTES and not (route in ROLE_DEPENDENT_ROUTES and req.projectId):
+        reply_text = calculator_reply(route, req.message)
+        return {
+            "reply": reply_text,
+            "messages": append_user_turn(req.history, req.message)
+            + [f"ASSISTANT: {reply_text}"],
+            "projectId": req.projectId,
+            "userId": str(current_user.id) if current_user else None,
+            "roleKey": role_key,
+            "promptTokens": None,
+        }
 
     # --- Prepare messages for the graph ---
     messages_for_graph = append_user_turn(req.history, req.message)
 
-    # --- Invoke LangGraph with role-aware state ---
+    # --- Invoke LangGraph with role-aware state (on a graph worker thread) ---
     try:
-        result_state = app_graph.invoke(
+        result_state = await graph_runner.run(
+            app_graph.invoke,
             {
                 "messages": messages_for_graph,
                 "projectId": str(project_uuid) if project_uuid else None,
                 "userId": str(current_user.id) if current_user else None,
                 "roleKey": role_key,
-            }
+            },
         )
 
         updated_history: List[str] = result_state.get("messages", messages_for_graph)
@@ -1700,8 +1602,12 @@ async def chat(
             "projectId": req.projectId,
             "userId": str(current_user.id) if current_user else None,
             "roleKey": role_key,
+            # Tokens per prompt section; None when no LLM call was made
+            "promptTokens": result_state.get("promptTokens"),
         }
 
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
@@ -1717,9 +1623,12 @@ async def chat_stream(
     """
     Streaming chat endpoint.
 
-    Uses the same LangGraph pipeline as /chat, but returns the assistant's
-    reply as a text stream so the UI can show it "typing".
+    Uses the same LangGraph pipeline as /chat, but streams the reply as
+    Server-Sent Events: LLM tokens from the assistant / doc-search nodes
+    as they arrive, tool-node answers in one piece, then a final "done"
+    event with the updated messages (see stream_graph_events).
     """
+    started_at = time.perf_counter()
     project_uuid: Optional[UUID] = None
     role_key: Optional[str] = None
 
@@ -1736,58 +1645,33 @@ async def chat_stream(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid projectId format.")
 
-        project = (
-            db.query(models.Project)
-            .filter(models.Project.id == project_uuid)
-            .first()
-        )
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found.")
-
-        membership_row = (
-            db.query(models.ProjectMember, models.Role)
-            .outerjoin(models.Role, models.ProjectMember.role_id == models.Role.id)
-            .filter(
-                models.ProjectMember.project_id == project_uuid,
-                models.ProjectMember.user_id == current_user.id,
-            )
-            .first()
-        )
-
-        if not membership_row:
-            raise HTTPException(
-                status_code=403,
-                detail="You are not a member of this project.",
-            )
-
-        membership, role = membership_row
-        role_key = role.key if role else None
+        role_key = resolve_project_role(db, current_user, project_uuid)
 
     # --- Prepare messages for the graph ---
     messages_for_graph = append_user_turn(req.history, req.message)
 
-    # --- Run LangGraph once to get full reply + updated messages ---
-    try:
-        result_state = app_graph.invoke(
-            {
-                "messages": messages_for_graph,
-                "projectId": str(project_uuid) if project_uuid else None,
-                "userId": str(current_user.id) if current_user else None,
-                "roleKey": role_key,
-            }
-        )
-
-        updated_history: List[str] = result_state.get("messages", messages_for_graph)
-        reply_text = extract_latest_assistant_reply(updated_history)
+    initial_state = {
+        "messages": messages_for_graph,
+        "projectId": str(project_uuid) if project_uuid else None,
+        "userId": str(current_user.id) if current_user else None,
+        "roleKey": role_key,
+    }
+
+    # The graph runs on one bounded graph worker thread; events are handed
+    # back to the event loop as they are produced.
+    events = graph_runner.stream(lambda: stream_graph_events(initial_state, started_at))
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    async def text_stream():
-        chunk_size = 32
-        for i in range(0, len(reply_text), chunk_size):
-            chunk = reply_text[i : i + chunk_size]
-            yield chunk
-            await asyncio.sleep(0)
+# ---------- METRICS ----------
 
-    return StreamingResponse(text_stream(), media_type="text/plain; charset=utf-8")
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus text exposition of this worker's in-process metrics.
+    """
+    return render_metrics()
@@ -62,6 +62,13 @@ def run_migrations_online() -> None:
     connectable = engine
 
     with connectable.connect() as connection:  # type: ignore[call-arg]
+        # The app engine sets statement/lock timeouts for request traffic;
+        # index builds and backfills need to run without them.
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql("SET statement_timeout = 0")
+            connection.exec_driver_sql("SET lock_timeout = 0")
+            connection.commit()
+
         context.configure(  # type: ignore[attr-defined]
             connection=connection,
             target_metadata=target_metadata,
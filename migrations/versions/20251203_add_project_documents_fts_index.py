@@ -0,0 +1,33 @@
+"""Add GIN full-text index on project_documents for DOC_SEARCH_BACKEND=postgres
+
+Revision ID: 20251203
+Revises: 20251202
+Create Date: 2025-12-03 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20251203"
+down_revision: Union[str, None] = "20251202"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Expression must match the one used in app/text_search.py exactly,
+    # otherwise the planner won't use the index.
+    op.create_index(
+        "ix_project_documents_fts",
+        "project_documents",
+        [sa.text("to_tsvector('english', title || ' ' || content)")],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_project_documents_fts", table_name="project_documents")
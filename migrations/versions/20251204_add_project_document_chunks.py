@@ -0,0 +1,73 @@
+"""Add project_document_chunks table for chunked RAG retrieval
+
+Revision ID: 20251204
+Revises: 20251203
+Create Date: 2025-12-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20251204"
+down_revision: Union[str, None] = "20251203"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "project_document_chunks",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("document_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), nullable=False),
+        sa.Column("section", sa.String(length=255), nullable=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("start_offset", sa.Integer(), nullable=False),
+        sa.Column("end_offset", sa.Integer(), nullable=False),
+        sa.Column("token_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["document_id"], ["project_documents.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("document_id", "chunk_index", name="uq_document_chunk_index"),
+    )
+    op.create_index(
+        op.f("ix_project_document_chunks_project_id"),
+        "project_document_chunks",
+        ["project_id"],
+        unique=False,
+    )
+
+    # Full-text search now runs per chunk. Expression must match the one
+    # used in app/text_search.py exactly.
+    op.create_index(
+        "ix_project_document_chunks_fts",
+        "project_document_chunks",
+        [sa.text("to_tsvector('english', content)")],
+        postgresql_using="gin",
+    )
+    op.drop_index("ix_project_documents_fts", table_name="project_documents")
+
+    # Existing documents are chunked lazily on first retrieval; run
+    # `python -m app.document_chunks` to store their chunks up front.
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_project_documents_fts",
+        "project_documents",
+        [sa.text("to_tsvector('english', title || ' ' || content)")],
+        postgresql_using="gin",
+    )
+    op.drop_index("ix_project_document_chunks_fts", table_name="project_document_chunks")
+    op.drop_index(
+        op.f("ix_project_document_chunks_project_id"),
+        table_name="project_document_chunks",
+    )
+    op.drop_table("project_document_chunks")
@@ -0,0 +1,56 @@
+"""Add composite index for keyset pagination of project messages
+
+Revision ID: 20251205
+Revises: 20251204
+Create Date: 2025-12-05 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20251205"
+down_revision: Union[str, None] = "20251204"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # messages is the largest table; build without blocking chat writes.
+    # CONCURRENTLY can't run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_project_created_id",
+            "messages",
+            ["project_id", "created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # selectinload(Message.attachments) filters on message_id IN (...)
+        op.create_index(
+            op.f("ix_message_attachments_message_id"),
+            "message_attachments",
+            ["message_id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f("ix_message_attachments_message_id"),
+            table_name="message_attachments",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_messages_project_created_id",
+            table_name="messages",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,78 @@
+"""Add project_read_watermarks and backfill them from message_reads
+
+Revision ID: 20251206
+Revises: 20251205
+Create Date: 2025-12-06 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20251206"
+down_revision: Union[str, None] = "20251205"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "project_read_watermarks",
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("last_read_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_read_message_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id", "user_id"),
+    )
+
+    # Backfill: for each (project, user) with receipts, the watermark is the
+    # newest read message that comes before the user's first unread message
+    # from someone else, so nothing that was unread becomes read.
+    op.execute(
+        """
+        WITH pairs AS (
+            SELECT DISTINCT m.project_id, r.user_id
+            FROM message_reads r
+            JOIN messages m ON m.id = r.message_id
+        ),
+        first_unread AS (
+            SELECT p.project_id, p.user_id, u.created_at, u.id
+            FROM pairs p
+            CROSS JOIN LATERAL (
+                SELECT m.created_at, m.id
+                FROM messages m
+                WHERE m.project_id = p.project_id
+                  AND m.sender_id <> p.user_id
+                  AND m.created_at IS NOT NULL
+                  AND NOT EXISTS (
+                      SELECT 1 FROM message_reads r
+                      WHERE r.message_id = m.id AND r.user_id = p.user_id
+                  )
+                ORDER BY m.created_at, m.id
+                LIMIT 1
+            ) u
+        )
+        INSERT INTO project_read_watermarks
+            (project_id, user_id, last_read_at, last_read_message_id)
+        SELECT DISTINCT ON (m.project_id, r.user_id)
+               m.project_id, r.user_id, m.created_at, m.id
+        FROM message_reads r
+        JOIN messages m ON m.id = r.message_id
+        LEFT JOIN first_unread f
+               ON f.project_id = m.project_id AND f.user_id = r.user_id
+        WHERE m.created_at IS NOT NULL
+          AND (f.id IS NULL OR (m.created_at, m.id) < (f.created_at, f.id))
+        ORDER BY m.project_id, r.user_id, m.created_at DESC, m.id DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("project_read_watermarks")
@@ -0,0 +1,47 @@
+"""Add activity_dependencies for the critical-path schedule engine
+
+Revision ID: 20251207
+Revises: 20251206
+Create Date: 2025-12-07 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20251207"
+down_revision: Union[str, None] = "20251206"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "activity_dependencies",
+        sa.Column("predecessor_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("successor_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("lag_days", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.CheckConstraint("predecessor_id <> successor_id", name="ck_activity_dependency_not_self"),
+        sa.ForeignKeyConstraint(["predecessor_id"], ["activity_schedules.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["successor_id"], ["activity_schedules.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("predecessor_id", "successor_id"),
+    )
+    op.create_index(
+        "ix_activity_dependencies_successor_id", "activity_dependencies", ["successor_id"]
+    )
+    op.create_index(
+        "ix_activity_dependencies_project_id", "activity_dependencies", ["project_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_activity_dependencies_project_id", table_name="activity_dependencies")
+    op.drop_index("ix_activity_dependencies_successor_id", table_name="activity_dependencies")
+    op.drop_table("activity_dependencies")
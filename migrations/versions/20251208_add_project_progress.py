@@ -0,0 +1,53 @@
+"""Add project_progress counters and backfill them from activity_schedules
+
+Revision ID: 20251208
+Revises: 20251207
+Create Date: 2025-12-08 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20251208"
+down_revision: Union[str, None] = "20251207"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "project_progress",
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("total_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("completed_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("blocked_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("in_progress_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id"),
+    )
+
+    # Backfill every project, including those without schedules (zeros)
+    op.execute(
+        """
+        INSERT INTO project_progress
+            (project_id, total_count, completed_count, blocked_count, in_progress_count)
+        SELECT p.id,
+               count(s.id),
+               count(s.id) FILTER (WHERE s.status = 'COMPLETED'),
+               count(s.id) FILTER (WHERE s.status = 'BLOCKED'),
+               count(s.id) FILTER (WHERE s.status = 'IN_PROGRESS')
+        FROM projects p
+        LEFT JOIN activity_schedules s ON s.project_id = p.id
+        GROUP BY p.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("project_progress")
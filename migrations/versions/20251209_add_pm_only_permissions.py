@@ -0,0 +1,60 @@
+"""Add PM-only project.manage / docs.manage / docs.delete permissions
+
+The project edit and document add / edit / delete routes used to be
+restricted to PROJECT_MANAGER. These permissions keep that mapping for
+databases seeded before they existed.
+
+Revision ID: 20251209
+Revises: 20251208
+Create Date: 2025-12-09 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20251209"
+down_revision: Union[str, None] = "20251208"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        INSERT INTO permissions (key, label, category)
+        VALUES
+            ('project.manage', 'Edit project name, description and status', 'Project'),
+            ('docs.manage', 'Add and edit project documents', 'Docs'),
+            ('docs.delete', 'Delete project documents', 'Docs')
+        ON CONFLICT (key) DO NOTHING
+        """
+    )
+    # Granted to PROJECT_MANAGER only (no-op if roles are not seeded yet)
+    op.execute(
+        """
+        INSERT INTO role_permissions (role_id, permission_id, allowed)
+        SELECT r.id, p.id, true
+        FROM roles r
+        JOIN permissions p ON p.key IN ('project.manage', 'docs.manage', 'docs.delete')
+        WHERE r.key = 'PROJECT_MANAGER'
+        ON CONFLICT ON CONSTRAINT uq_role_permission DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        DELETE FROM role_permissions
+        WHERE permission_id IN (
+            SELECT id FROM permissions
+            WHERE key IN ('project.manage', 'docs.manage', 'docs.delete')
+        )
+        """
+    )
+    op.execute(
+        "DELETE FROM permissions WHERE key IN ('project.manage', 'docs.manage', 'docs.delete')"
+    )
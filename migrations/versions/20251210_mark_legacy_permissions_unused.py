@@ -0,0 +1,57 @@
+"""Mark project.update / docs.upload as unused
+
+No route checks these keys since project.manage / docs.manage took over
+the project edit and document routes. They stay in place (and stay granted)
+so existing role edits are not lost, but /roles now says they do nothing.
+
+Revision ID: 20251210
+Revises: 20251209
+Create Date: 2025-12-10 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20251210"
+down_revision: Union[str, None] = "20251209"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        UPDATE permissions
+        SET label = 'Edit project details (unused; see project.manage)',
+            description = 'Not checked by any route. Project edits require project.manage.'
+        WHERE key = 'project.update'
+        """
+    )
+    op.execute(
+        """
+        UPDATE permissions
+        SET label = 'Upload project documents (unused; see docs.manage)',
+            description = 'Not checked by any route. Document add / edit requires docs.manage, delete requires docs.delete.'
+        WHERE key = 'docs.upload'
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        UPDATE permissions
+        SET label = 'Edit project details', description = NULL
+        WHERE key = 'project.update'
+        """
+    )
+    op.execute(
+        """
+        UPDATE permissions
+        SET label = 'Upload project documents', description = NULL
+        WHERE key = 'docs.upload'
+        """
+    )